@@ -0,0 +1,68 @@
+"""Compare PDF text backends against the pdfplumber reference.
+
+Every backend parses every document; days, pairs and totals must equal the
+pdfplumber output, and throughput is reported in documents per second:
+
+    python benchmarks/bench_backends.py --input documents --repeat 3
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+from cartellino_parser.extract import BACKENDS, DEFAULT_BACKEND
+from cartellino_parser.parser import parse_pdf
+
+
+def _differences(reference, candidate) -> list[str]:
+    problems = []
+    if not candidate.days_df.equals(reference.days_df):
+        problems.append("days")
+    if not candidate.pairs_df.equals(reference.pairs_df):
+        problems.append("pairs")
+    if candidate.totals != reference.totals:
+        problems.append("totals")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", default="documents", help="Folder of sample PDFs")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--backend", action="append", choices=sorted(BACKENDS), help="Limit to these backends"
+    )
+    args = parser.parse_args()
+
+    paths = sorted(Path(args.input).glob("*.pdf"))
+    reference = {path: parse_pdf(path, backend=DEFAULT_BACKEND) for path in paths}
+    print(f"{len(paths)} documents, {args.repeat} rounds")
+
+    mismatched = 0
+    for name in args.backend or sorted(BACKENDS):
+        failures = {}
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for path in paths:
+                try:
+                    parsed = parse_pdf(path, backend=name)
+                except Exception as exc:
+                    failures[path.name] = [f"{type(exc).__name__}: {exc}"]
+                    continue
+                problems = _differences(reference[path], parsed)
+                if problems:
+                    failures[path.name] = problems
+        elapsed = time.perf_counter() - start
+        rate = len(paths) * args.repeat / elapsed
+        status = "matches" if not failures else f"MISMATCH in {len(failures)} document(s)"
+        print(f"{name:>12}: {rate:8.1f} docs/s  {status}")
+        for document, problems in sorted(failures.items()):
+            print(f"{'':>14}{document}: {', '.join(problems)}")
+        mismatched += bool(failures)
+
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,138 @@
+"""Load-test drive-scan and drive-filter offline against an in-memory fake Drive.
+
+The fake serves a generated tree of employee folders with synthetic
+cartellini, with per-request latency, page size, random 429/5xx errors and a
+requests-per-second limit; the scanner and the download/parse pipeline run
+unchanged on top of it:
+
+    python benchmarks/bench_drive.py scan --employees 10000 --latency 0.05 --workers 16
+    python benchmarks/bench_drive.py filter --documents 100000 --latency 0.02 --error-rate 0.01
+"""
+from __future__ import annotations
+
+import argparse
+import collections
+import os
+import tempfile
+import threading
+import time
+
+from drive_scanner import config, drive_client
+from drive_scanner.drive_client import list_children, set_service_factory
+from drive_scanner.fake_drive import FOLDER_MIME, FakeDrive, populate
+from drive_scanner.scan_service import FolderCrawler, normalize_term
+
+MONTHS = 24
+
+
+def _fake_drive(args: argparse.Namespace) -> tuple[FakeDrive, str]:
+    drive = FakeDrive(page_size=args.page_size)
+    start = time.perf_counter()
+    root = populate(drive, employees=args.employees, months=MONTHS, seed=args.seed)
+    print(f"generated {len(drive.items)} items in {time.perf_counter() - start:.1f}s")
+    # Latency and faults apply to the benchmarked run only.
+    drive.latency = args.latency
+    drive.error_rate = args.error_rate
+    drive.rate_limit = args.rate_limit
+    set_service_factory(lambda creds: drive)
+    return drive, root
+
+
+def _scan(drive: FakeDrive, root: str, workers: int) -> list[dict]:
+    exclude_terms = [normalize_term(term) for term in config.EXCLUDE_TERMS]
+    employees = [f for f in list_children(drive, root) if f["mimeType"] == FOLDER_MIME]
+    return list(FolderCrawler(None, exclude_terms, workers=workers).crawl(employees))
+
+
+def _report(drive: FakeDrive, elapsed: float, unit: str, count: int) -> None:
+    by_operation = collections.Counter(drive.requests)
+    print(f"{count} {unit} in {elapsed:.1f}s ({count / elapsed:.1f} {unit}/s)")
+    print(f"{len(drive.requests)} requests: " + ", ".join(f"{op} {n}" for op, n in sorted(by_operation.items())))
+    if drive.errors:
+        print("injected errors: " + ", ".join(f"{status} x{n}" for status, n in sorted(drive.errors.items())))
+
+
+def bench_scan(args: argparse.Namespace) -> int:
+    drive, root = _fake_drive(args)
+    drive.requests.clear()
+    start = time.perf_counter()
+    reports = _scan(drive, root, args.workers)
+    elapsed = time.perf_counter() - start
+    _report(drive, elapsed, "employees", len(reports))
+    print(f"{sum(len(report['included']) for report in reports)} files included")
+    return 0
+
+
+def bench_filter(args: argparse.Namespace) -> int:
+    from cartellino_parser.dataset import DatasetWriter
+    from cartellino_parser.store import DB_NAME, ResultStore
+    from drive_scanner.filter_scan import iter_processed
+
+    args.employees = -(-args.documents // MONTHS)
+    latency, args.latency = args.latency, 0.0
+    drive, root = _fake_drive(args)
+    docs = [(report, doc) for report in _scan(drive, root, workers=8) for doc in report["included"]]
+    docs = docs[: args.documents]
+    drive.latency = latency
+    drive.requests.clear()
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        sink = None
+        if args.format == "sqlite":
+            sink = ResultStore(os.path.join(out_dir, DB_NAME))
+        elif args.format == "parquet":
+            sink = DatasetWriter(out_dir)
+        statuses: collections.Counter = collections.Counter()
+        start = time.perf_counter()
+        results = iter_processed(
+            None,
+            docs,
+            out_dir,
+            threading.Event(),
+            args.download_workers,
+            args.parse_workers,
+            backend=args.backend,
+            sink=sink,
+        )
+        for result in results:
+            statuses[result["status"]] += 1
+        if sink is not None:
+            sink.close()
+        elapsed = time.perf_counter() - start
+
+    _report(drive, elapsed, "documents", len(docs))
+    print("results: " + ", ".join(f"{status} {n}" for status, n in sorted(statuses.items())))
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to every request")
+    parser.add_argument("--page-size", type=int, default=1000, help="Most items per listing page")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 429/5xx")
+    parser.add_argument("--rate-limit", type=float, help="Requests per second before 403 userRateLimitExceeded")
+    parser.add_argument("--backoff", type=float, default=0.05, help="Base retry backoff in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", help="Crawl every employee folder like drive-scan")
+    scan.add_argument("--employees", type=int, default=10_000)
+    scan.add_argument("--workers", type=int, default=6)
+
+    filter_ = commands.add_parser("filter", help="Download and parse documents like drive-filter")
+    filter_.add_argument("--documents", type=int, default=100_000)
+    filter_.add_argument("--download-workers", type=int, default=6)
+    filter_.add_argument("--parse-workers", type=int, default=os.cpu_count() or 1)
+    filter_.add_argument("--backend", default="pypdf")
+    filter_.add_argument("--format", default="sqlite", choices=["csv", "parquet", "sqlite"])
+    args = parser.parse_args()
+
+    # Real Drive backs off for seconds; scale it down with the simulated latency.
+    drive_client.BACKOFF_BASE = args.backoff
+    if args.command == "scan":
+        return bench_scan(args)
+    return bench_filter(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
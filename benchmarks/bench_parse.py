@@ -0,0 +1,88 @@
+"""Compare the single-pass scanner against the four separate line scans.
+
+Extraction is done once up front so only the parsing stage is timed:
+
+    python benchmarks/bench_parse.py --input documents --repeat 200
+
+Two comparisons are reported. ``lines`` times only the line classification
+(the four separate scans vs one pass, collecting the same raw rows); ``parse``
+adds building the day and pair tables, which is the same work on both paths and
+dominates it, so the gap there is smaller.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from cartellino_parser.extract import iter_lines
+from cartellino_parser.parse_days import collect_days, parse_days
+from cartellino_parser.parse_pairs import collect_pairs, parse_pairs
+from cartellino_parser.parse_totals import parse_totals
+from cartellino_parser.parser import _build_meta
+from cartellino_parser.scanner import classify_lines, scan_lines
+
+
+def four_scans_lines(lines: list[str]) -> None:
+    _build_meta(lines)
+    collect_days(lines)
+    collect_pairs(lines)
+    parse_totals(lines)
+
+
+def single_pass_lines(lines: list[str]) -> None:
+    classify_lines(lines).pairs.finish()
+
+
+def four_scans(lines: list[str]) -> None:
+    meta = _build_meta(lines)
+    parse_days(lines, meta["year"], meta["month"])
+    parse_pairs(lines, meta["year"], meta["month"])
+    parse_totals(lines)
+
+
+def single_pass(lines: list[str]) -> None:
+    scan_lines(lines)
+
+
+COMPARISONS = {
+    "lines": (four_scans_lines, single_pass_lines),
+    "parse": (four_scans, single_pass),
+}
+
+
+def _time_per_doc(funcs, documents: list[list[str]], repeat: int) -> list[list[float]]:
+    # The functions take turns on every document, so clock-speed drift during
+    # the run affects both sides alike.
+    samples: list[list[float]] = [[] for _ in funcs]
+    for _ in range(repeat):
+        for lines in documents:
+            for func, func_samples in zip(funcs, samples):
+                start = time.perf_counter()
+                func(lines)
+                func_samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", default="documents", help="Folder of sample PDFs")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    paths = sorted(Path(args.input).glob("*.pdf"))
+    documents = [list(iter_lines(path)) for path in paths]
+    print(f"{len(documents)} documents, {args.repeat} rounds")
+
+    for comparison, (separate, single) in COMPARISONS.items():
+        medians = [statistics.median(samples) for samples in _time_per_doc((separate, single), documents, args.repeat)]
+        print(
+            f"{comparison:>6}: four_scans {medians[0] * 1e6:8.1f} us/doc, "
+            f"single_pass {medians[1] * 1e6:8.1f} us/doc, {medians[0] / medians[1]:.2f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,288 @@
+"""Time every stage of the cartellino pipeline separately.
+
+Each document goes through extraction, the four line scans, validation and
+output writing, one stage at a time, and every stage reports throughput,
+p50/p95 latency and peak traced memory. The ``validate_corpus`` stage runs the
+cross-document checks once per round over a synthetic corpus of
+``--corpus-rows`` day rows (``0`` skips it). Results can be saved as JSON and
+compared against an earlier run; any stage slower than the threshold fails:
+
+    python benchmarks/bench_stages.py --input documents --repeat 20 --save base.json
+    python benchmarks/bench_stages.py --input documents --repeat 20 --baseline base.json
+    python benchmarks/bench_stages.py --load new.json --baseline base.json --threshold 0.05
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from cartellino_parser.cli import _write_csv
+from cartellino_parser.extract import BACKENDS, DEFAULT_BACKEND, extract_text
+from cartellino_parser.models import ParsedCartellino
+from cartellino_parser.parse_days import parse_days
+from cartellino_parser.parse_pairs import parse_pairs
+from cartellino_parser.parse_totals import parse_totals
+from cartellino_parser.parser import _build_meta, parse_pdf
+from cartellino_parser.scanner import scan_lines
+from cartellino_parser.store import DB_NAME, ResultStore
+from cartellino_parser.synthetic import generate_corpus
+from cartellino_parser.validate import load_corpus, validate_cartellino, validate_corpus
+
+STAGES = [
+    "extract_text",
+    "build_meta",
+    "parse_days",
+    "parse_pairs",
+    "parse_totals",
+    "validate",
+    "write_outputs",
+    "scan_lines",
+    "parse_pdf",
+]
+CORPUS_STAGE = "validate_corpus"
+# Synthetic cartellini parsed for the corpus stage, then copied up to --corpus-rows.
+CORPUS_EMPLOYEES = 4
+CORPUS_MONTHS = 6
+# Latency percentiles compared against the baseline.
+COMPARED = ("p50_ms", "p95_ms")
+
+
+def _stage_calls(path: Path, backend: str, out_dir: Path) -> List[tuple[str, Callable[[], Any]]]:
+    """The stages of one document, each a thunk fed by the previous stages' results."""
+    state: Dict[str, Any] = {}
+
+    def extract():
+        state["lines"] = extract_text(path, backend).splitlines()
+
+    def meta():
+        state["meta"] = _build_meta(state["lines"])
+
+    def days():
+        state["days"] = parse_days(state["lines"], state["meta"]["year"], state["meta"]["month"])
+
+    def pairs():
+        state["pairs"] = parse_pairs(state["lines"], state["meta"]["year"], state["meta"]["month"])
+
+    def totals():
+        state["totals"] = parse_totals(state["lines"])
+
+    def validate():
+        state["validation"] = validate_cartellino(state["days"], state["totals"])
+
+    def write():
+        parsed = ParsedCartellino(
+            meta=state["meta"],
+            days_df=state["days"],
+            pairs_df=state["pairs"],
+            totals=state["totals"],
+            validation=state["validation"],
+        )
+        _write_csv(parsed, out_dir, path.stem)
+
+    return [
+        ("extract_text", extract),
+        ("build_meta", meta),
+        ("parse_days", days),
+        ("parse_pairs", pairs),
+        ("parse_totals", totals),
+        ("validate", validate),
+        ("write_outputs", write),
+        ("scan_lines", lambda: scan_lines(state["lines"])),
+        ("parse_pdf", lambda: parse_pdf(path, backend=backend)),
+    ]
+
+
+def corpus_tables(backend: str, min_day_rows: int, tmp: Path) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Days, pairs and totals of a parsed synthetic corpus, copied under new
+    employee ids and documents until there are ``min_day_rows`` day rows."""
+    generate_corpus(tmp, employees=CORPUS_EMPLOYEES, months=CORPUS_MONTHS, bundle_ratio=0.0, seed=0)
+    with ResultStore(tmp / DB_NAME) as store:
+        for path in sorted((tmp / "pdf").glob("*.pdf")):
+            store.add(parse_pdf(path, backend=backend), document=path.name)
+    tables = load_corpus(tmp)
+    copies = max(1, math.ceil(min_day_rows / len(tables[0])))
+    tiled = []
+    for table in tables:
+        employee = table["employee_id"].astype(str)
+        tiled.append(
+            pd.concat(
+                [table.assign(employee_id=employee + f"-{i}", document=table["document"] + f"-{i}") for i in range(copies)],
+                ignore_index=True,
+            )
+        )
+    return tiled[0], tiled[1], tiled[2]
+
+
+def _percentile(samples: List[float], pct: int) -> float:
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+def run(paths: List[Path], repeat: int, backend: str, corpus_rows: int = 0) -> Dict[str, Any]:
+    stage_names = STAGES + ([CORPUS_STAGE] if corpus_rows else [])
+    timings: Dict[str, List[float]] = {stage: [] for stage in stage_names}
+    peaks: Dict[str, int] = {stage: 0 for stage in stage_names}
+    # Documents per sample: one for the per-document stages, the whole corpus for validate_corpus.
+    documents: Dict[str, int] = dict.fromkeys(stage_names, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dir = Path(tmp)
+        corpus_calls: List[tuple[str, Callable[[], Any]]] = []
+        if corpus_rows:
+            corpus_dir = out_dir / "corpus"
+            days, pairs, totals = corpus_tables(backend, corpus_rows, corpus_dir)
+            documents[CORPUS_STAGE] = len(totals)
+            corpus_calls.append((CORPUS_STAGE, lambda: validate_corpus(days, pairs, totals)))
+        # Memory is traced in a separate pass: tracemalloc slows allocation-heavy
+        # stages down too much to time them at the same time.
+        tracemalloc.start()
+        for calls in [_stage_calls(path, backend, out_dir) for path in paths] + [corpus_calls]:
+            for stage, call in calls:
+                tracemalloc.reset_peak()
+                baseline, _ = tracemalloc.get_traced_memory()
+                call()
+                peaks[stage] = max(peaks[stage], tracemalloc.get_traced_memory()[1] - baseline)
+        tracemalloc.stop()
+
+        for _ in range(repeat):
+            for calls in [_stage_calls(path, backend, out_dir) for path in paths] + [corpus_calls]:
+                for stage, call in calls:
+                    start = time.perf_counter()
+                    call()
+                    timings[stage].append(time.perf_counter() - start)
+
+    stages = {}
+    for stage in stage_names:
+        samples = timings[stage]
+        stages[stage] = {
+            "count": len(samples),
+            "docs_per_s": len(samples) * documents[stage] / sum(samples),
+            "mean_ms": statistics.fmean(samples) * 1e3,
+            "p50_ms": _percentile(samples, 50) * 1e3,
+            "p95_ms": _percentile(samples, 95) * 1e3,
+            "peak_kib": peaks[stage] / 1024,
+        }
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "backend": backend,
+            "documents": len(paths),
+            "repeat": repeat,
+            "corpus_rows": corpus_rows,
+        },
+        "stages": stages,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    meta = results["meta"]
+    print(
+        f"{meta['documents']} documents x {meta['repeat']} rounds, backend {meta['backend']}, "
+        f"commit {meta['commit']}"
+    )
+    print(f"{'stage':>15} {'docs/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'peak KiB':>10}")
+    for stage, stats in results["stages"].items():
+        print(
+            f"{stage:>15} {stats['docs_per_s']:10.1f} {stats['p50_ms']:9.3f} "
+            f"{stats['p95_ms']:9.3f} {stats['peak_kib']:10.1f}"
+        )
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Print per-stage changes and return the stages slower than ``threshold``."""
+    regressions = []
+    print(f"\nvs baseline {baseline['meta'].get('commit')} ({baseline['meta'].get('created')}):")
+    for stage, stats in current["stages"].items():
+        before = baseline["stages"].get(stage)
+        if before is None:
+            print(f"{stage:>15}  (new stage)")
+            continue
+        changes = []
+        slower = False
+        for metric in COMPARED:
+            change = stats[metric] / before[metric] - 1 if before[metric] else 0.0
+            changes.append(f"{metric} {change:+7.1%}")
+            slower = slower or change > threshold
+        marker = "  REGRESSION" if slower else ""
+        print(f"{stage:>15}  {'  '.join(changes)}{marker}")
+        if slower:
+            regressions.append(stage)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", default="documents", help="PDF file or folder (searched recursively)")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--limit", type=int, help="Only use the first N documents")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, choices=sorted(BACKENDS))
+    parser.add_argument(
+        "--corpus-rows",
+        type=int,
+        default=100_000,
+        help="Day rows of the synthetic corpus timed by validate_corpus (0 skips the stage)",
+    )
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--load", help="Compare stored results instead of running")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Fail when a stage's p50 or p95 grows by more than this fraction",
+    )
+    args = parser.parse_args()
+
+    if args.load:
+        results = json.loads(Path(args.load).read_text())
+    else:
+        input_path = Path(args.input)
+        paths = [input_path] if input_path.is_file() else sorted(input_path.rglob("*.pdf"))
+        if args.limit:
+            paths = paths[: args.limit]
+        if not paths:
+            parser.error(f"no PDFs under {input_path}")
+        results = run(paths, args.repeat, args.backend, args.corpus_rows)
+    print_results(results)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(
+                f"\nFAIL: {', '.join(regressions)} slower than baseline by more than {args.threshold:.0%}",
+                file=sys.stderr,
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,4 +1,43 @@
-from cartellino_parser.models import CartellinoParseError, ParsedCartellino
-from cartellino_parser.parser import parse_pdf
+from __future__ import annotations
 
-__all__ = ["CartellinoParseError", "ParsedCartellino", "parse_pdf"]
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from cartellino_parser.batch import parse_many
+    from cartellino_parser.models import CartellinoParseError, ParsedCartellino, UnknownLayoutError
+    from cartellino_parser.parser import parse_pdf
+    from cartellino_parser.segments import parse_pdf_segments
+
+# Resolved on first access so that importing the package (or a light submodule
+# such as ``cache``) does not pull in pandas and pdfplumber.
+_EXPORTS = {
+    "CartellinoParseError": "cartellino_parser.models",
+    "ParsedCartellino": "cartellino_parser.models",
+    "UnknownLayoutError": "cartellino_parser.models",
+    "parse_many": "cartellino_parser.batch",
+    "parse_pdf": "cartellino_parser.parser",
+    "parse_pdf_segments": "cartellino_parser.segments",
+}
+
+__all__ = [
+    "CartellinoParseError",
+    "ParsedCartellino",
+    "UnknownLayoutError",
+    "parse_many",
+    "parse_pdf",
+    "parse_pdf_segments",
+]
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import io
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from cartellino_parser.cache import ParseCache, content_key
+from cartellino_parser.extract import DEFAULT_BACKEND
+from cartellino_parser.layouts import merge_unknown_layouts, reset_unknown_layouts, unknown_layouts
+from cartellino_parser.models import ParsedCartellino
+from cartellino_parser.parser import _read_bytes, parse_pdf, warm_up
+
+if TYPE_CHECKING:
+    from cartellino_parser.profiling import SlowDocumentCapture
+
+# Documents handed out per worker: enough to keep every worker busy without
+# reading a whole corpus into memory ahead of the parsers.
+QUEUE_PER_WORKER = 2
+# A dead worker takes every document in flight down with it. Each of them is
+# parsed again on its own, up to this many times, so only a document that keeps
+# killing its worker is reported as failed.
+CRASH_RETRIES = 1
+_END = object()
+
+Outcome = Union[ParsedCartellino, Exception]
+# (record, error, slow documents, unknown layouts) as returned by a worker
+_TaskResult = Tuple[Optional[Dict[str, Any]], Optional[Exception], List[Dict[str, Any]], Dict[str, Any]]
+# (pool, task, file name) of a document sent to a worker, to send it again after a crash
+_Submitted = Tuple[ProcessPoolExecutor, Any, Optional[str]]
+
+
+def _parse_task(
+    source: Any, name: Optional[str], backend: str, capture: Optional[SlowDocumentCapture]
+) -> _TaskResult:
+    # Runs in a worker process: unknown layouts and slow documents are recorded
+    # there, so they travel back with the result for the parent to merge.
+    reset_unknown_layouts()
+    if capture is not None:
+        capture = replace(capture, captured=[])
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+        source.name = name
+    try:
+        record, error = parse_pdf(source, backend=backend, capture=capture).to_record(), None
+    except Exception as exc:
+        record, error = None, exc
+    slow = [] if capture is None else capture.captured
+    return record, error, slow, unknown_layouts()
+
+
+def _parse_inline(
+    sources: Iterable[Any],
+    backend: str,
+    cache: Optional[ParseCache],
+    capture: Optional[SlowDocumentCapture],
+) -> Iterator[Tuple[Any, Outcome]]:
+    for source in sources:
+        try:
+            yield source, parse_pdf(source, cache=cache, backend=backend, capture=capture)
+        except Exception as exc:
+            yield source, exc
+
+
+def parse_many(
+    sources: Iterable[Any],
+    jobs: Optional[int] = None,
+    ordered: bool = False,
+    backend: str = DEFAULT_BACKEND,
+    cache: Optional[ParseCache] = None,
+    capture: Optional[SlowDocumentCapture] = None,
+) -> Iterator[Tuple[Any, Outcome]]:
+    """Parse many PDFs on ``jobs`` worker processes (default: one per CPU).
+
+    Yields ``(source, ParsedCartellino)``, or ``(source, exception)`` for a
+    document that failed, as results come in (in input order with ``ordered``).
+    A failure never stops the batch, a crashed worker included: the pool is
+    restarted and the documents it was holding are parsed again one at a time
+    (``CRASH_RETRIES``), so only the document that crashes its worker fails.
+    ``sources`` is consumed lazily, a few documents per worker ahead of the
+    parsers. The cache and the slow-document capture are handled in this
+    process; ``jobs=1`` parses everything here without a pool.
+    """
+    jobs = (os.cpu_count() or 1) if jobs is None else jobs
+    if jobs <= 1:
+        yield from _parse_inline(sources, backend, cache, capture)
+        return
+
+    # (source, future, cache key, submission or None for a cache hit)
+    pending: Deque[Tuple[Any, Future, Optional[str], Optional[_Submitted]]] = deque()
+    pool: Optional[ProcessPoolExecutor] = None
+    isolation: Optional[ProcessPoolExecutor] = None
+
+    def submit(source: Any) -> Tuple[Future, Optional[str], Optional[_Submitted]]:
+        nonlocal pool
+        data = name = key = None
+        if cache is not None or not isinstance(source, (str, Path)):
+            data = _read_bytes(source)
+            name = str(getattr(source, "name", source))
+        if cache is not None:
+            key = content_key(data, backend)
+            record = cache.get(key)
+            if record is not None:
+                future: Future = Future()
+                future.set_result((record, None, [], {}))
+                return future, None, None
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=jobs, initializer=warm_up)
+        task = source if data is None else data
+        try:
+            future = pool.submit(_parse_task, task, name, backend, capture)
+        except BrokenProcessPool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            pool = ProcessPoolExecutor(max_workers=jobs, initializer=warm_up)
+            future = pool.submit(_parse_task, task, name, backend, capture)
+        return future, key, (pool, task, name)
+
+    def parse_alone(task: Any, name: Optional[str]) -> _TaskResult:
+        # One document at a time on a single worker: a crash here is its own.
+        nonlocal isolation
+        attempts = 0
+        while True:
+            if isolation is None:
+                isolation = ProcessPoolExecutor(max_workers=1, initializer=warm_up)
+            try:
+                return isolation.submit(_parse_task, task, name, backend, capture).result()
+            except BrokenProcessPool:
+                isolation.shutdown(wait=False, cancel_futures=True)
+                isolation = None
+                attempts += 1
+                if attempts >= CRASH_RETRIES:
+                    raise
+
+    def result_of(future: Future, submitted: Optional[_Submitted]) -> _TaskResult:
+        nonlocal pool
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            if submitted is None or not CRASH_RETRIES:
+                raise
+        broken, task, name = submitted
+        if broken is pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            pool = None
+        return parse_alone(task, name)
+
+    def finish(source: Any, future: Future, key: Optional[str], submitted: Optional[_Submitted]) -> Tuple[Any, Outcome]:
+        try:
+            record, error, slow, unknown = result_of(future, submitted)
+        except Exception as exc:
+            return source, exc
+        merge_unknown_layouts(unknown)
+        if capture is not None:
+            capture.captured.extend(slow)
+        if error is not None:
+            return source, error
+        if key is not None:
+            cache.put(key, record)
+        return source, ParsedCartellino.from_record(record)
+
+    window = jobs * QUEUE_PER_WORKER
+    iterator = iter(sources)
+    try:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < window:
+                source = next(iterator, _END)
+                if source is _END:
+                    exhausted = True
+                    break
+                pending.append((source, *submit(source)))
+            if not pending:
+                return
+            if ordered:
+                yield finish(*pending.popleft())
+                continue
+            wait([entry[1] for entry in pending], return_when=FIRST_COMPLETED)
+            for entry in [entry for entry in pending if entry[1].done()]:
+                pending.remove(entry)
+                yield finish(*entry)
+    finally:
+        for executor in (pool, isolation):
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+# Evict down to this fraction of the budget so eviction does not run on every put.
+EVICT_TO = 0.9
+# Written into every version directory, so only directories this cache created
+# are ever removed from a shared --cache-dir.
+MARKER = ".parse-cache"
+
+# Modules whose code decides what a PDF parses to; changes elsewhere (CLI,
+# writers, stores) leave cached results valid.
+PARSING_MODULES = (
+    "parser.py",
+    "scanner.py",
+    "segments.py",
+    "parse_*.py",
+    "layouts.py",
+    "extract.py",
+    "models.py",
+    "utils.py",
+    "validate.py",
+)
+EXTRACTOR_DISTRIBUTIONS = ("pdfplumber", "pdfminer.six", "pypdf", "pypdfium2")
+
+
+@lru_cache(maxsize=1)
+def parser_version() -> str:
+    """Stamp derived from the parsing modules' source and the installed text
+    extractor versions: a change to either invalidates the cache."""
+    digest = hashlib.sha256()
+    package = Path(__file__).resolve().parent
+    paths = {path for pattern in PARSING_MODULES for path in package.glob(pattern)}
+    for path in sorted(paths):
+        digest.update(path.name.encode("utf-8"))
+        digest.update(path.read_bytes())
+    for name in EXTRACTOR_DISTRIBUTIONS:
+        try:
+            version = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            version = "-"
+        digest.update(f"{name}={version}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def content_key(data: bytes, backend: str = "pdfplumber") -> str:
+    # Backends may extract slightly different text, so each gets its own entries.
+    return f"{hashlib.sha256(data).hexdigest()}-{backend}"
+
+
+class ParseCache:
+    """On-disk cache of parse results keyed by PDF content hash and text backend.
+
+    Entries are compact ``ParsedCartellino.to_record()`` dicts stored under
+    ``<root>/<parser_version>/``. Directories left by other parser versions
+    (marked with ``MARKER``) are removed on open, anything else under ``root`` is
+    left alone, and the total size is kept under ``max_bytes`` by evicting
+    the least recently used entries.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        version: Optional[str] = None,
+    ) -> None:
+        self.root = Path(root)
+        self.version = version or parser_version()
+        self.path = self.root / self.version
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._open()
+
+    def _open(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        (self.path / MARKER).touch()
+        for child in self.root.iterdir():
+            if child.name == self.version or not child.is_dir():
+                continue
+            if (child / MARKER).exists():
+                LOGGER.info("Dropping parse cache for parser version %s", child.name)
+                shutil.rmtree(child, ignore_errors=True)
+
+        found = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+        self._evict()
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}.pkl"
+
+    def get(self, key: str, count: bool = True) -> Optional[Dict[str, Any]]:
+        """The record stored under ``key``, or ``None``. ``count=False`` keeps the
+        lookup out of ``hits``/``misses`` (for entries that are not parse results)."""
+        path = self._file(key)
+        try:
+            with open(path, "rb") as f:
+                record = pickle.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += count
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError) as exc:
+            LOGGER.warning("Discarding unreadable cache entry %s: %s", path, exc)
+            self._remove(key)
+            with self._lock:
+                self.misses += count
+            return None
+
+        with self._lock:
+            self.hits += count
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return record
+
+    def put(self, key: str, record: Dict[str, Any]) -> None:
+        payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        path = self._file(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size += len(payload) - self._entries.pop(key, 0)
+            self._entries[key] = len(payload)
+        self._evict()
+
+    def _remove(self, key: str) -> None:
+        with self._lock:
+            self._size -= self._entries.pop(key, 0)
+        try:
+            self._file(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        with self._lock:
+            if self._size <= self.max_bytes:
+                return
+            victims = []
+            while self._entries and self._size > self.max_bytes * EVICT_TO:
+                key, size = self._entries.popitem(last=False)
+                self._size -= size
+                victims.append(key)
+        for key in victims:
+            try:
+                self._file(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
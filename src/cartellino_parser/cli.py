@@ -1,21 +1,75 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import logging
+import os
 from pathlib import Path
+from typing import Iterator, Tuple
 
-from cartellino_parser.parser import parse_pdf
+from cartellino_parser.cache import ParseCache
+from cartellino_parser.dataset import DEFAULT_FLUSH_ROWS, DatasetWriter
+from cartellino_parser.extract import BACKENDS, DEFAULT_BACKEND
+from cartellino_parser.incremental import INDEX_NAME, ParseIndex, scan_pdfs
+from cartellino_parser.models import ParsedCartellino
+from cartellino_parser.profiling import SlowDocumentCapture
+from cartellino_parser.store import DB_NAME, ResultStore
+
+LOGGER = logging.getLogger(__name__)
+
+ORPHANS_NAME = "orphans.json"
 
 
 def _configure_logging() -> None:
     logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
 
 
-def _iter_pdfs(input_path: Path) -> list[Path]:
+def _iter_pdfs(input_path: Path, recursive: bool = False) -> Iterator[Tuple[Path, os.stat_result]]:
     if input_path.is_file():
-        return [input_path]
-    return sorted(input_path.glob("*.pdf"))
+        return iter([(input_path, input_path.stat())])
+    return scan_pdfs(input_path, recursive)
+
+
+def _write_csv(parsed: ParsedCartellino, out_dir: Path, stem: str) -> list[Path]:
+    days_path = out_dir / f"{stem}.days.csv"
+    pairs_path = out_dir / f"{stem}.pairs.csv"
+    totals_path = out_dir / f"{stem}.totals.json"
+    report_path = out_dir / f"{stem}.report.json"
+
+    parsed.days_df.to_csv(days_path, index=False)
+    parsed.pairs_df.to_csv(pairs_path, index=False)
+    totals_path.write_text(json.dumps(parsed.totals, indent=2, ensure_ascii=False))
+    report = {
+        "meta": parsed.meta,
+        "totals": parsed.totals,
+        "validation": parsed.validation,
+    }
+    report_path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    return [days_path, pairs_path, totals_path, report_path]
+
+
+def _drop_outputs(outputs: list[str], out_dir: Path, sink) -> None:
+    if isinstance(sink, ResultStore):
+        sink.remove(outputs)
+        return
+    for output in outputs:
+        (out_dir / output).unlink(missing_ok=True)
+
+
+def _validate(input_path: Path, out_path: Path) -> int:
+    from cartellino_parser.validate import load_corpus, validate_corpus
+
+    _configure_logging()
+    days, pairs, totals = load_corpus(input_path)
+    anomalies = validate_corpus(days, pairs, totals)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    anomalies.to_csv(out_path, index=False)
+    counts = anomalies["check"].value_counts()
+    for check, count in counts.items():
+        LOGGER.warning("%s: %s anomalies", check, count)
+    LOGGER.info("%s documents checked, %s anomalies written to %s", len(totals), len(anomalies), out_path)
+    return 0
 
 
 def main() -> int:
@@ -24,32 +78,186 @@ def main() -> int:
     parse_parser = subparsers.add_parser("parse", help="Parse PDF files")
     parse_parser.add_argument("--input", required=True, help="PDF file or folder")
     parse_parser.add_argument("--out", required=True, help="Output folder")
+    parse_parser.add_argument(
+        "--recursive", action="store_true", help="Also parse the PDFs in subfolders of --input"
+    )
+    parse_parser.add_argument(
+        "--jobs", type=int, help="Worker processes (default: one per CPU; 1 parses in this process)"
+    )
+    parse_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"Only parse PDFs that are new or changed since the last run (tracked in <out>/{INDEX_NAME})",
+    )
+    parse_parser.add_argument(
+        "--orphans",
+        default="flag",
+        choices=["flag", "delete"],
+        help="With --incremental: what to do with outputs whose PDF is gone or no longer parses",
+    )
+    parse_parser.add_argument(
+        "--backend",
+        default=DEFAULT_BACKEND,
+        choices=sorted(BACKENDS),
+        help="PDF text extraction backend",
+    )
+    parse_parser.add_argument("--cache-dir", help="Reuse parse results of identical PDFs from this folder")
+    parse_parser.add_argument("--cache-max-mb", type=int, default=1024)
+    parse_parser.add_argument(
+        "--format",
+        default="csv",
+        choices=["csv", "parquet", "sqlite"],
+        help=(
+            "csv: four files per PDF; parquet: days/pairs/totals dataset partitioned by "
+            f"employee/year; sqlite: a single {DB_NAME} database"
+        ),
+    )
+    parse_parser.add_argument("--flush-rows", type=int, default=DEFAULT_FLUSH_ROWS)
+    parse_parser.add_argument(
+        "--slow-seconds",
+        type=float,
+        help="Profile and keep a copy of PDFs whose parse takes longer than this",
+    )
+    parse_parser.add_argument(
+        "--slow-mb",
+        type=float,
+        help="Profile and keep a copy of PDFs whose parse peaks above this many MB",
+    )
+    parse_parser.add_argument("--slow-dir", help="Where slow PDFs go (default: <out>/slow)")
+    validate_parser = subparsers.add_parser(
+        "validate", help="Check a whole parquet/sqlite output for cross-month anomalies"
+    )
+    validate_parser.add_argument("--input", required=True, help="Output folder of parse --format parquet/sqlite")
+    validate_parser.add_argument("--out", required=True, help="CSV file for the anomaly table")
     args = parser.parse_args()
 
+    if args.command == "validate":
+        return _validate(Path(args.input), Path(args.out))
+    if args.incremental and args.format == "parquet":
+        parser.error("--incremental supports csv and sqlite output")
+
+    # The parsing stack (pandas, pdfplumber) is only loaded once there is work to do.
+    from cartellino_parser.batch import parse_many
+    from cartellino_parser.layouts import unknown_layouts
+
     _configure_logging()
     input_path = Path(args.input)
     out_dir = Path(args.out)
     out_dir.mkdir(parents=True, exist_ok=True)
-    for pdf_path in _iter_pdfs(input_path):
-        parsed = parse_pdf(pdf_path)
-        print(parsed.totals)
-
-        stem = pdf_path.stem
-        days_path = out_dir / f"{stem}.days.csv"
-        pairs_path = out_dir / f"{stem}.pairs.csv"
-        totals_path = out_dir / f"{stem}.totals.json"
-        report_path = out_dir / f"{stem}.report.json"
-
-        parsed.days_df.to_csv(days_path, index=False)
-        parsed.pairs_df.to_csv(pairs_path, index=False)
-        totals_path.write_text(json.dumps(parsed.totals, indent=2, ensure_ascii=False))
-        report = {
-            "meta": parsed.meta,
-            "totals": parsed.totals,
-            "validation": parsed.validation,
-        }
-        report_path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    cache = None
+    if args.cache_dir:
+        cache = ParseCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+    sink = None
+    if args.format == "parquet":
+        sink = DatasetWriter(out_dir, flush_rows=args.flush_rows)
+    elif args.format == "sqlite":
+        sink = ResultStore(out_dir / DB_NAME)
+    capture = None
+    if args.slow_seconds is not None or args.slow_mb is not None:
+        capture = SlowDocumentCapture(
+            Path(args.slow_dir) if args.slow_dir else out_dir / "slow",
+            max_seconds=args.slow_seconds,
+            max_peak_mb=args.slow_mb,
+        )
+    root = input_path if input_path.is_dir() else input_path.parent
+    index = None
+    if args.incremental:
+        index = ParseIndex(out_dir / INDEX_NAME, settings=f"{args.format}:{args.backend}")
+    counts = {"found": 0, "current": 0, "failed": 0}
+
+    def pending() -> Iterator[Path]:
+        for pdf_path, stat in _iter_pdfs(input_path, args.recursive):
+            counts["found"] += 1
+            if index is not None and index.is_current(pdf_path.relative_to(root).as_posix(), pdf_path, stat):
+                counts["current"] += 1
+                continue
+            yield pdf_path
+
+    # Documents handed to the sink whose rows it has not confirmed yet. The
+    # store commits on its own thread, so their index entries wait for it; a
+    # document it could not store gets none and is parsed again next run.
+    unconfirmed: dict[str, Path] = {}
+
+    def settle() -> None:
+        for document, store_error in sink.drain_settled().items():
+            pdf_path = unconfirmed.pop(document, None)
+            if pdf_path is None:
+                continue
+            if store_error is not None:
+                counts["failed"] += 1
+            elif index is not None:
+                index.record(document, pdf_path, [document])
+
+    jobs = 1 if input_path.is_file() else args.jobs or os.cpu_count() or 1
+    results = parse_many(pending(), jobs=jobs, ordered=True, backend=args.backend, cache=cache, capture=capture)
+    for pdf_path, parsed in results:
+        # Documents in subfolders keep their relative path, so equal file names do not clash.
+        relative = pdf_path.relative_to(root)
+        outputs: list[str] = []
+        error = None
+        if isinstance(parsed, Exception):
+            counts["failed"] += 1
+            error = f"{type(parsed).__name__}: {parsed}"
+            LOGGER.error("Failed to parse %s: %s", pdf_path, error)
+        else:
+            print(parsed.totals)
+            if sink is not None:
+                content_hash = hashlib.sha256(pdf_path.read_bytes()).hexdigest()
+                sink.add(parsed, document=relative.as_posix(), content_hash=content_hash)
+                unconfirmed[relative.as_posix()] = pdf_path
+                settle()
+                continue
+            (out_dir / relative.parent).mkdir(parents=True, exist_ok=True)
+            written = _write_csv(parsed, out_dir / relative.parent, pdf_path.stem)
+            outputs = [path.relative_to(out_dir).as_posix() for path in written]
+        if index is not None:
+            index.record(relative.as_posix(), pdf_path, outputs, error)
+    if sink is not None:
+        sink.flush()
+        settle()
+
+    if index is not None:
+        walked = "none" if input_path.is_file() else "recursive" if args.recursive else "top"
+        orphaned = index.orphans(walked)
+        orphan_outputs = [output for outputs in orphaned.values() for output in outputs]
+        if orphaned and args.orphans == "delete":
+            _drop_outputs(orphan_outputs, out_dir, sink)
+            index.forget(list(orphaned))
+            LOGGER.info("Deleted %s output(s) of %s missing or failing PDF(s)", len(orphan_outputs), len(orphaned))
+        elif orphaned:
+            (out_dir / ORPHANS_NAME).write_text(json.dumps(orphaned, indent=2, ensure_ascii=False))
+            LOGGER.warning(
+                "%s output(s) of %s missing or failing PDF(s) left in place, see %s",
+                len(orphan_outputs),
+                len(orphaned),
+                out_dir / ORPHANS_NAME,
+            )
+        if not orphaned or args.orphans == "delete":
+            (out_dir / ORPHANS_NAME).unlink(missing_ok=True)
+        index.close()
+        LOGGER.info(
+            "%s PDF(s) found, %s up to date, %s parsed",
+            counts["found"],
+            counts["current"],
+            counts["found"] - counts["current"],
+        )
+    if sink is not None:
+        sink.close()
+    if capture is not None and capture.captured:
+        index_path = Path(capture.out_dir) / "index.json"
+        index_path.write_text(json.dumps(capture.captured, indent=2, ensure_ascii=False))
+        LOGGER.warning("%s slow document(s) profiled, see %s", len(capture.captured), index_path)
 
+    for fp, entry in unknown_layouts().items():
+        LOGGER.warning(
+            "Unknown layout %s in %s document(s), e.g. %s",
+            fp,
+            entry["count"],
+            entry["samples"][0]["source"],
+        )
+    if counts["failed"]:
+        LOGGER.error("%s of %s document(s) failed to parse", counts["failed"], counts["found"])
+        return 1
     return 0
 
 
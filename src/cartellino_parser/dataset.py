@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from cartellino_parser.models import DAY_COLUMNS, PAIR_COLUMNS, ParsedCartellino
+from cartellino_parser.parse_totals import TOTAL_LABELS
+
+TABLES = ("days", "pairs", "totals")
+# Rows buffered across all tables before writing; each flush writes one file
+# (one row group) per touched employee/year partition.
+DEFAULT_FLUSH_ROWS = 200_000
+
+_ROW_KEY_COLUMNS = ["document", "employee_id"]
+
+
+def _schemas() -> Dict[str, Any]:
+    import pyarrow as pa
+
+    text = pa.string()
+    integer = pa.int64()
+    decimal = pa.float64()
+    days = {
+        "year": integer,
+        "month": integer,
+        "day": integer,
+        "dow": text,
+        "mo_f": decimal,
+        "mo_t": decimal,
+        "mo_lav": decimal,
+        "raw": text,
+    }
+    pairs = {
+        "year": integer,
+        "month": integer,
+        "day": integer,
+        "dow": text,
+        "pair_index": integer,
+        "entry_ts": pa.timestamp("us"),
+        "exit_ts": pa.timestamp("us"),
+        "duration_hhmm": text,
+        "turno": text,
+        "entry_raw": text,
+        "exit_raw": text,
+    }
+    totals = {
+        "content_hash": text,
+        "employee_name": text,
+        "year": integer,
+        "month": integer,
+        "layout": text,
+        **{key: decimal for key in TOTAL_LABELS},
+        "ore_lavorate_row_sum": decimal,
+        "is_ok": pa.bool_(),
+    }
+    key_fields = [pa.field(name, text) for name in _ROW_KEY_COLUMNS]
+    return {
+        "days": pa.schema(key_fields + [pa.field(name, days[name]) for name in DAY_COLUMNS]),
+        "pairs": pa.schema(key_fields + [pa.field(name, pairs[name]) for name in PAIR_COLUMNS]),
+        "totals": pa.schema(key_fields + [pa.field(name, kind) for name, kind in totals.items()]),
+    }
+
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(
+        pa.schema([("employee_id", pa.string()), ("year", pa.int64())]), flavor="hive"
+    )
+
+
+class DatasetWriter:
+    """Appends parsed cartellini to a Parquet dataset instead of per-document files.
+
+    Layout is ``<root>/<table>/employee_id=<id>/year=<year>/part-*.parquet`` for
+    the ``days``, ``pairs`` and ``totals`` tables. Rows are kept as Arrow tables
+    (timestamps stay timestamps) and written in bulk once ``flush_rows`` rows are
+    buffered, on ``flush()`` and on ``close()``. Safe to share between threads.
+
+    ``drain_settled()`` returns the documents whose rows reached disk since the
+    last call, so callers can record progress without forcing small flushes.
+    Writes only append: adding a document that is already in the dataset stores
+    its rows a second time.
+    """
+
+    def __init__(self, root: Union[str, Path], flush_rows: int = DEFAULT_FLUSH_ROWS) -> None:
+        self.root = Path(root)
+        self.flush_rows = flush_rows
+        self.rows_written = 0
+        self.files_written = 0
+        self._schemas = _schemas()
+        self._buffers: Dict[str, List[Any]] = {name: [] for name in TABLES}
+        self._buffered = 0
+        self._buffered_documents: List[str] = []
+        self._settled: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self._flush_ids = itertools.count()
+        self._token = uuid.uuid4().hex[:12]
+
+    def add(self, parsed: ParsedCartellino, document: str, content_hash: Optional[str] = None) -> None:
+        tables = self._to_tables(parsed, document, content_hash)
+        with self._lock:
+            for name, table in tables.items():
+                self._buffers[name].append(table)
+                self._buffered += table.num_rows
+            self._buffered_documents.append(document)
+            if self._buffered < self.flush_rows:
+                return
+            self._flush_locked()
+
+    def _to_tables(
+        self, parsed: ParsedCartellino, document: str, content_hash: Optional[str]
+    ) -> Dict[str, Any]:
+        import pyarrow as pa
+
+        keys = {"document": document, "employee_id": parsed.meta.get("employee_id")}
+        tables = {}
+        for name, frame in (("days", parsed.days_df), ("pairs", parsed.pairs_df)):
+            if frame.empty:
+                continue
+            tables[name] = pa.Table.from_pandas(
+                frame.assign(**keys), schema=self._schemas[name], preserve_index=False
+            )
+        totals_row = {
+            **keys,
+            "content_hash": content_hash,
+            "employee_name": parsed.meta.get("employee_name"),
+            "year": parsed.meta.get("year"),
+            "month": parsed.meta.get("month"),
+            "layout": parsed.meta.get("layout"),
+            **parsed.totals,
+            "ore_lavorate_row_sum": parsed.validation.get("ore_lavorate_row_sum"),
+            "is_ok": parsed.validation.get("is_ok"),
+        }
+        tables["totals"] = pa.Table.from_pylist([totals_row], schema=self._schemas["totals"])
+        return tables
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        flush_id = next(self._flush_ids)
+        for name in TABLES:
+            buffered = self._buffers[name]
+            if not buffered:
+                continue
+            table = pa.concat_tables(buffered)
+            self._buffers[name] = []
+
+            def count_file(written_file) -> None:
+                self.files_written += 1
+
+            ds.write_dataset(
+                table,
+                self.root / name,
+                format="parquet",
+                partitioning=_partitioning(),
+                basename_template=f"part-{self._token}-{flush_id:05d}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+                max_rows_per_group=max(table.num_rows, 1),
+                file_visitor=count_file,
+            )
+            self.rows_written += table.num_rows
+        self._buffered = 0
+        self._settled.update(dict.fromkeys(self._buffered_documents))
+        self._buffered_documents = []
+
+    def drain_settled(self) -> Dict[str, Optional[str]]:
+        """Documents written since the last call, mapped to ``None`` (no error)."""
+        with self._lock:
+            settled, self._settled = self._settled, {}
+        return settled
+
+    def close(self) -> None:
+        self.flush()
+
+    def describe(self, document: str) -> Dict[str, str]:
+        return {"dataset": str(self.root), "document": document}
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def read_table(root: Union[str, Path], name: str, filter: Optional[Any] = None):
+    """Load one table of a dataset written by ``DatasetWriter`` as a pandas DataFrame."""
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(Path(root) / name, format="parquet", partitioning=_partitioning())
+    return dataset.to_table(filter=filter).to_pandas()
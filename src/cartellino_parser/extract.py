@@ -1,16 +1,159 @@
 from __future__ import annotations
 
+import threading
+from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import BinaryIO, Union
+from typing import BinaryIO, Dict, Iterator, Optional, Sequence, Union
 
-import pdfplumber
+Source = Union[str, Path, BinaryIO]
 
+DEFAULT_BACKEND = "pdfplumber"
 
-def extract_text(source: Union[str, Path, BinaryIO]) -> str:
-    if isinstance(source, (str, Path)):
-        path = Path(source)
-        with pdfplumber.open(path) as pdf:
-            return "\n".join(page.extract_text() or "" for page in pdf.pages)
-    source.seek(0)
-    with pdfplumber.open(source) as pdf:
-        return "\n".join(page.extract_text() or "" for page in pdf.pages)
+
+def _normalize_page(text: str) -> str:
+    # Match pdfplumber's output: one space between words, no padding, "\n" breaks.
+    return "\n".join(" ".join(line.split()) for line in text.splitlines())
+
+
+class TextBackend(ABC):
+    """Turns a PDF into page texts. Instances are listed in ``BACKENDS`` by ``name``.
+
+    ``pages`` restricts extraction to the given 0-based page indexes.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def iter_page_texts(self, source: Source, pages: Optional[Sequence[int]] = None) -> Iterator[str]:
+        """Yield the text of each page, normalised to pdfplumber's spacing."""
+
+    @abstractmethod
+    def page_count(self, source: Source) -> int:
+        """Number of pages, without extracting any text."""
+
+
+class PdfplumberBackend(TextBackend):
+    name = "pdfplumber"
+
+    def iter_page_texts(self, source: Source, pages: Optional[Sequence[int]] = None) -> Iterator[str]:
+        import pdfplumber
+
+        page_numbers = None if pages is None else [index + 1 for index in pages]
+        if isinstance(source, (str, Path)):
+            pdf = pdfplumber.open(Path(source), pages=page_numbers)
+        else:
+            source.seek(0)
+            pdf = pdfplumber.open(source, pages=page_numbers)
+        with pdf:
+            for page in pdf.pages:
+                try:
+                    yield page.extract_text() or ""
+                finally:
+                    # Drop the page's chars/layout objects before moving on, so peak
+                    # memory stays at one page regardless of the document length.
+                    page.close()
+
+    def page_count(self, source: Source) -> int:
+        import pdfplumber
+
+        if not isinstance(source, (str, Path)):
+            source.seek(0)
+        with pdfplumber.open(source) as pdf:
+            return len(pdf.pages)
+
+
+class PypdfBackend(TextBackend):
+    name = "pypdf"
+
+    def iter_page_texts(self, source: Source, pages: Optional[Sequence[int]] = None) -> Iterator[str]:
+        from pypdf import PdfReader
+
+        if not isinstance(source, (str, Path)):
+            source.seek(0)
+        reader = PdfReader(source)
+        for index in range(len(reader.pages)) if pages is None else pages:
+            yield _normalize_page(reader.pages[index].extract_text() or "")
+
+    def page_count(self, source: Source) -> int:
+        from pypdf import PdfReader
+
+        if not isinstance(source, (str, Path)):
+            source.seek(0)
+        return len(PdfReader(source).pages)
+
+
+class PdfiumBackend(TextBackend):
+    """pypdfium2 (C, releases the GIL). PDFium itself is not thread-safe, so calls
+    into it are serialised with a process-wide lock."""
+
+    name = "pypdfium2"
+    _lock = threading.Lock()
+
+    def iter_page_texts(self, source: Source, pages: Optional[Sequence[int]] = None) -> Iterator[str]:
+        import pypdfium2 as pdfium
+
+        if not isinstance(source, (str, Path)):
+            source.seek(0)
+            source = source.read()
+        with self._lock:
+            pdf = pdfium.PdfDocument(source)
+        try:
+            for index in range(len(pdf)) if pages is None else pages:
+                with self._lock:
+                    page = pdf[index]
+                    textpage = page.get_textpage()
+                    text = textpage.get_text_range()
+                    textpage.close()
+                    page.close()
+                yield _normalize_page(text)
+        finally:
+            with self._lock:
+                pdf.close()
+
+    def page_count(self, source: Source) -> int:
+        import pypdfium2 as pdfium
+
+        if not isinstance(source, (str, Path)):
+            source.seek(0)
+            source = source.read()
+        with self._lock:
+            pdf = pdfium.PdfDocument(source)
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+
+
+BACKENDS: Dict[str, TextBackend] = {
+    backend.name: backend for backend in (PdfplumberBackend(), PypdfBackend(), PdfiumBackend())
+}
+
+
+def get_backend(name: str) -> TextBackend:
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown text backend {name!r}; available: {', '.join(sorted(BACKENDS))}"
+        ) from None
+
+
+def iter_page_texts(
+    source: Source, backend: str = DEFAULT_BACKEND, pages: Optional[Sequence[int]] = None
+) -> Iterator[str]:
+    return get_backend(backend).iter_page_texts(source, pages)
+
+
+def page_count(source: Source, backend: str = DEFAULT_BACKEND) -> int:
+    return get_backend(backend).page_count(source)
+
+
+def iter_lines(
+    source: Source, backend: str = DEFAULT_BACKEND, pages: Optional[Sequence[int]] = None
+) -> Iterator[str]:
+    for text in iter_page_texts(source, backend, pages):
+        yield from text.splitlines()
+
+
+def extract_text(source: Source, backend: str = DEFAULT_BACKEND) -> str:
+    return "\n".join(iter_page_texts(source, backend))
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from cartellino_parser.cache import parser_version
+
+INDEX_NAME = "parse_index.db"
+# Index rows are committed in batches; a crash only costs the re-parse of the last few.
+COMMIT_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inputs (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    content_hash TEXT,
+    parser_version TEXT,
+    settings TEXT,
+    outputs TEXT,
+    error TEXT,
+    parsed_at REAL
+);
+"""
+
+
+def scan_pdfs(root: Union[str, Path], recursive: bool = False) -> Iterator[Tuple[Path, os.stat_result]]:
+    """Yield ``(path, stat)`` for the PDFs under ``root`` as the tree is walked.
+
+    Each directory is listed with ``os.scandir`` and sorted on its own, so the
+    order is stable without materialising the whole tree first.
+    """
+    stack = [Path(root)]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir():
+                if recursive:
+                    subdirs.append(Path(entry.path))
+            elif entry.name.lower().endswith(".pdf") and entry.is_file():
+                yield Path(entry.path), entry.stat()
+        stack.extend(reversed(subdirs))
+
+
+def file_hash(path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class IndexEntry:
+    size: int
+    mtime_ns: int
+    content_hash: Optional[str]
+    parser_version: str
+    settings: str
+    outputs: List[str]
+    error: Optional[str]
+
+
+class ParseIndex:
+    """Which input PDFs an output folder was built from, and what they produced.
+
+    One row per input (keyed by its path relative to the input root) holds the
+    size, mtime, content hash, parser version and output settings of the last
+    parse, and the outputs it wrote (CSV paths relative to the output folder, or
+    the document name in the sqlite store). An input is current when all of
+    those still match; a changed size or mtime costs one hash, so a ``touch``
+    or a fresh copy of the same file is not re-parsed. Failed parses are
+    recorded too and retried only once the file or the parser changes.
+    """
+
+    def __init__(self, path: Union[str, Path], settings: str, version: Optional[str] = None) -> None:
+        self.path = Path(path)
+        self.settings = settings
+        self.version = version or parser_version()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(SCHEMA)
+        self._entries: Dict[str, IndexEntry] = {}
+        for row in self._conn.execute(
+            "SELECT path, size, mtime_ns, content_hash, parser_version, settings, outputs, error FROM inputs"
+        ):
+            key, size, mtime_ns, content_hash, version_, settings_, outputs, error = row
+            self._entries[key] = IndexEntry(
+                size, mtime_ns, content_hash, version_, settings_, json.loads(outputs or "[]"), error
+            )
+        self._pending = 0
+        self.seen: Set[str] = set()
+        # Stat and (when computed) hash of the inputs about to be parsed, as scanned.
+        self._scanned: Dict[str, Tuple[os.stat_result, Optional[str]]] = {}
+
+    def is_current(self, key: str, path: Path, stat: os.stat_result) -> bool:
+        """Whether ``key`` needs no parse; also marks it as seen in this run."""
+        self.seen.add(key)
+        entry = self._entries.get(key)
+        if entry is None or entry.parser_version != self.version or entry.settings != self.settings:
+            self._scanned[key] = (stat, None)
+            return False
+        if entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            return True
+        content_hash = file_hash(path)
+        if content_hash != entry.content_hash:
+            self._scanned[key] = (stat, content_hash)
+            return False
+        entry.size, entry.mtime_ns = stat.st_size, stat.st_mtime_ns
+        self._conn.execute(
+            "UPDATE inputs SET size = ?, mtime_ns = ? WHERE path = ?", (entry.size, entry.mtime_ns, key)
+        )
+        self._committed()
+        return True
+
+    def record(self, key: str, path: Path, outputs: List[str], error: Optional[str] = None) -> None:
+        """Store the outcome of a parse.
+
+        A failed parse keeps the outputs of the last good one, which are then
+        reported by ``orphans`` until they are dropped or the PDF parses again.
+        """
+        stat, content_hash = self._scanned.pop(key, None) or (path.stat(), None)
+        content_hash = content_hash or file_hash(path)
+        previous = self._entries.get(key)
+        if error is not None and previous is not None:
+            outputs = previous.outputs
+        self._entries[key] = IndexEntry(
+            stat.st_size, stat.st_mtime_ns, content_hash, self.version, self.settings, outputs, error
+        )
+        self._conn.execute(
+            "INSERT OR REPLACE INTO inputs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                stat.st_size,
+                stat.st_mtime_ns,
+                content_hash,
+                self.version,
+                self.settings,
+                json.dumps(outputs),
+                error,
+                time.time(),
+            ),
+        )
+        self._committed()
+
+    def orphans(self, walked: str = "recursive") -> Dict[str, List[str]]:
+        """Outputs whose PDF no longer parses, or was not found by this run, by input.
+
+        ``walked`` says how much of the input tree the run looked at:
+        ``"recursive"``, ``"top"`` (no subfolders) or ``"none"`` (a single
+        file). Inputs outside of it are not considered missing.
+        """
+        found = {}
+        for key, entry in self._entries.items():
+            if not entry.outputs:
+                continue
+            in_scope = walked == "recursive" or (walked == "top" and "/" not in key)
+            if entry.error is not None or (in_scope and key not in self.seen):
+                found[key] = entry.outputs
+        return found
+
+    def forget(self, keys: List[str]) -> None:
+        """Drop the outputs of ``keys``: missing inputs leave the index, failing ones stay."""
+        for key in keys:
+            if key in self.seen:
+                self._entries[key].outputs = []
+                self._conn.execute("UPDATE inputs SET outputs = '[]' WHERE path = ?", (key,))
+            else:
+                self._entries.pop(key, None)
+                self._conn.execute("DELETE FROM inputs WHERE path = ?", (key,))
+        self._committed(force=True)
+
+    def _committed(self, force: bool = False) -> None:
+        self._pending += 1
+        if force or self._pending >= COMMIT_EVERY:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        self._conn.commit()
+        self._conn.close()
+
+    def __enter__(self) -> "ParseIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
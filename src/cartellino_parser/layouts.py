@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from cartellino_parser.parse_days import DAY_LINE_RE
+from cartellino_parser.scanner import ScanResult, ScanState
+
+SECTION_RE = re.compile(r"RIEPILOGO [A-Z/]+")
+HEADING_TOKEN_RE = re.compile(r"[A-Z][A-Z./]*")
+UNKNOWN_SAMPLE_LIMIT = 5
+SAMPLE_HEADER_LINES = 12
+
+
+@dataclass(frozen=True)
+class Layout:
+    name: str
+    fingerprint: str
+    scan: Callable[[Iterable[str]], ScanResult]
+
+
+LAYOUTS: Dict[str, Layout] = {}
+
+_unknown_lock = threading.Lock()
+_unknown_counts: Counter = Counter()
+_unknown_samples: Dict[Optional[str], List[Dict[str, Any]]] = {}
+
+
+def layout_signature(first_page: Iterable[str]) -> str | None:
+    """Structural part of page 1: report title, section title and column headings.
+
+    Names, dates, page numbers and the month are left out so that every document
+    printed from the same template yields the same signature. ``None`` means the
+    page carries none of the cartellino markers.
+    """
+    title = section = headings = ""
+    for line in first_page:
+        if not title and "cartellino" in line.lower():
+            title = " ".join(line.lower().split())
+        if not section:
+            match = SECTION_RE.search(line)
+            if match:
+                section = match.group(0)
+        if line.startswith("GIORNO"):
+            headings = " ".join(HEADING_TOKEN_RE.findall(line))
+            break
+    if not section and not headings:
+        return None
+    return f"{title}|{section}|{headings}"
+
+
+def fingerprint(first_page: Iterable[str]) -> str | None:
+    signature = layout_signature(first_page)
+    if signature is None:
+        return None
+    return hashlib.sha1(signature.encode("utf-8")).hexdigest()[:12]
+
+
+def register_layout(
+    fingerprint: str, name: str, scan: Callable[[Iterable[str]], ScanResult]
+) -> Layout:
+    layout = Layout(name=name, fingerprint=fingerprint, scan=scan)
+    LAYOUTS[fingerprint] = layout
+    return layout
+
+
+def resolve_layout(fp: str | None, source: Any, first_page: List[str]) -> Layout | None:
+    layout = LAYOUTS.get(fp) if fp else None
+    if layout is None:
+        record_unknown_layout(fp, source, first_page)
+    return layout
+
+
+def record_unknown_layout(fp: str | None, source: Any, first_page: List[str]) -> None:
+    with _unknown_lock:
+        _unknown_counts[fp] += 1
+        samples = _unknown_samples.setdefault(fp, [])
+        if len(samples) < UNKNOWN_SAMPLE_LIMIT:
+            samples.append(
+                {
+                    "source": str(getattr(source, "name", source)),
+                    "header": first_page[:SAMPLE_HEADER_LINES],
+                }
+            )
+
+
+def unknown_layouts() -> Dict[str, Dict[str, Any]]:
+    """Counts and a few header samples of the unregistered layouts seen so far."""
+    with _unknown_lock:
+        return {
+            str(fp): {"count": count, "samples": list(_unknown_samples.get(fp, []))}
+            for fp, count in _unknown_counts.most_common()
+        }
+
+
+def merge_unknown_layouts(found: Dict[str, Dict[str, Any]]) -> None:
+    """Add the ``unknown_layouts()`` of a worker process to this process's."""
+    with _unknown_lock:
+        for key, entry in found.items():
+            fp = None if key == "None" else key
+            _unknown_counts[fp] += entry["count"]
+            samples = _unknown_samples.setdefault(fp, [])
+            samples.extend(entry["samples"][: UNKNOWN_SAMPLE_LIMIT - len(samples)])
+
+
+def reset_unknown_layouts() -> None:
+    with _unknown_lock:
+        _unknown_counts.clear()
+        _unknown_samples.clear()
+
+
+def scan_riepilogo_presenze(lines: Iterable[str]) -> ScanResult:
+    """Section-aware scanner for the INSIEL "RIEPILOGO PRESENZE/ASSENZE" template.
+
+    Each page is a header (meta), the day table opened by the ``GIORNO`` column
+    headings and closed by a rule line, then the justification/totals block.
+    Every line is only offered to the classifier of its section.
+    """
+    state = ScanState()
+    section = "header"
+    for line in lines:
+        if "RIEPILOGO" in line:
+            # Page header; on multi-page documents the day table may continue after it.
+            section = "header"
+            state.feed_meta(line)
+        elif section == "days":
+            if line.startswith("-"):
+                section = "footer"
+            else:
+                state.feed_day(line, DAY_LINE_RE.match(line.strip()))
+        elif section == "footer":
+            state.feed_totals(line)
+        else:
+            if line.startswith("GIORNO"):
+                section = "days"
+            else:
+                state.feed_meta(line)
+    return state.result()
+
+
+RIEPILOGO_PRESENZE_V1 = register_layout(
+    fingerprint="5a9428eab539",
+    name="riepilogo_presenze_v1",
+    scan=scan_riepilogo_presenze,
+)
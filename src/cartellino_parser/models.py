@@ -2,15 +2,40 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
-import pandas as pd
+if TYPE_CHECKING:
+    import pandas as pd
+
+DAY_COLUMNS = ["year", "month", "day", "dow", "mo_f", "mo_t", "mo_lav", "raw"]
+PAIR_COLUMNS = [
+    "year",
+    "month",
+    "day",
+    "dow",
+    "pair_index",
+    "entry_ts",
+    "exit_ts",
+    "duration_hhmm",
+    "turno",
+    "entry_raw",
+    "exit_raw",
+]
 
 
 class CartellinoParseError(RuntimeError):
     pass
 
 
+class UnknownLayoutError(CartellinoParseError):
+    """The first page matches no known layout. ``fingerprint`` is the page's layout
+    fingerprint, or ``None`` when it does not look like a cartellino at all."""
+
+    def __init__(self, message: str, fingerprint: Optional[str] = None) -> None:
+        super().__init__(message)
+        self.fingerprint = fingerprint
+
+
 @dataclass(frozen=True)
 class DayRecord:
     year: Optional[int]
@@ -45,3 +70,26 @@ class ParsedCartellino:
     pairs_df: pd.DataFrame
     totals: Dict[str, Any]
     validation: Dict[str, Any]
+
+    def to_record(self) -> Dict[str, Any]:
+        # Plain tuples pickle far smaller and faster than DataFrames, which matters
+        # when results cross a process boundary.
+        return {
+            "meta": self.meta,
+            "days": list(self.days_df.itertuples(index=False, name=None)),
+            "pairs": list(self.pairs_df.itertuples(index=False, name=None)),
+            "totals": self.totals,
+            "validation": self.validation,
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "ParsedCartellino":
+        import pandas as pd
+
+        return cls(
+            meta=record["meta"],
+            days_df=pd.DataFrame(record["days"], columns=DAY_COLUMNS),
+            pairs_df=pd.DataFrame(record["pairs"], columns=PAIR_COLUMNS),
+            totals=record["totals"],
+            validation=record["validation"],
+        )
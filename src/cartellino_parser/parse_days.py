@@ -2,47 +2,90 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import Iterable, List
+from typing import Iterable, List, Tuple
 
-from cartellino_parser.models import DayRecord
-from cartellino_parser.utils import extract_numeric_tokens, hhmm_to_decimal, parse_number
+import numpy as np
+import pandas as pd
+
+from cartellino_parser.models import DAY_COLUMNS
+from cartellino_parser.utils import NUMBER_RE, parse_number
 
 LOGGER = logging.getLogger(__name__)
 
 DAY_LINE_RE = re.compile(r"^(?P<day>0[1-9]|[12][0-9]|3[01])\s+(?P<dow>LU|MA|ME|GI|VE|SA|DO)\b")
 
+# (day, dow, mo_f, mo_t, mo_lav, raw line) with the three hours still in h.mm
+# notation; they are converted to decimal hours column-wise in ``build_days_df``.
+RawDay = Tuple[int, str, float, float, float, str]
 
-def _parse_day_line(line: str, year: int | None, month: int | None) -> DayRecord | None:
-    match = DAY_LINE_RE.match(line.strip())
-    if not match:
-        return None
 
-    rest = line[match.end() :].strip()
-    numbers = extract_numeric_tokens(rest)
+def constant_column(value: int | None, size: int) -> np.ndarray:
+    """``value`` repeated ``size`` times; ``None`` gives an object column, as pandas would infer."""
+    if value is None:
+        return np.full(size, None, dtype=object)
+    return np.full(size, value, dtype=np.int64)
+
+
+def hhmm_to_decimal_array(values: np.ndarray) -> np.ndarray:
+    """Vectorised ``hhmm_to_decimal``: same rounding, same float results."""
+    values = np.asarray(values, dtype=np.float64)
+    abs_values = np.abs(values)
+    hours = np.trunc(abs_values)
+    # np.round rounds half to even, exactly like the builtin round().
+    minutes = np.round((abs_values - hours) * 100)
+    sign = np.where(values < 0, -1.0, 1.0)
+    return sign * (hours + minutes / 60.0)
+
+
+def day_tokens(line: str, match: re.Match) -> Tuple[float, float, float] | None:
+    # Only the last three numeric tokens are used, so the line is read from the
+    # end and the stamps and codes before them are never matched.
+    numbers: List[str] = []
+    for token in reversed(line[match.end() :].split()):
+        if NUMBER_RE.fullmatch(token):
+            numbers.append(token)
+            if len(numbers) == 3:
+                break
     if len(numbers) < 3:
         LOGGER.debug("Day line has fewer than 3 numeric tokens: %s", line)
         return None
 
-    mo_f_raw, mo_t_raw, mo_lav_raw = (parse_number(value) for value in numbers[-3:])
-    mo_f = hhmm_to_decimal(mo_f_raw)
-    mo_t = hhmm_to_decimal(mo_t_raw)
-    mo_lav = hhmm_to_decimal(mo_lav_raw)
-    return DayRecord(
-        year=year,
-        month=month,
-        day=int(match.group("day")),
-        dow=match.group("dow"),
-        mo_f=mo_f,
-        mo_t=mo_t,
-        mo_lav=mo_lav,
-        raw=line,
+    mo_lav_raw, mo_t_raw, mo_f_raw = map(parse_number, numbers)
+    return mo_f_raw, mo_t_raw, mo_lav_raw
+
+
+def build_days_df(raw_days: List[RawDay], year: int | None, month: int | None) -> pd.DataFrame:
+    if not raw_days:
+        return pd.DataFrame(columns=DAY_COLUMNS)
+    days, dows, mo_f, mo_t, mo_lav, raws = zip(*raw_days)
+    hours = hhmm_to_decimal_array(np.array([mo_f, mo_t, mo_lav], dtype=np.float64))
+    size = len(days)
+    return pd.DataFrame(
+        {
+            "year": constant_column(year, size),
+            "month": constant_column(month, size),
+            "day": np.array(days, dtype=np.int64),
+            "dow": np.array(dows, dtype=object),
+            "mo_f": hours[0],
+            "mo_t": hours[1],
+            "mo_lav": hours[2],
+            "raw": np.array(raws, dtype=object),
+        },
+        columns=DAY_COLUMNS,
     )
 
 
-def parse_days(lines: Iterable[str], year: int | None, month: int | None) -> List[DayRecord]:
-    records: List[DayRecord] = []
+def collect_days(lines: Iterable[str]) -> List[RawDay]:
+    raw_days: List[RawDay] = []
     for line in lines:
-        record = _parse_day_line(line, year, month)
-        if record:
-            records.append(record)
-    return records
+        match = DAY_LINE_RE.match(line.strip())
+        if not match:
+            continue
+        values = day_tokens(line, match)
+        if values is not None:
+            raw_days.append((int(match.group("day")), match.group("dow"), *values, line))
+    return raw_days
+
+
+def parse_days(lines: Iterable[str], year: int | None, month: int | None) -> pd.DataFrame:
+    return build_days_df(collect_days(lines), year, month)
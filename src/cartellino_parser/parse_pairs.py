@@ -1,14 +1,15 @@
 from __future__ import annotations
 
+import calendar
 import logging
 import re
-from dataclasses import asdict
-from datetime import datetime, timedelta
 from typing import Iterable, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
-from cartellino_parser.models import PairRecord
+from cartellino_parser.models import PAIR_COLUMNS
+from cartellino_parser.parse_days import constant_column
 
 LOGGER = logging.getLogger(__name__)
 
@@ -16,192 +17,171 @@ DAY_LINE_RE = re.compile(r"^(?P<day>0[1-9]|[12][0-9]|3[01])\s+(?P<dow>LU|MA|ME|G
 EVENT_RE = re.compile(r"\b(?P<kind>[EU])\s*\(?(?P<time>\d{2}:\d{2})\)?")
 
 
-def _append_pair(
-    pairs: List[PairRecord],
-    year: int | None,
-    month: int | None,
-    day: int,
-    dow: str,
-    pair_index: int,
-    entry: Optional[Tuple[str, str]],
-    exit_time: Optional[str],
-    exit_raw: Optional[str],
-) -> None:
-    entry_time = entry[0] if entry else None
-    entry_raw = entry[1] if entry else None
-    entry_ts = _build_datetime(year, month, day, entry_time)
-    exit_ts = _build_datetime(year, month, day, exit_time)
-    if entry_ts and exit_ts and exit_ts < entry_ts:
-        exit_ts = exit_ts + timedelta(days=1)
-    duration_hhmm = _compute_duration(entry_ts, exit_ts)
-    turno = _compute_turno(entry_ts)
-    pairs.append(
-        PairRecord(
-            year=year,
-            month=month,
-            day=day,
-            dow=dow,
-            pair_index=pair_index,
-            entry_ts=entry_ts,
-            exit_ts=exit_ts,
-            duration_hhmm=duration_hhmm,
-            turno=turno,
-            entry_raw=entry_raw,
-            exit_raw=exit_raw,
-        )
-    )
+MINUTES_PER_DAY = 24 * 60
+TURNO_LABELS = np.array(["Mattina", "Pomeriggio", "Notte"], dtype=object)
+# Start of each shift in minutes after midnight; an entry belongs to the closest
+# one (ties go to the earlier shift).
+TURNO_STARTS = np.array([8 * 60, 14 * 60, 20 * 60])
+# "HH:MM" for every possible pair duration (at most one day after rollover).
+DURATION_LABELS = np.array(
+    [f"{minutes // 60:02d}:{minutes % 60:02d}" for minutes in range(2 * MINUTES_PER_DAY + 1)],
+    dtype=object,
+)
 
 
-def _build_datetime(
-    year: int | None, month: int | None, day: int, time_value: Optional[str]
-) -> Optional[datetime]:
-    if not time_value or year is None or month is None:
-        return None
-    hours, minutes = time_value.split(":")
-    hours_i = int(hours)
-    minutes_i = int(minutes)
-    if hours_i == 24 and minutes_i == 0:
-        return datetime(year, month, day, 0, 0) + timedelta(days=1)
-    return datetime(year, month, day, hours_i, minutes_i)
-
-
-def _compute_duration(entry_ts: Optional[datetime], exit_ts: Optional[datetime]) -> Optional[str]:
-    if not entry_ts or not exit_ts:
-        return None
-    delta = exit_ts - entry_ts
-    minutes = int(delta.total_seconds() // 60)
-    hours = minutes // 60
-    mins = minutes % 60
-    return f"{hours:02d}:{mins:02d}"
-
-
-def _compute_turno(entry_ts: Optional[datetime]) -> Optional[str]:
-    if not entry_ts:
-        return None
-    entry_minutes = entry_ts.hour * 60 + entry_ts.minute
-    targets = {
-        "Mattina": 8 * 60,
-        "Pomeriggio": 14 * 60,
-        "Notte": 20 * 60,
-    }
-    closest = min(targets.items(), key=lambda item: abs(entry_minutes - item[1]))
-    return closest[0]
+def _clock_minutes(times: List[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Minutes after midnight of ``HH:MM`` strings (``24:00`` is 1440) and a validity mask."""
+    valid = np.array([time is not None for time in times], dtype=bool)
+    # EVENT_RE guarantees two-digit fields, so the digits sit at fixed offsets.
+    text = "".join(time if time is not None else "00:00" for time in times)
+    digits = np.frombuffer(text.encode("ascii"), dtype=np.uint8).reshape(-1, 5).astype(np.int64) - 48
+    minutes = (digits[:, 0] * 10 + digits[:, 1]) * 60 + digits[:, 3] * 10 + digits[:, 4]
+    return minutes, valid
 
 
-def parse_pairs(lines: Iterable[str], year: int | None, month: int | None) -> pd.DataFrame:
-    pairs: List[PairRecord] = []
-    current_day: Optional[int] = None
-    current_dow: Optional[str] = None
-    current_entry: Optional[Tuple[str, str]] = None
-    # pair_index orders emitted pairs within the current day; it resets on day change.
-    pair_index = 0
+def _day_starts(year: int, month: int, days: np.ndarray) -> np.ndarray:
+    last_day = calendar.monthrange(year, month)[1]
+    if days.size and (days.min() < 1 or days.max() > last_day):
+        raise ValueError("day is out of range for month")
+    month_start = np.datetime64(f"{year:04d}-{month:02d}-01", "m")
+    return month_start + (days - 1) * MINUTES_PER_DAY
 
-    for line in lines:
-        stripped = line.strip()
-        match = DAY_LINE_RE.match(stripped)
-        if match:
-            day = int(match.group("day"))
-            dow = match.group("dow")
-            if current_day is None:
-                current_day, current_dow, pair_index = day, dow, 0
-            elif day != current_day or dow != current_dow:
-                if current_entry is not None:
-                    _append_pair(
-                        pairs,
-                        year,
-                        month,
-                        current_day,
-                        current_dow,
-                        pair_index,
-                        current_entry,
-                        None,
-                        None,
-                    )
-                    pair_index += 1
-                    current_entry = None
-                current_day, current_dow, pair_index = day, dow, 0
-
-        if current_day is None:
-            continue
-
-        events = list(EVENT_RE.finditer(line))
-        if not events:
-            continue
-
-        for event in events:
-            kind = event.group("kind")
+
+def _timestamp_column(stamps: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    if not valid.any():
+        return np.full(len(valid), None, dtype=object)
+    return np.where(valid, stamps, np.datetime64("NaT")).astype("datetime64[us]")
+
+
+def _optional_column(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    return np.where(valid, values, None).astype(object)
+
+
+# (day, dow, pair_index, entry, exit_time, exit_raw), as collected before any
+# timestamps are built.
+RawPair = Tuple[int, str, int, Optional[Tuple[str, str]], Optional[str], Optional[str]]
+
+
+class PairCollector:
+    """E/U state machine, fed one line at a time.
+
+    Shared by ``parse_pairs`` and the single-pass scanner so both pair events
+    in exactly the same way.
+    """
+
+    def __init__(self) -> None:
+        self.pairs: List[RawPair] = []
+        self.current_day: Optional[int] = None
+        self.current_dow: Optional[str] = None
+        self.current_entry: Optional[Tuple[str, str]] = None
+        # pair_index orders emitted pairs within the current day; it resets on day change.
+        self.pair_index = 0
+
+    def _emit(
+        self,
+        entry: Optional[Tuple[str, str]],
+        exit_time: Optional[str],
+        exit_raw: Optional[str],
+    ) -> None:
+        self.pairs.append(
+            (self.current_day, self.current_dow, self.pair_index, entry, exit_time, exit_raw)
+        )
+        self.pair_index += 1
+
+    def feed(self, line: str, day_match: Optional[re.Match] = None) -> None:
+        if day_match:
+            day = int(day_match.group("day"))
+            dow = day_match.group("dow")
+            if self.current_day is None:
+                self.current_day, self.current_dow, self.pair_index = day, dow, 0
+            elif day != self.current_day or dow != self.current_dow:
+                if self.current_entry is not None:
+                    self._emit(self.current_entry, None, None)
+                    self.current_entry = None
+                self.current_day, self.current_dow, self.pair_index = day, dow, 0
+
+        if self.current_day is None or ":" not in line:
+            return
+
+        for event in EVENT_RE.finditer(line):
             time_value = event.group("time")
-            if kind == "E":
-                if current_entry is not None:
-                    _append_pair(
-                        pairs,
-                        year,
-                        month,
-                        current_day or day,
-                        current_dow or dow,
-                        pair_index,
-                        current_entry,
-                        None,
-                        None,
-                    )
-                    pair_index += 1
-                current_entry = (time_value, line)
+            if event.group("kind") == "E":
+                if self.current_entry is not None:
+                    self._emit(self.current_entry, None, None)
+                self.current_entry = (time_value, line)
             else:
-                if current_entry is None:
-                    _append_pair(
-                        pairs,
-                        year,
-                        month,
-                        current_day or day,
-                        current_dow or dow,
-                        pair_index,
-                        None,
-                        time_value,
-                        line,
-                    )
-                    pair_index += 1
-                else:
-                    _append_pair(
-                        pairs,
-                        year,
-                        month,
-                        current_day or day,
-                        current_dow or dow,
-                        pair_index,
-                        current_entry,
-                        time_value,
-                        line,
-                    )
-                    pair_index += 1
-                    current_entry = None
-
-    if current_entry and current_day is not None and current_dow is not None:
-        _append_pair(
-            pairs,
-            year,
-            month,
-            current_day,
-            current_dow,
-            pair_index,
-            current_entry,
-            None,
-            None,
-        )
+                self._emit(self.current_entry, time_value, line)
+                self.current_entry = None
+
+    def finish(self) -> List[RawPair]:
+        if self.current_entry and self.current_day is not None and self.current_dow is not None:
+            self._emit(self.current_entry, None, None)
+            self.current_entry = None
+        return self.pairs
+
+
+def build_pairs_df(raw_pairs: Iterable[RawPair], year: int | None, month: int | None) -> pd.DataFrame:
+    """Turn collected E/U events into the pairs table, one column at a time.
+
+    Timestamps, overnight rollover (an exit earlier than its entry belongs to
+    the next day), durations and shifts are computed on arrays; ``24:00`` is
+    midnight of the next day. Without a year and month there are no timestamps.
+    """
+    raw_pairs = list(raw_pairs)
+    if not raw_pairs:
+        return pd.DataFrame(columns=PAIR_COLUMNS)
+    days, dows, pair_indexes, entries, exit_times, exit_raws = zip(*raw_pairs)
+    size = len(raw_pairs)
+    days_arr = np.array(days, dtype=np.int64)
+    entry_times = [entry[0] if entry else None for entry in entries]
+    entry_raws = [entry[1] if entry else None for entry in entries]
+
+    if year is None or month is None:
+        no_value = np.zeros(size, dtype=bool)
+        entry_valid = exit_valid = no_value
+        entry_ts = exit_ts = np.full(size, None, dtype=object)
+        duration = turno = np.full(size, None, dtype=object)
+    else:
+        day_starts = _day_starts(year, month, days_arr)
+        entry_minutes, entry_valid = _clock_minutes(entry_times)
+        exit_minutes, exit_valid = _clock_minutes(list(exit_times))
+        entry_stamps = day_starts + entry_minutes
+        exit_stamps = day_starts + exit_minutes
+        both = entry_valid & exit_valid
+        exit_stamps = np.where(both & (exit_stamps < entry_stamps), exit_stamps + MINUTES_PER_DAY, exit_stamps)
+
+        minutes = (exit_stamps - entry_stamps).astype(np.int64)
+        duration = _optional_column(DURATION_LABELS[np.where(both, minutes, 0)], both)
+        clock = entry_minutes % MINUTES_PER_DAY
+        closest = np.abs(clock[:, None] - TURNO_STARTS).argmin(axis=1)
+        turno = _optional_column(TURNO_LABELS[closest], entry_valid)
+        entry_ts = _timestamp_column(entry_stamps, entry_valid)
+        exit_ts = _timestamp_column(exit_stamps, exit_valid)
 
-    rows = [asdict(record) for record in pairs]
     return pd.DataFrame(
-        rows,
-        columns=[
-            "year",
-            "month",
-            "day",
-            "dow",
-            "pair_index",
-            "entry_ts",
-            "exit_ts",
-            "duration_hhmm",
-            "turno",
-            "entry_raw",
-            "exit_raw",
-        ],
+        {
+            "year": constant_column(year, size),
+            "month": constant_column(month, size),
+            "day": days_arr,
+            "dow": np.array(dows, dtype=object),
+            "pair_index": np.array(pair_indexes, dtype=np.int64),
+            "entry_ts": entry_ts,
+            "exit_ts": exit_ts,
+            "duration_hhmm": duration,
+            "turno": turno,
+            "entry_raw": np.array(entry_raws, dtype=object),
+            "exit_raw": np.array(exit_raws, dtype=object),
+        },
+        columns=PAIR_COLUMNS,
     )
+
+
+def collect_pairs(lines: Iterable[str]) -> List[RawPair]:
+    collector = PairCollector()
+    for line in lines:
+        collector.feed(line, DAY_LINE_RE.match(line.strip()))
+    return collector.finish()
+
+
+def parse_pairs(lines: Iterable[str], year: int | None, month: int | None) -> pd.DataFrame:
+    return build_pairs_df(collect_pairs(lines), year, month)
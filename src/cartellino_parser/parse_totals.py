@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import re
-from typing import Dict
+from typing import Dict, Iterable, Union
 
 from cartellino_parser.utils import hhmm_to_decimal, parse_number
 
@@ -16,11 +16,18 @@ TOTAL_LABELS = {
 }
 
 
-def parse_totals(text: str) -> Dict[str, float]:
+TOTAL_PATTERNS = {
+    key: re.compile(rf"{re.escape(label)}\s+(?P<val>[+-]?\d+(?:\.\d+)?)")
+    for key, label in TOTAL_LABELS.items()
+}
+
+
+def parse_totals(lines: Union[str, Iterable[str]]) -> Dict[str, float]:
+    # Searched as one text: a value may be on the line after its label.
+    text = lines if isinstance(lines, str) else "\n".join(lines)
     totals: Dict[str, float] = {}
-    for key, label in TOTAL_LABELS.items():
-        pattern = rf"{re.escape(label)}\s+(?P<val>[+-]?\d+(?:\.\d+)?)"
-        match = re.search(pattern, text)
+    for key, pattern in TOTAL_PATTERNS.items():
+        match = pattern.search(text)
         if match:
             totals[key] = hhmm_to_decimal(parse_number(match.group("val")))
     return totals
@@ -1,67 +1,154 @@
 from __future__ import annotations
 
+import io
 import logging
-from dataclasses import asdict
-from typing import Any, Dict, Iterable, List
+import time
+from itertools import chain
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, Optional, Sequence
 
 import pandas as pd
 
-from cartellino_parser.extract import extract_text
-from cartellino_parser.models import CartellinoParseError, DayRecord, ParsedCartellino
-from cartellino_parser.parse_days import parse_days
-from cartellino_parser.parse_pairs import parse_pairs
-from cartellino_parser.parse_totals import parse_totals
+from cartellino_parser.cache import ParseCache, content_key
+from cartellino_parser.extract import DEFAULT_BACKEND, iter_page_texts
+from cartellino_parser.layouts import fingerprint, record_unknown_layout, resolve_layout
+from cartellino_parser.models import DAY_COLUMNS, CartellinoParseError, ParsedCartellino, UnknownLayoutError
+from cartellino_parser.scanner import build_meta, scan_lines
 from cartellino_parser.utils import parse_employee, parse_month_year
 from cartellino_parser.validate import validate_cartellino
 
+if TYPE_CHECKING:
+    from cartellino_parser.profiling import SlowDocumentCapture
+
 LOGGER = logging.getLogger(__name__)
 
 
-def _build_meta(text: str) -> Dict[str, Any]:
-    month, year, month_name = parse_month_year(text)
-    employee_name, employee_id = parse_employee(text)
-    return {
-        "employee_name": employee_name,
-        "employee_id": employee_id,
-        "month_name": month_name,
-        "month": month,
-        "year": year,
-        "unit": None,
-        "turno": None,
-        "qualifica": None,
-    }
+def _build_meta(lines: Iterable[str]) -> Dict[str, Any]:
+    month = year = month_name = None
+    employee_name = employee_id = None
+    # Both header lines sit at the top of the first page; stop as soon as they are seen.
+    for line in lines:
+        if month_name is None:
+            month, year, month_name = parse_month_year(line)
+        if employee_id is None:
+            employee_name, employee_id = parse_employee(line)
+        if month_name is not None and employee_id is not None:
+            break
+    return build_meta(month, year, month_name, employee_name, employee_id)
 
 
-def _records_to_df(records: Iterable[DayRecord]) -> pd.DataFrame:
-    rows: List[Dict[str, Any]] = []
-    for record in records:
-        rows.append(asdict(record))
-    return pd.DataFrame(
-        rows,
-        columns=["year", "month", "day", "dow", "mo_f", "mo_t", "mo_lav", "raw"],
-    )
+def warm_up() -> None:
+    """Load the extraction stack ahead of the first document.
+
+    Intended as a process-pool initializer: pdfplumber/pdfminer and pandas are
+    imported and the parsing regexes compiled once per worker, at startup.
+    """
+    import pdfplumber  # noqa: F401
+    import pdfminer.layout  # noqa: F401
+
+    pd.DataFrame([], columns=DAY_COLUMNS)
+
+
+class _TimedPages:
+    """Wraps the page-text generator and adds up the time spent inside it."""
+
+    def __init__(self, pages: Iterator[str]) -> None:
+        self.pages = pages
+        self.seconds = 0.0
+
+    def __iter__(self) -> "_TimedPages":
+        return self
+
+    def __next__(self) -> str:
+        start = time.perf_counter()
+        try:
+            return next(self.pages)
+        finally:
+            self.seconds += time.perf_counter() - start
 
+    def close(self) -> None:
+        self.pages.close()
 
-def parse_pdf(source) -> ParsedCartellino:
-    text = extract_text(source)
-    lines = text.splitlines()
 
-    meta = _build_meta(text)
-    records = parse_days(lines, meta.get("year"), meta.get("month"))
-    if not records:
-        LOGGER.error("No day lines found in %s", source)
-        raise CartellinoParseError(f"No day lines found in {source}")
+def _read_bytes(source) -> bytes:
+    if isinstance(source, (str, Path)):
+        return Path(source).read_bytes()
+    source.seek(0)
+    return source.read()
+
+
+def parse_pdf(
+    source,
+    cache: Optional[ParseCache] = None,
+    backend: str = DEFAULT_BACKEND,
+    timings: Optional[Dict[str, float]] = None,
+    capture: Optional[SlowDocumentCapture] = None,
+) -> ParsedCartellino:
+    """Parse one cartellino PDF (path or binary file object).
+
+    With ``timings``, the seconds spent extracting text and scanning/validating
+    it are added under ``"extract"`` and ``"parse"`` (nothing on a cache hit or
+    a failed parse). With ``capture``, documents over its latency or memory
+    threshold are profiled and copied to its folder.
+    """
+    parse = _parse if capture is None else capture.parse
+    if cache is None:
+        return parse(source, backend=backend, timings=timings)
+
+    data = _read_bytes(source)
+    key = content_key(data, backend)
+    record = cache.get(key)
+    if record is not None:
+        return ParsedCartellino.from_record(record)
+    parsed = parse(io.BytesIO(data), name=source, backend=backend, timings=timings)
+    cache.put(key, parsed.to_record())
+    return parsed
+
+
+def _parse(
+    source,
+    name=None,
+    backend: str = DEFAULT_BACKEND,
+    pages: Optional[Sequence[int]] = None,
+    timings: Optional[Dict[str, float]] = None,
+) -> ParsedCartellino:
+    name = source if name is None else name
+    start = time.perf_counter()
+    # Extraction is interleaved with scanning, so its share is measured per page.
+    texts = _TimedPages(iter_page_texts(source, backend, pages))
+    try:
+        first_page = next(texts, "").splitlines()
+        fp = fingerprint(first_page)
+        if fp is None:
+            # Not a cartellino at all: fail on page 1 instead of extracting the rest.
+            record_unknown_layout(None, name, first_page)
+            raise UnknownLayoutError(f"Unrecognised layout on first page of {name}")
+        layout = resolve_layout(fp, name, first_page)
+        scan = layout.scan if layout else scan_lines
+        # Lines are consumed as extraction yields them: one pass, one page in memory.
+        result = scan(chain(first_page, (line for text in texts for line in text.splitlines())))
+    finally:
+        texts.close()
+
+    if result.days_df.empty:
+        LOGGER.error("No day lines found in %s", name)
+        raise CartellinoParseError(f"No day lines found in {name}")
+
+    validation = validate_cartellino(result.days_df, result.totals)
+    if timings is not None:
+        extract = texts.seconds
+        timings["extract"] = timings.get("extract", 0.0) + extract
+        timings["parse"] = timings.get("parse", 0.0) + time.perf_counter() - start - extract
+    meta = {
+        **result.meta,
+        "layout": layout.name if layout else None,
+        "layout_fingerprint": fp,
+    }
 
-    days_df = _records_to_df(records)
-    pairs_df = parse_pairs(lines, meta.get("year"), meta.get("month"))
-    totals = parse_totals(text)
-    validation = validate_cartellino(days_df, totals)
-    
-    #Each document has different sections
     return ParsedCartellino(
         meta=meta,
-        days_df=days_df,
-        pairs_df=pairs_df,
-        totals=totals,
+        days_df=result.days_df,
+        pairs_df=result.pairs_df,
+        totals=result.totals,
         validation=validation,
     )
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import io
+import json
+import re
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from cartellino_parser.extract import DEFAULT_BACKEND
+
+if TYPE_CHECKING:
+    from cartellino_parser.models import ParsedCartellino
+
+MB = 1024 * 1024
+PROFILE_LINES = 40
+
+# tracemalloc is process-wide: threads share one trace, started by the first
+# and stopped by the last, so no thread stops tracing under another.
+_trace_lock = threading.Lock()
+_trace_users = 0
+_trace_owned = False
+
+
+def _start_trace() -> None:
+    global _trace_users, _trace_owned
+    with _trace_lock:
+        if _trace_users == 0:
+            # Left running if someone else (``-X tracemalloc``) started it.
+            _trace_owned = not tracemalloc.is_tracing()
+            if _trace_owned:
+                tracemalloc.start()
+            else:
+                # The peak of that trace so far belongs to earlier work.
+                tracemalloc.reset_peak()
+        _trace_users += 1
+
+
+def _stop_trace() -> None:
+    global _trace_users
+    with _trace_lock:
+        _trace_users -= 1
+        if _trace_users == 0 and _trace_owned:
+            tracemalloc.stop()
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_")[:120] or "document"
+
+
+@dataclass
+class SlowDocumentCapture:
+    """Keeps reproducible copies of documents that parse slowly or use a lot of memory.
+
+    A parse taking more than ``max_seconds``, or peaking ``max_peak_mb`` above
+    the traced memory at its start, is repeated under cProfile and tracemalloc.
+    The results go to ``<out_dir>/<document>/``:
+
+    - ``document.pdf``: a copy of the PDF
+    - ``profile.pstats`` and ``profile.txt``: the profile
+    - ``allocations.txt``: the top allocation sites
+    - ``info.json``
+
+    An index entry is appended to ``captured``. Failing parses count as well.
+    Memory is traced only when ``max_peak_mb`` is set. The trace covers the
+    whole process, so other threads parsing at the same time add to the peak:
+    use one capture per process (``drive-filter`` rejects ``--slow-mb`` with
+    in-thread parsing). Tracing slows parsing down, so with both thresholds set
+    a traced parse over ``max_seconds`` is timed again without tracing.
+    """
+
+    out_dir: Union[str, Path]
+    max_seconds: Optional[float] = None
+    max_peak_mb: Optional[float] = None
+    top_allocations: int = 25
+    captured: List[Dict[str, Any]] = field(default_factory=list)
+
+    def parse(
+        self,
+        source,
+        name=None,
+        backend: str = DEFAULT_BACKEND,
+        pages: Optional[Sequence[int]] = None,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> ParsedCartellino:
+        """Drop-in for ``parser._parse`` that captures the document when it is slow."""
+        from cartellino_parser.parser import _read_bytes
+
+        data = _read_bytes(source)
+        name = source if name is None else name
+        # File objects (BytesIO included, when the caller sets it) carry their name.
+        name = getattr(name, "name", name)
+        trace = self.max_peak_mb is not None
+        elapsed, peak_mb, parsed, error = self._timed_parse(data, name, backend, pages, timings, trace)
+        if trace and self.max_seconds is not None and elapsed > self.max_seconds:
+            # Tracing can double the parse time: only the untraced time counts as latency.
+            elapsed = self._timed_parse(data, name, backend, pages, None, False)[0]
+
+        reasons = []
+        if self.max_seconds is not None and elapsed > self.max_seconds:
+            reasons.append("latency")
+        if self.max_peak_mb is not None and peak_mb is not None and peak_mb > self.max_peak_mb:
+            reasons.append("memory")
+        if reasons:
+            self.captured.append(
+                self._capture(data, str(name), backend, pages, elapsed, peak_mb, reasons, error)
+            )
+        if error is not None:
+            raise error
+        return parsed
+
+    def _timed_parse(
+        self,
+        data: bytes,
+        name,
+        backend: str,
+        pages: Optional[Sequence[int]],
+        timings: Optional[Dict[str, float]],
+        trace: bool,
+    ) -> Tuple[float, Optional[float], Optional[ParsedCartellino], Optional[Exception]]:
+        from cartellino_parser.parser import _parse
+
+        if trace:
+            _start_trace()
+            # Memory already traced (a running trace) is not this parse's.
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        parsed = error = None
+        try:
+            parsed = _parse(io.BytesIO(data), name=name, backend=backend, pages=pages, timings=timings)
+        except Exception as exc:
+            error = exc
+        elapsed = time.perf_counter() - start
+        peak_mb = None
+        if trace:
+            peak_mb = (tracemalloc.get_traced_memory()[1] - baseline) / MB
+            _stop_trace()
+        return elapsed, peak_mb, parsed, error
+
+    def _capture(
+        self,
+        data: bytes,
+        name: str,
+        backend: str,
+        pages: Optional[Sequence[int]],
+        elapsed: float,
+        peak_mb: Optional[float],
+        reasons: List[str],
+        error: Optional[BaseException],
+    ) -> Dict[str, Any]:
+        import cProfile
+        import pstats
+
+        from cartellino_parser.parser import _parse
+
+        target = Path(self.out_dir) / _slug(name)
+        target.mkdir(parents=True, exist_ok=True)
+        (target / "document.pdf").write_bytes(data)
+
+        _start_trace()
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            _parse(io.BytesIO(data), name=name, backend=backend, pages=pages)
+        except Exception:
+            pass
+        finally:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            _stop_trace()
+
+        profiler.dump_stats(target / "profile.pstats")
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(PROFILE_LINES)
+        (target / "profile.txt").write_text(summary.getvalue())
+        allocations = snapshot.filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        ).statistics("lineno")
+        (target / "allocations.txt").write_text(
+            "\n".join(str(stat) for stat in allocations[: self.top_allocations]) + "\n"
+        )
+
+        entry = {
+            "document": name,
+            "reasons": reasons,
+            "elapsed_s": round(elapsed, 4),
+            "peak_mb": None if peak_mb is None else round(peak_mb, 2),
+            "error": None if error is None else f"{type(error).__name__}: {error}",
+            "path": str(target),
+        }
+        info = {
+            **entry,
+            "backend": backend,
+            "pages": None if not pages else [pages[0] + 1, pages[-1] + 1],
+            "bytes": len(data),
+            "captured_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        (target / "info.json").write_text(json.dumps(info, indent=2, ensure_ascii=False))
+        return entry
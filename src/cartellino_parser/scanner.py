@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List
+
+import pandas as pd
+
+from cartellino_parser.parse_days import DAY_LINE_RE, RawDay, build_days_df, day_tokens
+from cartellino_parser.parse_pairs import PairCollector, build_pairs_df
+from cartellino_parser.parse_totals import TOTAL_LABELS
+from cartellino_parser.utils import hhmm_to_decimal, parse_employee, parse_month_year, parse_number
+
+# One alternation instead of one whole-text regex per total label. A label that
+# ends its line has no ``val``: the value is on the next non-blank line.
+TOTALS_RE = re.compile(
+    "(?P<label>"
+    + "|".join(re.escape(label) for label in TOTAL_LABELS.values())
+    + r")(?:\s+(?P<val>[+-]?\d+(?:\.\d+)?)|\s*$)"
+)
+TOTAL_VALUE_RE = re.compile(r"\s*(?P<val>[+-]?\d+(?:\.\d+)?)")
+TOTAL_KEYS = {label: key for key, label in TOTAL_LABELS.items()}
+
+
+@dataclass(frozen=True)
+class ScanResult:
+    meta: Dict[str, Any]
+    days_df: pd.DataFrame
+    pairs_df: pd.DataFrame
+    totals: Dict[str, float]
+
+
+def build_meta(
+    month: int | None,
+    year: int | None,
+    month_name: str | None,
+    employee_name: str | None,
+    employee_id: str | None,
+) -> Dict[str, Any]:
+    return {
+        "employee_name": employee_name,
+        "employee_id": employee_id,
+        "month_name": month_name,
+        "month": month,
+        "year": year,
+        "unit": None,
+        "turno": None,
+        "qualifica": None,
+    }
+
+
+class ScanState:
+    """Accumulates what the line classifiers find; shared by every scanner."""
+
+    def __init__(self) -> None:
+        self.month: int | None = None
+        self.year: int | None = None
+        self.month_name: str | None = None
+        self.employee_name: str | None = None
+        self.employee_id: str | None = None
+        self.day_rows: List[RawDay] = []
+        self.totals: Dict[str, float] = {}
+        self.pairs = PairCollector()
+        # Set once every field is found, so scanners stop offering lines.
+        self.meta_done = False
+        self.totals_done = False
+        # Key of a total whose label ended the previous non-blank line.
+        self.pending_total: str | None = None
+
+    def feed_meta(self, line: str) -> None:
+        if self.month_name is None and "RIEPILOGO" in line:
+            self.month, self.year, self.month_name = parse_month_year(line)
+        if self.employee_id is None and "-" in line:
+            self.employee_name, self.employee_id = parse_employee(line)
+        self.meta_done = self.month_name is not None and self.employee_id is not None
+
+    def add_day(self, line: str, day_match: re.Match) -> None:
+        values = day_tokens(line, day_match)
+        if values is not None:
+            self.day_rows.append((int(day_match.group("day")), day_match.group("dow"), *values, line))
+
+    def feed_day(self, line: str, day_match: re.Match | None) -> None:
+        if day_match:
+            self.add_day(line, day_match)
+        self.pairs.feed(line, day_match)
+
+    def feed_totals(self, line: str) -> None:
+        # Same matches as one ``label\s+value`` search over the whole text: a
+        # value may sit on the line after its label.
+        if self.pending_total is not None:
+            if not line.strip():
+                return
+            key, self.pending_total = self.pending_total, None
+            value = TOTAL_VALUE_RE.match(line)
+            if value:
+                self._set_total(key, value.group("val"))
+        # Every total label contains one of these; other lines skip the regex.
+        if "ORE " not in line and "DB/CR" not in line and "SALDO" not in line:
+            return
+        for match in TOTALS_RE.finditer(line):
+            key = TOTAL_KEYS[match.group("label")]
+            if match.group("val") is None:
+                self.pending_total = key
+            else:
+                self._set_total(key, match.group("val"))
+
+    def _set_total(self, key: str, value: str) -> None:
+        if key not in self.totals:
+            self.totals[key] = hhmm_to_decimal(parse_number(value))
+            self.totals_done = len(self.totals) == len(TOTAL_KEYS)
+
+    def result(self) -> ScanResult:
+        # Day and pair tables need the month/year, which is only final once every
+        # line has been seen.
+        year, month = self.year, self.month
+        return ScanResult(
+            meta=build_meta(month, year, self.month_name, self.employee_name, self.employee_id),
+            days_df=build_days_df(self.day_rows, year, month),
+            pairs_df=build_pairs_df(self.pairs.finish(), year, month),
+            totals={key: self.totals[key] for key in TOTAL_LABELS if key in self.totals},
+        )
+
+
+def classify_lines(lines: Iterable[str]) -> ScanState:
+    """Feed every line of a document to the classifiers, in a single pass.
+
+    Layout-agnostic: every line goes to the E/U collector, and every line that
+    is not a day line to the meta and totals classifiers until they are done.
+    """
+    state = ScanState()
+    match_day = DAY_LINE_RE.match
+    add_day = state.add_day
+    feed_pairs = state.pairs.feed
+    for line in lines:
+        day_match = match_day(line.strip())
+        feed_pairs(line, day_match)
+        if day_match:
+            add_day(line, day_match)
+            # A day line holds no meta or total label; it can only complete a
+            # total whose label ended the previous line.
+            if state.pending_total is not None:
+                state.feed_totals(line)
+            continue
+        if not state.meta_done:
+            state.feed_meta(line)
+        if not state.totals_done:
+            state.feed_totals(line)
+    return state
+
+
+def scan_lines(lines: Iterable[str]) -> ScanResult:
+    """Classify every line once, collecting meta, days, E/U events and totals.
+
+    Equivalent to running ``_build_meta``, ``parse_days``, ``parse_pairs`` and
+    ``parse_totals`` separately, but consumes ``lines`` in a single pass, so a
+    page-streaming generator can be fed directly.
+    """
+    return classify_lines(lines).result()
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from cartellino_parser.extract import DEFAULT_BACKEND, Source, iter_page_texts, page_count
+from cartellino_parser.models import CartellinoParseError, ParsedCartellino
+from cartellino_parser.parser import _parse, _read_bytes, warm_up
+from cartellino_parser.utils import MONTH_YEAR_RE, MONTHS_IT
+
+if TYPE_CHECKING:
+    from cartellino_parser.profiling import SlowDocumentCapture
+
+LOGGER = logging.getLogger(__name__)
+
+# The month header is near the top of each page; no need to look further down.
+HEADER_SCAN_LINES = 15
+# PDFium is by far the cheapest way to read the page headers.
+SEGMENT_BACKEND = "pypdfium2"
+
+SegmentResult = Tuple[Optional[Dict[str, Any]], Optional[str]]
+
+
+@dataclass(frozen=True)
+class Segment:
+    """Pages ``[start, stop)`` belonging to one monthly cartellino.
+
+    ``part`` numbers the segments of a month that shows up more than once in a
+    bundle (not next to each other), so each keeps its own ``tag``.
+    """
+
+    start: int
+    stop: int
+    month: Optional[int] = None
+    year: Optional[int] = None
+    part: int = 1
+
+    @property
+    def pages(self) -> range:
+        return range(self.start, self.stop)
+
+    @property
+    def tag(self) -> str:
+        if self.year is None or self.month is None:
+            return f"pages-{self.start + 1:03d}-{self.stop:03d}"
+        tag = f"{self.year:04d}-{self.month:02d}"
+        return tag if self.part == 1 else f"{tag}-{self.part}"
+
+
+def _page_header(text: str) -> Optional[Tuple[Optional[int], int]]:
+    for line in text.splitlines()[:HEADER_SCAN_LINES]:
+        match = MONTH_YEAR_RE.search(line)
+        if match:
+            return MONTHS_IT.get(match.group("month").upper()), int(match.group("year"))
+    return None
+
+
+def _header_backend() -> str:
+    return SEGMENT_BACKEND if find_spec(SEGMENT_BACKEND) else DEFAULT_BACKEND
+
+
+def may_be_bundle(source: Source, backend: Optional[str] = None) -> bool:
+    """Cheap check before ``segment_pages``: can ``source`` hold several months?
+
+    Reads the page count and, for multi-page PDFs, only the first and last
+    page: a bundle's last page names another month than its first. A month
+    repeated at both ends of a bundle is missed and parsed as one document.
+    """
+    backend = backend or _header_backend()
+    count = page_count(source, backend)
+    if count < 2:
+        return False
+    first, last = (_page_header(text) for text in list(iter_page_texts(source, backend, [0, count - 1])))
+    return last is not None and last != first
+
+
+def segment_pages(source: Source, backend: Optional[str] = None) -> List[Segment]:
+    """Split a PDF into one page range per "RIEPILOGO PRESENZE/ASSENZE" month.
+
+    A page whose header names a different month/year than the current segment
+    starts a new segment; pages without a header continue the current one, and
+    pages before the first header are dropped. Documents that never show a
+    header come back as a single segment so they can be parsed (and fail) as usual.
+    """
+    backend = backend or _header_backend()
+
+    segments: List[Segment] = []
+    current: Optional[Segment] = None
+    parts: Dict[Tuple[Optional[int], int], int] = {}
+    pages = 0
+    for index, text in enumerate(iter_page_texts(source, backend)):
+        pages = index + 1
+        header = _page_header(text)
+        if header is not None and (current is None or header != (current.month, current.year)):
+            if current is not None:
+                segments.append(replace(current, stop=index))
+            parts[header] = parts.get(header, 0) + 1
+            current = Segment(index, index + 1, *header, part=parts[header])
+    if current is not None:
+        segments.append(replace(current, stop=pages))
+    if not segments:
+        segments.append(Segment(0, pages))
+    return segments
+
+
+def parse_segment(
+    source: Source,
+    segment: Segment,
+    backend: str = DEFAULT_BACKEND,
+    timings: Optional[Dict[str, float]] = None,
+    capture: Optional[SlowDocumentCapture] = None,
+) -> ParsedCartellino:
+    name = f"{getattr(source, 'name', source)} [{segment.tag}]"
+    parse = _parse if capture is None else capture.parse
+    return parse(source, name=name, backend=backend, pages=segment.pages, timings=timings)
+
+
+def parse_segments(
+    data: bytes,
+    segments: Sequence[Segment],
+    backend: str = DEFAULT_BACKEND,
+    timings: Optional[Dict[str, float]] = None,
+    capture: Optional[SlowDocumentCapture] = None,
+    name: Optional[str] = None,
+) -> List[SegmentResult]:
+    """Parse several segments of one PDF, isolating failures.
+
+    Returns ``(record, None)`` or ``(None, reason)`` per segment; records are
+    compact ``to_record()`` dicts, so this is suitable as a process-pool task.
+    ``timings`` adds up the extract/parse seconds of all segments.
+    """
+    results: List[SegmentResult] = []
+    for segment in segments:
+        source = io.BytesIO(data)
+        if name is not None:
+            source.name = name
+        try:
+            parsed = parse_segment(source, segment, backend, timings, capture)
+            results.append((parsed.to_record(), None))
+        except Exception as exc:
+            results.append((None, f"{type(exc).__name__}: {exc}"))
+    return results
+
+
+def split_contiguous(items: Sequence[Any], parts: int) -> List[Sequence[Any]]:
+    """Split ``items`` into at most ``parts`` contiguous, similarly sized chunks."""
+    parts = max(1, min(parts, len(items)))
+    size, extra = divmod(len(items), parts)
+    chunks = []
+    start = 0
+    for part in range(parts):
+        stop = start + size + (1 if part < extra else 0)
+        chunks.append(items[start:stop])
+        start = stop
+    return chunks
+
+
+def parse_pdf_segments(
+    source: Source, jobs: int = 1, backend: str = DEFAULT_BACKEND
+) -> List[ParsedCartellino]:
+    """Parse every monthly cartellino bundled in ``source``.
+
+    With ``jobs > 1`` the segments are spread over that many worker processes,
+    in contiguous chunks so each worker receives the PDF bytes once. Segments
+    that fail are logged and left out; if none parses, ``CartellinoParseError``
+    is raised.
+    """
+    data = _read_bytes(source)
+    segments = segment_pages(io.BytesIO(data))
+    chunks = split_contiguous(segments, jobs)
+    if len(chunks) <= 1:
+        results = parse_segments(data, segments, backend)
+    else:
+        with ProcessPoolExecutor(max_workers=len(chunks), initializer=warm_up) as pool:
+            futures = [pool.submit(parse_segments, data, chunk, backend) for chunk in chunks]
+            results = [result for future in futures for result in future.result()]
+
+    parsed: List[ParsedCartellino] = []
+    for segment, (record, reason) in zip(segments, results):
+        if record is None:
+            LOGGER.warning("Skipping %s of %s: %s", segment.tag, source, reason)
+            continue
+        parsed.append(ParsedCartellino.from_record(record))
+    if not parsed:
+        raise CartellinoParseError(f"No parsable cartellino segment in {source}")
+    return parsed
@@ -0,0 +1,402 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from cartellino_parser.models import DAY_COLUMNS, PAIR_COLUMNS, ParsedCartellino
+from cartellino_parser.parse_totals import TOTAL_LABELS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DB_NAME = "cartellini.db"
+
+_DOCUMENT_COLUMNS = [
+    "document",
+    "content_hash",
+    "employee_id",
+    "employee_name",
+    "year",
+    "month",
+    "month_name",
+    "layout",
+    "layout_fingerprint",
+    "is_ok",
+    "meta",
+    "validation",
+    "updated_at",
+]
+_TOTAL_COLUMNS = list(TOTAL_LABELS)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS documents (
+    document TEXT PRIMARY KEY,
+    content_hash TEXT,
+    employee_id TEXT,
+    employee_name TEXT,
+    year INTEGER,
+    month INTEGER,
+    month_name TEXT,
+    layout TEXT,
+    layout_fingerprint TEXT,
+    is_ok INTEGER,
+    meta TEXT,
+    validation TEXT,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS days (
+    document TEXT NOT NULL REFERENCES documents(document) ON DELETE CASCADE,
+    row INTEGER NOT NULL,
+    employee_id TEXT,
+    year INTEGER,
+    month INTEGER,
+    day INTEGER,
+    dow TEXT,
+    mo_f REAL,
+    mo_t REAL,
+    mo_lav REAL,
+    raw TEXT,
+    PRIMARY KEY (document, row)
+);
+CREATE TABLE IF NOT EXISTS pairs (
+    document TEXT NOT NULL REFERENCES documents(document) ON DELETE CASCADE,
+    row INTEGER NOT NULL,
+    employee_id TEXT,
+    year INTEGER,
+    month INTEGER,
+    day INTEGER,
+    dow TEXT,
+    pair_index INTEGER,
+    entry_ts TEXT,
+    exit_ts TEXT,
+    duration_hhmm TEXT,
+    turno TEXT,
+    entry_raw TEXT,
+    exit_raw TEXT,
+    PRIMARY KEY (document, row)
+);
+CREATE TABLE IF NOT EXISTS totals (
+    document TEXT PRIMARY KEY REFERENCES documents(document) ON DELETE CASCADE,
+    employee_id TEXT,
+    year INTEGER,
+    month INTEGER,
+    {", ".join(f"{key} REAL" for key in _TOTAL_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS documents_period ON documents (employee_id, year, month);
+CREATE INDEX IF NOT EXISTS documents_content ON documents (content_hash);
+CREATE INDEX IF NOT EXISTS days_period ON days (employee_id, year, month);
+CREATE INDEX IF NOT EXISTS pairs_period ON pairs (employee_id, year, month);
+CREATE INDEX IF NOT EXISTS totals_period ON totals (employee_id, year, month);
+"""
+
+_UPSERT_DOCUMENT = (
+    f"INSERT INTO documents ({', '.join(_DOCUMENT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in _DOCUMENT_COLUMNS)}) "
+    "ON CONFLICT(document) DO UPDATE SET "
+    + ", ".join(f"{col} = excluded.{col}" for col in _DOCUMENT_COLUMNS[1:])
+)
+_INSERT_DAYS = (
+    f"INSERT INTO days (document, row, employee_id, {', '.join(DAY_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in range(len(DAY_COLUMNS) + 3))})"
+)
+_INSERT_PAIRS = (
+    f"INSERT INTO pairs (document, row, employee_id, {', '.join(PAIR_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in range(len(PAIR_COLUMNS) + 3))})"
+)
+_UPSERT_TOTALS = (
+    f"INSERT OR REPLACE INTO totals (document, employee_id, year, month, {', '.join(_TOTAL_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in range(len(_TOTAL_COLUMNS) + 4))})"
+)
+
+# (document row, day rows, pair rows, totals row)
+_Batch = Tuple[tuple, List[tuple], List[tuple], tuple]
+_STOP = object()
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    # WAL lets the query API read while the writer thread commits.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def _plain(value: Any) -> Any:
+    # NaN and NaT are the only values not equal to themselves.
+    if value is None or value != value:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def _rows(frame: pd.DataFrame, columns: Sequence[str], document: str, employee_id: Any) -> List[tuple]:
+    return [
+        (document, row, employee_id, *(_plain(value) for value in values))
+        for row, values in enumerate(frame[list(columns)].itertuples(index=False, name=None))
+    ]
+
+
+class ResultStore:
+    """SQLite database of parse results: ``documents``, ``days``, ``pairs``, ``totals``.
+
+    Documents are keyed by ``document`` (the Drive file id, or the file name for
+    local runs) and carry the content hash of the PDF. Writing a document again
+    replaces its rows. ``add`` only queues the rows; a single writer thread
+    commits them in transactions of up to ``batch_size`` documents. Queries open
+    their own connection and see everything committed so far (``flush`` first
+    to include queued writes).
+
+    A document whose rows cannot be written fails on its own: it is logged and
+    listed in ``failed`` (document -> error), and the rest of its transaction
+    is committed without it. ``drain_settled()`` returns the documents committed
+    or failed since the last call (document -> ``None`` or the error).
+    """
+
+    def __init__(self, path: Union[str, Path], batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.documents_written = 0
+        self.failed: Dict[str, str] = {}
+        self._settled: Dict[str, Optional[str]] = {}
+        self._settled_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with _connect(self.path) as conn:
+            conn.executescript(SCHEMA)
+        conn.close()
+        self._queue: queue.Queue = queue.Queue(maxsize=batch_size * 4)
+        self._error: Optional[BaseException] = None
+        self._writer = threading.Thread(target=self._write_loop, name="result-store", daemon=True)
+        self._writer.start()
+
+    # -- writing -----------------------------------------------------------
+
+    def add(self, parsed: ParsedCartellino, document: str, content_hash: Optional[str] = None) -> None:
+        self._raise_error()
+        self._queue.put(self._entry(parsed, document, content_hash))
+
+    def _entry(self, parsed: ParsedCartellino, document: str, content_hash: Optional[str]) -> _Batch:
+        meta = parsed.meta
+        employee_id = meta.get("employee_id")
+        document_row = (
+            document,
+            content_hash,
+            employee_id,
+            meta.get("employee_name"),
+            meta.get("year"),
+            meta.get("month"),
+            meta.get("month_name"),
+            meta.get("layout"),
+            meta.get("layout_fingerprint"),
+            None if parsed.validation.get("is_ok") is None else int(parsed.validation["is_ok"]),
+            json.dumps(meta, ensure_ascii=False),
+            json.dumps(parsed.validation, ensure_ascii=False),
+            time.time(),
+        )
+        totals_row = (
+            document,
+            employee_id,
+            meta.get("year"),
+            meta.get("month"),
+            *(parsed.totals.get(key) for key in _TOTAL_COLUMNS),
+        )
+        return (
+            document_row,
+            _rows(parsed.days_df, DAY_COLUMNS, document, employee_id),
+            _rows(parsed.pairs_df, PAIR_COLUMNS, document, employee_id),
+            totals_row,
+        )
+
+    def _write_loop(self) -> None:
+        conn = _connect(self.path)
+        try:
+            while True:
+                item = self._queue.get()
+                batch: List[_Batch] = []
+                stop = item is _STOP
+                if not stop:
+                    batch.append(item)
+                # Take whatever else is already queued, up to one transaction's worth.
+                while not stop and len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                    else:
+                        batch.append(item)
+                try:
+                    if batch and self._error is None:
+                        self._commit(conn, batch)
+                except BaseException as exc:
+                    self._error = exc
+                finally:
+                    for _ in range(len(batch) + (1 if stop else 0)):
+                        self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[_Batch]) -> None:
+        # The same document queued twice in one transaction: the last write wins.
+        batch = list({entry[0][0]: entry for entry in batch}.values())
+        try:
+            self._commit_entries(conn, batch)
+        except sqlite3.Error as exc:
+            if len(batch) == 1:
+                self._document_failed(batch[0], exc)
+                return
+            # Find the culprit: commit the documents one by one.
+            for entry in batch:
+                try:
+                    self._commit_entries(conn, [entry])
+                except sqlite3.Error as exc:
+                    self._document_failed(entry, exc)
+                else:
+                    self._document_written(entry)
+            return
+        for entry in batch:
+            self._document_written(entry)
+
+    def _document_written(self, entry: _Batch) -> None:
+        self.failed.pop(entry[0][0], None)
+        with self._settled_lock:
+            self._settled[entry[0][0]] = None
+
+    def _document_failed(self, entry: _Batch, exc: sqlite3.Error) -> None:
+        logger.error("Could not store %s: %s", entry[0][0], exc)
+        self.failed[entry[0][0]] = str(exc)
+        with self._settled_lock:
+            self._settled[entry[0][0]] = str(exc)
+
+    def drain_settled(self) -> Dict[str, Optional[str]]:
+        """Documents committed (``None``) or failed (the error) since the last call."""
+        with self._settled_lock:
+            settled, self._settled = self._settled, {}
+        return settled
+
+    def _commit_entries(self, conn: sqlite3.Connection, batch: List[_Batch]) -> None:
+        with conn:
+            documents = [entry[0] for entry in batch]
+            keys = [(row[0],) for row in documents]
+            conn.executemany("DELETE FROM days WHERE document = ?", keys)
+            conn.executemany("DELETE FROM pairs WHERE document = ?", keys)
+            conn.executemany(_UPSERT_DOCUMENT, documents)
+            conn.executemany(_INSERT_DAYS, [row for entry in batch for row in entry[1]])
+            conn.executemany(_INSERT_PAIRS, [row for entry in batch for row in entry[2]])
+            conn.executemany(_UPSERT_TOTALS, [entry[3] for entry in batch])
+        self.documents_written += len(batch)
+
+    def remove(self, documents: Sequence[str]) -> None:
+        """Delete ``documents`` and their rows (queued writes are flushed first)."""
+        self.flush()
+        conn = _connect(self.path)
+        try:
+            with conn:
+                conn.executemany("DELETE FROM documents WHERE document = ?", [(doc,) for doc in documents])
+        finally:
+            conn.close()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Result store writer failed: {self._error}") from self._error
+
+    def flush(self) -> None:
+        """Block until every queued document is committed."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        self._raise_error()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    # -- querying ----------------------------------------------------------
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> pd.DataFrame:
+        import pandas as pd
+
+        conn = _connect(self.path)
+        try:
+            return pd.read_sql_query(sql, conn, params=list(params))
+        finally:
+            conn.close()
+
+    def _period_query(
+        self,
+        table: str,
+        columns: Sequence[str],
+        employee_id: str,
+        first_year: Optional[int],
+        last_year: Optional[int],
+        order: str,
+    ) -> pd.DataFrame:
+        where = ["employee_id = ?"]
+        params: List[Any] = [employee_id]
+        if first_year is not None:
+            where.append("year >= ?")
+            params.append(first_year)
+        if last_year is not None:
+            where.append("year <= ?")
+            params.append(last_year)
+        sql = f"SELECT {', '.join(columns)} FROM {table} WHERE {' AND '.join(where)} ORDER BY {order}"
+        return self.query(sql, params)
+
+    def days(
+        self, employee_id: str, first_year: Optional[int] = None, last_year: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Day rows of one employee, optionally limited to ``first_year..last_year``."""
+        return self._period_query(
+            "days", ["document", *DAY_COLUMNS], employee_id, first_year, last_year, "year, month, row"
+        )
+
+    def pairs(
+        self, employee_id: str, first_year: Optional[int] = None, last_year: Optional[int] = None
+    ) -> pd.DataFrame:
+        frame = self._period_query(
+            "pairs", ["document", *PAIR_COLUMNS], employee_id, first_year, last_year, "year, month, row"
+        )
+        for column in ("entry_ts", "exit_ts"):
+            frame[column] = frame[column].astype("datetime64[us]")
+        return frame
+
+    def totals(
+        self, employee_id: str, first_year: Optional[int] = None, last_year: Optional[int] = None
+    ) -> pd.DataFrame:
+        return self._period_query(
+            "totals",
+            ["document", "year", "month", *_TOTAL_COLUMNS],
+            employee_id,
+            first_year,
+            last_year,
+            "year, month",
+        )
+
+    def documents_with_hash(self, content_hash: str) -> List[str]:
+        frame = self.query("SELECT document FROM documents WHERE content_hash = ?", [content_hash])
+        return frame["document"].tolist()
+
+    def describe(self, document: str) -> Dict[str, str]:
+        return {"database": str(self.path), "document": document}
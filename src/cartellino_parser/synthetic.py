@@ -0,0 +1,384 @@
+"""Synthetic cartellini in the INSIEL "RIEPILOGO PRESENZE/ASSENZE" layout.
+
+Generates employees, monthly day tables (morning/afternoon/night shifts split
+at midnight, missing exits, ``24:00`` entries, holidays and absences), totals
+that agree with the day rows, single-page PDFs and a ``manifest.json`` in the
+``drive-scan`` format, for scale tests and offline benchmarks::
+
+    python -m cartellino_parser.synthetic --out corpus --employees 20000 --months 12
+"""
+from __future__ import annotations
+
+import argparse
+import calendar
+import json
+import os
+import random
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from cartellino_parser.utils import MONTHS_IT
+
+MONTH_NAMES = {number: name for name, number in MONTHS_IT.items()}
+DOW = ["LU", "MA", "ME", "GI", "VE", "SA", "DO"]
+RULE = "-" * 132
+GIORNO_HEADING = (
+    "GIORNO ------- TIMBRATURE (VERSO/ORA/CAUSALE) ------- ------- GIUSTIFICATIVI ------- "
+    "GG ORARIO MO.F MO.T MO.LAV"
+)
+FILE_ID_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+
+SURNAMES = [
+    "ROSSI", "RUSSO", "FERRARI", "ESPOSITO", "BIANCHI", "ROMANO", "COLOMBO", "RICCI",
+    "MARINO", "GRECO", "BRUNO", "GALLO", "CONTI", "DE LUCA", "MANCINI", "COSTA",
+    "GIORDANO", "RIZZO", "LOMBARDI", "MORETTI", "BARBIERI", "FONTANA", "SANTORO", "MARIANI",
+    "RINALDI", "CARUSO", "FERRARA", "GALLI", "MARTINI", "LEONE", "D'ANGELO", "PASCOLINI",
+]
+FIRST_NAMES = [
+    "MARIO", "LUCIA", "GIUSEPPE", "ANNA", "FRANCESCO", "MARIA", "ANTONIO", "GIULIA",
+    "ALESSANDRO", "FRANCESCA", "LUCA", "CHIARA", "MARCO", "SARA", "ANDREA", "ESTER",
+    "PAOLO", "ELENA", "STEFANO", "VALENTINA", "ROBERTO", "SILVIA", "DAVIDE", "MARTINA",
+]
+UNITS = ["06-22-91 COVID PIANO 1", "03-11-40 CARDIOLOGIA", "05-02-17 PRONTO SOCCORSO", "07-30-02 MEDICINA"]
+
+# Shift kinds, drawn per working day: start window, length window, scheduled hours.
+SHIFTS = {
+    "mattina": ((6 * 60 + 40, 6 * 60 + 58), (7 * 60 + 30, 7 * 60 + 55), 7 * 60),
+    "pomeriggio": ((13 * 60 + 42, 13 * 60 + 58), (7 * 60 + 30, 7 * 60 + 55), 7 * 60),
+}
+NIGHT_START = (20 * 60 + 40, 21 * 60 + 30)
+NIGHT_END = (7 * 60, 7 * 60 + 45)
+
+
+@dataclass(frozen=True)
+class SyntheticEmployee:
+    name: str
+    badge: str
+    folder_id: str
+    unit: str
+
+    @property
+    def slug(self) -> str:
+        return self.name.lower().replace(" ", "_").replace("'", "")
+
+
+@dataclass
+class SyntheticMonth:
+    """One rendered cartellino and what parsing it must give back."""
+
+    employee: SyntheticEmployee
+    year: int
+    month: int
+    lines: List[str]
+    days: int
+    pairs: int
+    totals: Dict[str, float]
+
+
+def _hhmm(minutes: int, signed: bool = False) -> str:
+    if not signed:
+        return f"{minutes // 60}.{minutes % 60:02d}" if minutes else "0"
+    sign = "-" if minutes < 0 else "+"
+    return f"{sign}{abs(minutes) // 60}.{abs(minutes) % 60:02d}"
+
+
+def _clock(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def file_id(rng: random.Random) -> str:
+    return "1" + "".join(rng.choices(FILE_ID_ALPHABET, k=32))
+
+
+def generate_employees(count: int, rng: random.Random) -> List[SyntheticEmployee]:
+    employees = []
+    badges = rng.sample(range(1000, 10_000_000), count)
+    for badge in badges:
+        name = f"{rng.choice(SURNAMES)} {rng.choice(FIRST_NAMES)}"
+        employees.append(
+            SyntheticEmployee(name=name, badge=str(badge), folder_id=file_id(rng), unit=rng.choice(UNITS))
+        )
+    return employees
+
+
+def _day_rows(year: int, month: int, rng: random.Random) -> Iterator[Tuple[str, int, int, int, int]]:
+    """Yield ``(stamps, mo_f, mo_t, mo_lav, pairs)`` for every day, hours in minutes."""
+    night_pending = False
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        dd = f"{day:02d}"
+        if night_pending:
+            # Second half of a night shift, stamped as an entry at midnight.
+            night_pending = False
+            end = rng.randint(*NIGHT_END)
+            entry = "E 24:00" if rng.random() < 0.05 else "E(00:00)"
+            lav = end - rng.randint(0, 8)
+            yield f"{entry} U {_clock(end)} | |{dd} INF01D", end, 7 * 60, lav, 1
+            continue
+
+        roll = rng.random()
+        weekday = calendar.weekday(year, month, day)
+        if roll < 0.18 or (weekday == 6 and roll < 0.5):
+            yield f"| |{dd}+FEST", 0, 0, 0, 0
+        elif roll < 0.26:
+            code = rng.choice(["FER010", "FER020", "MAL010", "PER72B"])
+            yield f"| 1 G {code} |{dd} LIB600", 0, 6 * 60, 6 * 60, 0
+        elif roll < 0.42 and day < calendar.monthrange(year, month)[1]:
+            night_pending = True
+            start = rng.randint(*NIGHT_START)
+            worked = 24 * 60 - start
+            yield f"E {_clock(start)} U(24:00) | |{dd} INF01C", worked, 3 * 60, worked, 1
+        elif roll < 0.45:
+            # Forgotten exit stamp: the entry stays open and nothing is worked.
+            start = rng.randint(*SHIFTS["pomeriggio"][0])
+            yield f"E {_clock(start)} | |{dd} INF01B", 0, 7 * 60, 7 * 60, 1
+        else:
+            kind = "mattina" if roll < 0.75 else "pomeriggio"
+            start_window, length_window, scheduled = SHIFTS[kind]
+            start = rng.randint(*start_window)
+            worked = rng.randint(*length_window)
+            lav = worked - rng.randint(0, 10)
+            code = "INF01A" if kind == "mattina" else "INF01B"
+            yield f"E {_clock(start)} U {_clock(start + worked)} | |{dd} {code}", worked, scheduled, lav, 1
+
+
+def render_month(
+    employee: SyntheticEmployee,
+    year: int,
+    month: int,
+    rng: random.Random,
+    page: int = 1,
+    previous: Optional[int] = None,
+) -> SyntheticMonth:
+    """One month of ``employee``; ``previous`` is last month's closing balance in minutes."""
+    days = []
+    worked_total = scheduled_total = 0
+    pair_count = 0
+    for day, (stamps, mo_f, mo_t, mo_lav, pairs) in enumerate(_day_rows(year, month, rng), 1):
+        dow = DOW[calendar.weekday(year, month, day)]
+        days.append(f"{day:02d} {dow} {stamps} {_hhmm(mo_f)} {_hhmm(mo_t)} {_hhmm(mo_lav)}")
+        worked_total += mo_lav
+        scheduled_total += mo_t
+        pair_count += pairs
+
+    contractual = rng.randint(140, 160) * 60
+    gross = worked_total - contractual
+    settled = -rng.randint(0, 8 * 60) if gross > 0 else 0
+    net = gross + settled
+    if previous is None:
+        previous = rng.randint(-40 * 60, 80 * 60)
+    current = previous + net
+
+    # Printed on the first day of the following month.
+    printed = f"01/{month % 12 + 1:02d}/{year + month // 12}"
+    lines = [
+        "Azienda Ospedaliera di Perugia",
+        f"Data {printed} 08:00:00 Pag. 1 / 1",
+        "R0WCARME",
+        "Cartellino mensile configurabile",
+        f"Azienda Ospedaliera di Perugia RIEPILOGO PRESENZE/ASSENZE - {MONTH_NAMES[month]} {year} Pag. {page}",
+        RULE,
+        f"{employee.name} - {employee.badge} Un. Org. UNI - {employee.unit}",
+        "Turno INF076 - T.3X8 notte 21-7 Qualifica I1CROPCR - Coll.Prof.Sanitario",
+        RULE,
+        GIORNO_HEADING,
+        *days,
+        "-" * 54 + "+" + "-" * 32 + "+" + "-" * 44,
+        "CODICE GIUSTIFICATIVO MENSILE ANNUALE LIQ/SOSP DIRITTO RESIDUO | DEBITO/CREDITO ORARIO MENSILE +HHHH.MM",
+        "-" * 87 + "+" + "-" * 44,
+        "FER010 Ferie anni preced. 2 G 8 G 0 G 26 G 18 G |",
+        f"FER020 Ferie anno corrente 0 G 0 G 0 G 32 G 32 G | ORE LAVORATE {_hhmm(worked_total)}",
+        f"FER030 Festivita' soppresse 1 G 4 G 0 G 4 G 0 G | ORE DOVUTE PROGRAMMATE {_hhmm(scheduled_total)}",
+        f"MAL010 Malattia 100% 10 G 10 G | ORE DOVUTE CONTRATTUALI {_hhmm(contractual)}",
+        "PER626 Perm. visita 626 0.47 H |",
+        "PER72B P.R. L104 a GG 1 FA 3 G 11 G |",
+        f"STR001 Serv. STRAORDINARIO 6.26 H | DB/CR LORDO CONFERMATO {_hhmm(gross, signed=True)}",
+        f"| LIQUIDAZIONI/COMPENSAZIONI {_hhmm(settled, signed=True)}",
+        f"| DB/CR NETTO {_hhmm(net, signed=True)}",
+        "|",
+        f"| SALDO AL MESE PRECEDENTE {_hhmm(previous, signed=True)}",
+        f"| SALDO AL MESE CORRENTE {_hhmm(current, signed=True)}",
+        "-" * 87 + "+" + "-" * 44,
+        RULE,
+        f"INSIEL S.p.A. {printed} 08:00",
+    ]
+    totals = {
+        "ore_lavorate": worked_total / 60,
+        "ore_dovute_programmate": scheduled_total / 60,
+        "ore_dovute_contrattuali": contractual / 60,
+        "dbcr_lordo_confermato": gross / 60,
+        "dbcr_netto": net / 60,
+        "saldo_al_mese_precedente": previous / 60,
+        "saldo_al_mese_corrente": current / 60,
+    }
+    return SyntheticMonth(employee, year, month, lines, len(days), pair_count, totals)
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def pdf_bytes(pages: Sequence[Sequence[str]], font_size: float = 7.0, leading: float = 9.0) -> bytes:
+    """A minimal PDF with one landscape A4 page of Courier text per entry of ``pages``."""
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for lines in pages:
+        body = "\n".join(f"({_pdf_escape(line)}) Tj T*" for line in lines)
+        stream = f"BT /F1 {font_size:g} Tf {leading:g} TL 20 575 Td\n{body}\nET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 842 595] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _months(first: Tuple[int, int], count: int) -> Iterator[Tuple[int, int]]:
+    year, month = first
+    for _ in range(count):
+        yield year, month
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+
+
+def generate_corpus(
+    out_dir: str | Path,
+    employees: int = 100,
+    months: int = 12,
+    first_month: Tuple[int, int] = (2022, 1),
+    bundle_ratio: float = 0.05,
+    seed: int = 0,
+    write_pdfs: bool = True,
+) -> Path:
+    """Write ``pdf/<file_id>.pdf``, ``expected.jsonl`` and ``manifest.json`` under ``out_dir``.
+
+    Each employee gets ``months`` consecutive monthly cartellini; a
+    ``bundle_ratio`` share also get one "DOCUMENTI" PDF bundling all of them.
+    ``expected.jsonl`` holds, per file, the month, day/pair counts and totals
+    a correct parse must return. Returns the manifest path.
+    """
+    rng = random.Random(seed)
+    out_dir = Path(out_dir)
+    pdf_dir = out_dir / "pdf"
+    pdf_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest_employees = []
+    with open(out_dir / "expected.jsonl", "w", encoding="utf-8") as expected:
+        for employee in generate_employees(employees, rng):
+            included = []
+            rendered = []
+            balance = None
+            for page, (year, month) in enumerate(_months(first_month, months), 1):
+                item = render_month(employee, year, month, rng, page=page, previous=balance)
+                balance = round(item.totals["saldo_al_mese_corrente"] * 60)
+                rendered.append(item)
+                doc_id = file_id(rng)
+                included.append({"file_id": doc_id, "file_name": f"Cartellino mensile-{year}-{month:02d}.pdf"})
+                if write_pdfs:
+                    (pdf_dir / f"{doc_id}.pdf").write_bytes(pdf_bytes([item.lines]))
+                expected.write(json.dumps(_expected(doc_id, [item])) + "\n")
+            if rendered and rng.random() < bundle_ratio:
+                doc_id = file_id(rng)
+                included.insert(0, {"file_id": doc_id, "file_name": f"DOCUMENTI {employee.name}.pdf"})
+                if write_pdfs:
+                    (pdf_dir / f"{doc_id}.pdf").write_bytes(pdf_bytes([item.lines for item in rendered]))
+                expected.write(json.dumps(_expected(doc_id, rendered)) + "\n")
+            skipped = [
+                {"file_id": file_id(rng), "file_name": f"Cedolino-{year}-{month}.pdf", "reason": "cedolino"}
+                for year, month in _months(first_month, min(months, 2))
+            ]
+            manifest_employees.append(
+                {
+                    "employee": employee.slug,
+                    "employee_id": employee.folder_id,
+                    "counts": {"included": len(included), "skipped_files": len(skipped), "excluded_folders": 0},
+                    "included": included,
+                    "skipped": skipped,
+                    "excluded_folders": [],
+                }
+            )
+
+    manifest_path = out_dir / "manifest.json"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "root_id": "synthetic",
+                "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "employee_count": len(manifest_employees),
+                "employees": manifest_employees,
+            },
+            f,
+        )
+    return manifest_path
+
+
+def _expected(doc_id: str, months: Sequence[SyntheticMonth]) -> Dict[str, Any]:
+    return {
+        "file_id": doc_id,
+        "employee_id": months[0].employee.badge,
+        "segments": [
+            {
+                "year": item.year,
+                "month": item.month,
+                "days": item.days,
+                "pairs": item.pairs,
+                "totals": item.totals,
+            }
+            for item in months
+        ],
+    }
+
+
+def load_expected(out_dir: str | Path) -> Dict[str, Dict[str, Any]]:
+    with open(Path(out_dir) / "expected.jsonl", encoding="utf-8") as f:
+        return {entry["file_id"]: entry for entry in map(json.loads, f)}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic cartellino corpus.")
+    parser.add_argument("--out", required=True, help="Output folder")
+    parser.add_argument("--employees", type=int, default=100)
+    parser.add_argument("--months", type=int, default=12, help="Consecutive months per employee")
+    parser.add_argument("--first-month", default="2022-01", help="YYYY-MM of the first month")
+    parser.add_argument("--bundle-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-pdf", action="store_true", help="Only write manifest.json and expected.jsonl")
+    args = parser.parse_args(argv)
+
+    year, month = (int(part) for part in args.first_month.split("-"))
+    start = time.perf_counter()
+    manifest = generate_corpus(
+        args.out,
+        employees=args.employees,
+        months=args.months,
+        first_month=(year, month),
+        bundle_ratio=args.bundle_ratio,
+        seed=args.seed,
+        write_pdfs=not args.no_pdf,
+    )
+    files = sum(1 for _ in os.scandir(Path(args.out) / "pdf"))
+    print(f"{files} PDFs and {manifest} written in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
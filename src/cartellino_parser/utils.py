@@ -22,6 +22,10 @@ MONTHS_IT = {
 }
 
 NUMBER_RE = re.compile(r"[+-]?\d+(?:\.\d+)?")
+MONTH_YEAR_RE = re.compile(
+    r"RIEPILOGO PRESENZE/ASSENZE\s*-\s*(?P<month>[A-Z]+)\s+(?P<year>\d{4})"
+)
+EMPLOYEE_RE = re.compile(r"^(?P<name>[A-Z' ]+?)\s*-\s*(?P<id>\d{4,})", re.MULTILINE)
 
 
 def extract_numeric_tokens(text: str) -> list[str]:
@@ -49,10 +53,7 @@ def hhmm_to_decimal(value: float) -> float:
 
 
 def parse_month_year(text: str) -> tuple[Optional[int], Optional[int], Optional[str]]:
-    match = re.search(
-        r"RIEPILOGO PRESENZE/ASSENZE\s*-\s*(?P<month>[A-Z]+)\s+(?P<year>\d{4})",
-        text,
-    )
+    match = MONTH_YEAR_RE.search(text)
     if not match:
         return None, None, None
     month_name = match.group("month").upper()
@@ -62,7 +63,7 @@ def parse_month_year(text: str) -> tuple[Optional[int], Optional[int], Optional[
 
 
 def parse_employee(text: str) -> tuple[Optional[str], Optional[str]]:
-    match = re.search(r"^(?P<name>[A-Z' ]+?)\s*-\s*(?P<id>\d{4,})", text, re.MULTILINE)
+    match = EMPLOYEE_RE.search(text)
     if not match:
         return None, None
     name = match.group("name").strip()
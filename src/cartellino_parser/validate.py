@@ -1,7 +1,9 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from pathlib import Path
+from typing import Any, Dict, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
 
@@ -21,3 +23,175 @@ def validate_cartellino(days_df: pd.DataFrame, totals: Dict[str, Any]) -> Dict[s
         "ore_lavorate_diff": ore_lavorate_diff,
         "is_ok": is_ok,
     }
+
+
+ANOMALY_COLUMNS = ["check", "employee_id", "year", "month", "day", "document", "expected", "actual", "detail"]
+# Hours; the printed totals are rounded to the minute.
+TOLERANCE = 0.05
+# Hours a day may be credited beyond its stamped presence (rounding of stamps, short breaks).
+PAIR_TOLERANCE = 0.5
+
+
+def _anomalies(frame: pd.DataFrame, check: str, expected=None, actual=None, detail=None) -> pd.DataFrame:
+    out = pd.DataFrame(
+        {
+            "check": check,
+            "employee_id": frame["employee_id"],
+            "year": frame["year"],
+            "month": frame["month"],
+            "day": frame["day"] if "day" in frame else pd.NA,
+            "document": frame["document"],
+            "expected": expected,
+            "actual": actual,
+            "detail": detail,
+        },
+        index=frame.index,
+    )
+    return out[ANOMALY_COLUMNS]
+
+
+def _check_ore_lavorate(days: pd.DataFrame, totals: pd.DataFrame, tolerance: float) -> pd.DataFrame:
+    row_sum = days.groupby("document", sort=False)["mo_lav"].sum().rename("row_sum")
+    merged = totals.join(row_sum, on="document")
+    merged["row_sum"] = merged["row_sum"].fillna(0.0)
+    diff = (merged["row_sum"] - merged["ore_lavorate"]).abs()
+    bad = merged[merged["ore_lavorate"].isna() | (diff >= tolerance)]
+    return _anomalies(
+        bad, "ore_lavorate", bad["ore_lavorate"], bad["row_sum"], "sum of mo_lav vs ORE LAVORATE"
+    )
+
+
+def _check_months(totals: pd.DataFrame, tolerance: float) -> list[pd.DataFrame]:
+    dated = totals.dropna(subset=["year", "month"])
+    period = dated["year"].astype("int64") * 12 + dated["month"].astype("int64") - 1
+    dated = dated.assign(period=period).sort_values(["employee_id", "period", "document"], kind="stable")
+
+    duplicated = dated.duplicated(["employee_id", "period"], keep="first")
+    first_document = dated.groupby(["employee_id", "period"], sort=False)["document"].transform("first")
+    dups = dated[duplicated]
+    found = [
+        _anomalies(
+            dups, "duplicate_month", detail="month already in " + first_document[duplicated].astype(str)
+        )
+    ]
+
+    months = dated[~duplicated]
+    by_employee = months.groupby("employee_id", sort=False)
+    gap = months["period"] - by_employee["period"].shift()
+    previous_saldo = by_employee["saldo_al_mese_corrente"].shift()
+    previous_document = by_employee["document"].shift()
+
+    gaps = months[gap > 1]
+    first_missing = gaps["period"] - gap[gap > 1] + 1
+    missing = gaps.assign(year=first_missing // 12, month=first_missing % 12 + 1)
+    found.append(
+        _anomalies(
+            missing,
+            "missing_month",
+            detail=(gap[gap > 1] - 1).astype("int64").astype(str) + " month(s) missing before " + gaps["document"].astype(str),
+        )
+    )
+
+    jump = (months["saldo_al_mese_precedente"] - previous_saldo).abs()
+    broken = (gap == 1) & (months["saldo_al_mese_precedente"].isna() | (jump >= tolerance))
+    found.append(
+        _anomalies(
+            months[broken],
+            "saldo_continuity",
+            previous_saldo[broken],
+            months.loc[broken, "saldo_al_mese_precedente"],
+            "previous SALDO AL MESE CORRENTE in " + previous_document[broken].astype(str),
+        )
+    )
+    return found
+
+
+def _check_pairs(days: pd.DataFrame, pairs: pd.DataFrame, tolerance: float) -> list[pd.DataFrame]:
+    entry = pd.to_datetime(pairs["entry_ts"])
+    exit_ = pd.to_datetime(pairs["exit_ts"])
+    open_ = entry.isna() | exit_.isna()
+    unpaired = pairs[open_]
+    found = [
+        _anomalies(
+            unpaired,
+            "unpaired_stamp",
+            detail=np.where(entry[open_].isna(), "exit without entry", "entry without exit"),
+        )
+    ]
+
+    # Days with an open pair are already reported. On the others the stamps must cover
+    # mo_lav; presence beyond it is normal (extra minutes are not credited, and a night
+    # shift may be credited to the day it started on).
+    hours = (exit_ - entry).dt.total_seconds() / 3600
+    per_day = (
+        pairs.assign(hours=hours, open=open_)
+        .groupby(["document", "day"], sort=False)
+        .agg(hours=("hours", "sum"), open=("open", "any"))
+    )
+    per_day = per_day[~per_day["open"]]
+    merged = days.merge(per_day, left_on=["document", "day"], right_index=True, how="inner")
+    bad = merged[merged["mo_lav"] - merged["hours"] >= tolerance]
+    found.append(_anomalies(bad, "pair_hours", bad["mo_lav"], bad["hours"], "mo_lav not covered by stamps"))
+    return found
+
+
+def validate_corpus(
+    days: pd.DataFrame,
+    pairs: pd.DataFrame,
+    totals: pd.DataFrame,
+    tolerance: float = TOLERANCE,
+    pair_tolerance: float = PAIR_TOLERANCE,
+) -> pd.DataFrame:
+    """Cross-document checks over the days/pairs/totals tables of many cartellini.
+
+    The tables are those of ``ResultStore`` or ``DatasetWriter``: one row per
+    day, pair and document, keyed by ``document`` and ``employee_id``. Every
+    check is a groupby/join over whole columns, so hundreds of thousands of day
+    rows take seconds. Returns one row per anomaly (``ANOMALY_COLUMNS``), where
+    ``check`` is one of:
+
+    - ``ore_lavorate``: the day rows do not add up to ORE LAVORATE
+    - ``duplicate_month``: a second document for an employee's month
+    - ``missing_month``: a gap between two months of an employee
+    - ``saldo_continuity``: SALDO AL MESE PRECEDENTE differs from the
+      previous month's SALDO AL MESE CORRENTE
+    - ``unpaired_stamp``: an entry without exit, or the other way round
+    - ``pair_hours``: a day's stamped hours fall short of its ``mo_lav`` by
+      ``pair_tolerance`` or more
+    """
+    totals = totals.assign(employee_id=totals["employee_id"].astype(str))
+    days = days.assign(employee_id=days["employee_id"].astype(str))
+    pairs = pairs.assign(employee_id=pairs["employee_id"].astype(str))
+    found = [
+        _check_ore_lavorate(days, totals, tolerance),
+        *_check_months(totals, tolerance),
+        *_check_pairs(days, pairs, pair_tolerance),
+    ]
+    found = [frame for frame in found if not frame.empty]
+    if not found:
+        return pd.DataFrame(columns=ANOMALY_COLUMNS).astype({"year": "Int64", "month": "Int64", "day": "Int64"})
+    anomalies = pd.concat(found, ignore_index=True)
+    anomalies = anomalies.astype({"year": "Int64", "month": "Int64", "day": "Int64"})
+    return anomalies.sort_values(["employee_id", "year", "month", "check"], kind="stable", ignore_index=True)
+
+
+def load_corpus(path: Union[str, Path]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """``(days, pairs, totals)`` of a ``cartellini.db`` (or its folder) or a parquet dataset folder."""
+    from cartellino_parser.store import DB_NAME, ResultStore
+
+    path = Path(path)
+    if path.is_dir() and (path / DB_NAME).exists():
+        path = path / DB_NAME
+    if path.is_file():
+        store = ResultStore(path)
+        try:
+            days, pairs, totals = (store.query(f"SELECT * FROM {table}") for table in ("days", "pairs", "totals"))
+        finally:
+            store.close()
+        for column in ("entry_ts", "exit_ts"):
+            pairs[column] = pairs[column].astype("datetime64[us]")
+        return days, pairs, totals
+
+    from cartellino_parser.dataset import read_table
+
+    return read_table(path, "days"), read_table(path, "pairs"), read_table(path, "totals")
@@ -1,13 +1,13 @@
 import os
 
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-
 from . import config
 
 
-def load_creds() -> Credentials:
+def load_creds():
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+
     creds = None
 
     if os.path.exists(config.TOKEN_PATH):
@@ -0,0 +1,182 @@
+"""Incremental ``drive-scan``: apply the Drive changes feed to an existing manifest."""
+from collections import Counter
+from typing import Callable, Iterable
+
+from .drive_client import get_file
+from .logging_utils import get_logger
+from .scan_service import FOLDER_MIME, _file_entry, classify_file, update_counts
+
+logger = get_logger()
+
+
+def can_update(manifest: dict | None, root_id: str) -> bool:
+    """Whether ``manifest`` carries what an incremental rescan needs."""
+    if not manifest or manifest.get("root_id") != root_id or not manifest.get("changes_page_token"):
+        return False
+    return all("folders" in emp for emp in manifest.get("employees", []))
+
+
+class ManifestUpdater:
+    """Applies ``changes.list`` entries to the employee reports of a manifest.
+
+    Files added, removed, renamed or moved between known folders are patched
+    in place. The owning employee of a file is found from its parent folder,
+    walking up with ``files().get`` through folders the manifest does not know
+    (new ones). A change that touches the folder structure (a folder added,
+    renamed, moved or removed, or a file in a new folder) has the employees
+    involved re-crawled with ``crawl``, so ``folder_excluded`` applies exactly
+    as in a full scan. New folders directly under the root become employees,
+    and employee folders that leave the root are dropped.
+    """
+
+    def __init__(
+        self,
+        drive,
+        root_id: str,
+        employees: list[dict],
+        exclude_terms: Iterable[str],
+        crawl: Callable[[list[dict]], Iterable[dict]],
+    ):
+        self.drive = drive
+        self.root_id = root_id
+        self.exclude_terms = list(exclude_terms)
+        self.crawl = crawl
+        self.reports = {emp["employee_id"]: emp for emp in employees}
+        self.order = [emp["employee_id"] for emp in employees]
+        # folder id -> (employee id, excluded); file id -> employee id
+        self.folders: dict[str, tuple[str, bool]] = {}
+        self.files: dict[str, str] = {}
+        for emp_id, report in self.reports.items():
+            for folder_id in report.get("folders", []):
+                self.folders[folder_id] = (emp_id, False)
+            for folder in report.get("excluded_folders", []):
+                self.folders[folder["folder_id"]] = (emp_id, True)
+            for section in ("included", "skipped"):
+                for item in report.get(section, []):
+                    self.files[item["file_id"]] = emp_id
+        self.names = {emp_id: report["employee"] for emp_id, report in self.reports.items()}
+        self.recrawl: set[str] = set()
+        self.dropped: set[str] = set()
+        self.patched: set[str] = set()
+        self.summary: Counter = Counter()
+        self._meta: dict[str, dict | None] = {}
+
+    def _folder_meta(self, folder_id: str) -> dict | None:
+        if folder_id not in self._meta:
+            self._meta[folder_id] = get_file(self.drive, folder_id)
+        return self._meta[folder_id]
+
+    def _locate(self, parents: list[str]) -> tuple[str | None, str]:
+        """``(employee id, state)`` for an item with ``parents``.
+
+        ``state`` is ``"listed"`` (the parent is a known, listed folder),
+        ``"new_folders"`` (a known listed folder further up), ``"excluded"``,
+        ``"new_employee"`` (the id is a new folder under the root), ``"root"``
+        (the item sits directly under the root) or ``"outside"``.
+        """
+        folder = parents[0] if parents else None
+        child = None
+        while folder is not None:
+            if folder == self.root_id:
+                return (child, "new_employee") if child else (None, "root")
+            known = self.folders.get(folder)
+            if known:
+                emp_id, excluded = known
+                if excluded:
+                    return emp_id, "excluded"
+                return emp_id, "listed" if child is None else "new_folders"
+            meta = self._folder_meta(folder)
+            if meta is None or meta.get("trashed") or meta.get("mimeType") != FOLDER_MIME:
+                return None, "outside"
+            child = folder
+            self.names.setdefault(folder, meta["name"])
+            folder = (meta.get("parents") or [None])[0]
+        return None, "outside"
+
+    def _employee_changed(self, emp_id: str, item: dict | None):
+        if item is None or self.root_id not in (item.get("parents") or []):
+            self.dropped.add(emp_id)
+            return
+        self.names[emp_id] = item["name"]
+        self.recrawl.add(emp_id)
+
+    def _folder_changed(self, folder_id: str, item: dict | None):
+        known = self.folders.get(folder_id)
+        if known:
+            self.recrawl.add(known[0])
+        if item is None:
+            return
+        parents = item.get("parents") or []
+        if self.root_id in parents:
+            self.names[folder_id] = item["name"]
+            self.recrawl.add(folder_id)
+            return
+        emp_id, state = self._locate(parents)
+        if state in ("listed", "new_folders", "new_employee"):
+            self.recrawl.add(emp_id)
+
+    def _remove_file(self, emp_id: str, file_id: str):
+        report = self.reports.get(emp_id)
+        if report is None:
+            return
+        for section in ("included", "skipped"):
+            report[section] = [item for item in report[section] if item["file_id"] != file_id]
+        self.patched.add(emp_id)
+
+    def _file_changed(self, file_id: str, item: dict | None):
+        old = self.files.pop(file_id, None)
+        if old is not None:
+            self._remove_file(old, file_id)
+            self.summary["removed"] += 1
+        entry = None if item is None else _file_entry(item)
+        if entry is None:
+            return
+        emp_id, state = self._locate(item.get("parents") or [])
+        if state == "listed":
+            section, manifest_entry = classify_file(entry, self.exclude_terms)
+            self.reports[emp_id][section].append(manifest_entry)
+            self.files[file_id] = emp_id
+            self.patched.add(emp_id)
+            self.summary["added"] += 1
+        elif state in ("new_folders", "new_employee"):
+            self.recrawl.add(emp_id)
+
+    def apply(self, changes: Iterable[dict]) -> list[dict]:
+        """Apply ``changes`` and return the updated employee reports."""
+        for change in changes:
+            file_id = change["fileId"]
+            item = change.get("file")
+            if change.get("removed") or item is None or item.get("trashed"):
+                item = None
+            self.summary["changes"] += 1
+            if file_id in self.reports or file_id in self.recrawl:
+                self._employee_changed(file_id, item)
+            elif file_id in self.folders or (item is not None and item["mimeType"] == FOLDER_MIME):
+                self._folder_changed(file_id, item)
+            else:
+                self._file_changed(file_id, item)
+
+        for emp_id in self.dropped:
+            self.reports.pop(emp_id, None)
+        targets = [emp_id for emp_id in self.recrawl if emp_id not in self.dropped]
+        if targets:
+            employees = [{"id": emp_id, "name": self.names[emp_id]} for emp_id in sorted(targets)]
+            for report in self.crawl(employees):
+                if report["employee_id"] not in self.reports:
+                    self.order.append(report["employee_id"])
+                self.reports[report["employee_id"]] = report
+        for emp_id in self.patched:
+            if emp_id in self.reports:
+                update_counts(self.reports[emp_id])
+
+        self.summary["recrawled"] = len(targets)
+        self.summary["dropped"] = len(self.dropped)
+        logger.info(
+            "Applied %s changes: %s files added, %s removed, %s employees re-crawled, %s dropped",
+            self.summary["changes"],
+            self.summary["added"],
+            self.summary["removed"],
+            self.summary["recrawled"],
+            self.summary["dropped"],
+        )
+        return [self.reports[emp_id] for emp_id in self.order if emp_id in self.reports]
@@ -1,13 +1,6 @@
 import os
 from typing import Any, Optional
 
-from dotenv import load_dotenv
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-
-load_dotenv()
-
 DEFAULT_SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
 
 def get_drive_service(
@@ -18,6 +11,13 @@ def get_drive_service(
     Create and return an authenticated Google Drive v3 service.
     Reusable across modules.
     """
+    from dotenv import load_dotenv
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    from .drive_client import get_drive_service as shared_drive_service
+
+    load_dotenv()
     scopes = scopes or DEFAULT_SCOPES
 
     client_id = os.getenv("GOOGLE_CLIENT_ID")
@@ -46,4 +46,5 @@ def get_drive_service(
         with open(token_path, "w", encoding="utf-8") as f:
             f.write(creds.to_json())
 
-    return build("drive", "v3", credentials=creds, cache_discovery=False)
+    # Same pooled transport and parsed discovery document as the scanner.
+    return shared_drive_service(creds)
@@ -1,9 +1,5 @@
 import os
 
-from dotenv import load_dotenv
-
-load_dotenv()
-
 SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
 EXCLUDE_TERMS = [
     "cedolino",
@@ -15,12 +11,42 @@ EXCLUDE_TERMS = [
     "buste paga",
 ]
 
-CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
-CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
-TOKEN_PATH = os.getenv("GOOGLE_TOKEN_PATH", "token.json")
-DRIVE_ROOT_FOLDER_ID = os.getenv("DRIVE_ROOT_FOLDER_ID", "")
-SCAN_REPORT_PATH = os.getenv("SCAN_REPORT_PATH", "./scan.json")
+# Settings read from the environment (and .env) on first access, so importing
+# this module neither touches the filesystem nor imports python-dotenv.
+_ENV_SETTINGS = {
+    "CLIENT_ID": ("GOOGLE_CLIENT_ID", None),
+    "CLIENT_SECRET": ("GOOGLE_CLIENT_SECRET", None),
+    "TOKEN_PATH": ("GOOGLE_TOKEN_PATH", "token.json"),
+    "DRIVE_ROOT_FOLDER_ID": ("DRIVE_ROOT_FOLDER_ID", ""),
+    "SCAN_REPORT_PATH": ("SCAN_REPORT_PATH", "./scan.json"),
+}
+_dotenv_loaded = False
+
+
+def load_env():
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _dotenv_loaded = True
+
+
+def _get(name):
+    """Value of a setting in ``_ENV_SETTINGS``, read on first use and kept as a module global."""
+    if name not in globals():
+        load_env()
+        env_name, default = _ENV_SETTINGS[name]
+        globals()[name] = os.getenv(env_name, default)
+    return globals()[name]
+
+
+def __getattr__(name):
+    if name not in _ENV_SETTINGS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return _get(name)
+
 
 def validate_env():
-    if not CLIENT_ID or not CLIENT_SECRET:
+    if not _get("CLIENT_ID") or not _get("CLIENT_SECRET"):
         raise RuntimeError("Missing GOOGLE_CLIENT_ID or GOOGLE_CLIENT_SECRET in env")
@@ -3,9 +3,6 @@ import json
 import argparse
 from typing import Any, Dict, List
 
-from pypdf import PdfReader, PdfWriter
-from googleapiclient.http import MediaIoBaseDownload
-
 from  .client import get_drive_service
 
 PDF_MIME = "application/pdf"
@@ -21,6 +18,8 @@ def download_pdf_bytesio(service: Any, file_id: str) -> io.BytesIO:
     Download a PDF from Drive into an in-memory BytesIO stream.
     PdfReader accepts file-like objects (read/seek), per docs.
     """
+    from googleapiclient.http import MediaIoBaseDownload
+
     stream = io.BytesIO()
     request = service.files().get_media(fileId=file_id, supportsAllDrives=True)
     downloader = MediaIoBaseDownload(stream, request)
@@ -40,6 +39,8 @@ def main():
     ap.add_argument("--strict", action="store_true", help="Use PdfReader(strict=True). Default False.")
     args = ap.parse_args()
 
+    from pypdf import PdfReader, PdfWriter
+
     service = get_drive_service()  # must have drive.readonly scope
 
     payload = load_json(args.json)
@@ -1,33 +1,278 @@
+import time
+import random
 import threading
 
-from googleapiclient.discovery import build
+from . import metrics
+from .logging_utils import get_logger
+from .transport import SharedTransport, discovery_document
 
+logger = get_logger()
 
 _thread_local = threading.local()
+_transport_lock = threading.Lock()
+_transport = None
+# Replaces ``build("drive", "v3", ...)`` when set, e.g. with a ``FakeDrive``.
+_service_factory = None
+
+# Drive answers rate limiting with 403/429 and overload with 5xx; all are worth retrying.
+RETRY_STATUSES = {403, 429, 500, 502, 503, 504}
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 64.0
+# Drive rejects queries that are too long; these keep a batch well inside the limit.
+MAX_QUERY_LENGTH = 4000
+MAX_PARENTS_PER_QUERY = 100
+# Drive accepts at most 100 calls per batch request.
+BATCH_SIZE = 100
+
+
+def shared_transport(creds) -> SharedTransport:
+    """The process-wide transport for ``creds``, created on first use."""
+    global _transport
+    with _transport_lock:
+        if _transport is None or _transport.creds is not creds:
+            _transport = SharedTransport(creds)
+        return _transport
+
+
+def set_service_factory(factory):
+    """Serve ``get_drive_service`` from ``factory(creds)``; ``None`` restores the real API."""
+    global _service_factory
+    _service_factory = factory
 
 
 def get_drive_service(creds):
+    if _service_factory is not None:
+        return _service_factory(creds)
     if not hasattr(_thread_local, "drive"):
-        _thread_local.drive = build(
-            "drive", "v3", credentials=creds, cache_discovery=False
-        )
+        from googleapiclient.discovery import build_from_document
+
+        _thread_local.drive = build_from_document(discovery_document(), http=shared_transport(creds))
     return _thread_local.drive
 
 
+def _retry_reason(exc: BaseException) -> str | None:
+    """Label for a retryable error, ``None`` when the error is final."""
+    from googleapiclient.errors import HttpError
+
+    if isinstance(exc, HttpError):
+        status = exc.status_code or int(exc.resp.status)
+        if status == 403 and "ratelimitexceeded" not in str(exc).lower().replace(" ", ""):
+            return None
+        return str(status) if status in RETRY_STATUSES else None
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return type(exc).__name__
+    return None
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+def call_with_retry(call, operation: str, max_attempts: int = MAX_ATTEMPTS, sleep=time.sleep):
+    """Run ``call()`` retrying rate-limit, 5xx and connection errors.
+
+    Waits follow truncated exponential backoff with full jitter
+    (``random(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))``); every retry
+    and every second slept is counted in the metrics registry.
+    """
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            result = call()
+        except Exception as exc:
+            reason = _retry_reason(exc)
+            attempt += 1
+            if reason is None or attempt >= max_attempts:
+                metrics.DRIVE_CALLS.inc(operation=operation, outcome="error")
+                metrics.DRIVE_CALL_SECONDS.observe(time.perf_counter() - start, operation=operation)
+                raise
+            delay = _backoff(attempt)
+            logger.debug("%s failed (%s), retry %s in %.1fs", operation, reason, attempt, delay)
+            metrics.DRIVE_RETRIES.inc(operation=operation, reason=reason)
+            metrics.DRIVE_BACKOFF_SECONDS.inc(delay, operation=operation)
+            sleep(delay)
+            continue
+        metrics.DRIVE_CALLS.inc(operation=operation, outcome="ok")
+        metrics.DRIVE_CALL_SECONDS.observe(time.perf_counter() - start, operation=operation)
+        return result
+
+
 def list_children(drive, folder_id: str):
     items = []
     token = None
     while True:
-        res = drive.files().list(
+        request = drive.files().list(
             q=f"'{folder_id}' in parents and trashed=false",
             fields="nextPageToken, files(id, name, mimeType)",
             pageSize=1000,
             pageToken=token,
             supportsAllDrives=True,
             includeItemsFromAllDrives=True,
-        ).execute()
+        )
+        res = call_with_retry(request.execute, "list")
         items.extend(res.get("files", []))
         token = res.get("nextPageToken")
         if not token:
             break
     return items
+
+
+def _parent_batches(folder_ids: list[str]) -> list[list[str]]:
+    batches = []
+    batch: list[str] = []
+    length = 0
+    for folder_id in folder_ids:
+        clause = len(f"'{folder_id}' in parents or ")
+        if batch and (len(batch) >= MAX_PARENTS_PER_QUERY or length + clause > MAX_QUERY_LENGTH):
+            batches.append(batch)
+            batch, length = [], 0
+        batch.append(folder_id)
+        length += clause
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def list_children_many(drive, folder_ids) -> dict[str, list[dict]]:
+    """Children of many folders, keyed by folder id.
+
+    The folders are OR'ed into as few ``'<id>' in parents`` queries as the
+    query length allows; each child comes back with its ``parents`` and is
+    routed to the requested folder(s) it sits in. Thousands of near-empty
+    folders then cost a few dozen requests instead of one each.
+    """
+    children: dict[str, list[dict]] = {folder_id: [] for folder_id in folder_ids}
+    for batch in _parent_batches(list(children)):
+        query = "(" + " or ".join(f"'{folder_id}' in parents" for folder_id in batch) + ") and trashed=false"
+        wanted = set(batch)
+        token = None
+        while True:
+            request = drive.files().list(
+                q=query,
+                fields="nextPageToken, files(id, name, mimeType, parents)",
+                pageSize=1000,
+                pageToken=token,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+            )
+            res = call_with_retry(request.execute, "list")
+            for item in res.get("files", []):
+                for parent in item.get("parents", []):
+                    if parent in wanted:
+                        children[parent].append(item)
+            token = res.get("nextPageToken")
+            if not token:
+                break
+    return children
+
+
+CHANGE_FIELDS = "nextPageToken, newStartPageToken, changes(fileId, removed, file(id, name, mimeType, parents, trashed))"
+
+
+def get_start_page_token(drive) -> str:
+    request = drive.changes().getStartPageToken(supportsAllDrives=True)
+    return call_with_retry(request.execute, "changes")["startPageToken"]
+
+
+def list_changes(drive, page_token: str) -> tuple[list[dict], str]:
+    """Every change since ``page_token`` and the token to resume from next time."""
+    changes = []
+    while True:
+        request = drive.changes().list(
+            pageToken=page_token,
+            fields=CHANGE_FIELDS,
+            pageSize=1000,
+            includeRemoved=True,
+            supportsAllDrives=True,
+            includeItemsFromAllDrives=True,
+        )
+        res = call_with_retry(request.execute, "changes")
+        changes.extend(res.get("changes", []))
+        if "newStartPageToken" in res:
+            return changes, res["newStartPageToken"]
+        page_token = res["nextPageToken"]
+
+
+def get_file(drive, file_id: str) -> dict | None:
+    """``id, name, mimeType, parents, trashed`` of one file; ``None`` when it does not exist."""
+    from googleapiclient.errors import HttpError
+
+    request = drive.files().get(
+        fileId=file_id, fields="id, name, mimeType, parents, trashed", supportsAllDrives=True
+    )
+    try:
+        return call_with_retry(request.execute, "get")
+    except HttpError as exc:
+        if (exc.status_code or int(exc.resp.status)) == 404:
+            return None
+        raise
+
+
+def _get_batch(drive, file_ids: list[str], fields: str) -> tuple[dict, dict]:
+    """One batch request: ``(results, errors)`` keyed by file id."""
+    results: dict[str, dict | None] = {}
+    errors: dict[str, BaseException] = {}
+
+    def on_response(request_id, response, exception):
+        if exception is None:
+            results[request_id] = response
+        else:
+            errors[request_id] = exception
+
+    batch = drive.new_batch_http_request(callback=on_response)
+    for file_id in file_ids:
+        batch.add(
+            drive.files().get(fileId=file_id, fields=fields, supportsAllDrives=True),
+            request_id=file_id,
+        )
+    call_with_retry(batch.execute, "batch")
+    return results, errors
+
+
+def get_files_batch(
+    drive,
+    file_ids,
+    fields: str = "id",
+    max_attempts: int = MAX_ATTEMPTS,
+    sleep=time.sleep,
+    errors: dict[str, BaseException] | None = None,
+) -> dict[str, dict | None]:
+    """``files().get`` of many files, sent as batch requests of up to ``BATCH_SIZE`` calls.
+
+    Returns the metadata by file id, ``None`` for files that no longer exist.
+    Calls of a batch that fail with a retryable status (rate limits, 5xx) are
+    sent again in a later batch after a backoff; other errors are raised, or,
+    with ``errors``, stored there by file id while the other files go on.
+    """
+    from googleapiclient.errors import HttpError
+
+    found: dict[str, dict | None] = {}
+    pending = list(dict.fromkeys(file_ids))
+    attempt = 0
+    while pending:
+        retry = []
+        for start in range(0, len(pending), BATCH_SIZE):
+            results, failed = _get_batch(drive, pending[start : start + BATCH_SIZE], fields)
+            found.update(results)
+            for file_id, exc in failed.items():
+                if isinstance(exc, HttpError) and (exc.status_code or int(exc.resp.status)) == 404:
+                    found[file_id] = None
+                    continue
+                reason = _retry_reason(exc)
+                if reason is None or attempt + 1 >= max_attempts:
+                    if errors is None:
+                        raise exc
+                    errors[file_id] = exc
+                    continue
+                metrics.DRIVE_RETRIES.inc(operation="batch_get", reason=reason)
+                retry.append(file_id)
+        pending = retry
+        if pending:
+            attempt += 1
+            delay = _backoff(attempt)
+            logger.debug("%s batched gets failed, retry %s in %.1fs", len(pending), attempt, delay)
+            metrics.DRIVE_BACKOFF_SECONDS.inc(delay, operation="batch_get")
+            sleep(delay)
+    return found
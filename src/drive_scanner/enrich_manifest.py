@@ -0,0 +1,40 @@
+import os
+import json
+import argparse
+
+from . import config, metrics
+from .auth_service import load_creds
+from .enrich_service import enrich_reports
+from .logging_utils import setup_logging
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Add size, md5Checksum, modifiedTime and parents to the files of a drive-scan manifest"
+    )
+    parser.add_argument("--manifest", required=True)
+    parser.add_argument("--workers", type=int, default=4, help="Batch requests in flight")
+    parser.add_argument("--force", action="store_true", help="Fetch files that already have metadata again")
+    metrics.add_arguments(parser)
+    parser.add_argument("--verbose", "-v", action="store_true")
+    args = parser.parse_args()
+
+    setup_logging(args.verbose)
+    config.validate_env()
+    creds = load_creds()
+    exporters = metrics.start_exporters(args)
+
+    with open(args.manifest, encoding="utf-8") as f:
+        manifest = json.load(f)
+    enrich_reports(creds, manifest.get("employees", []), workers=args.workers, force=args.force)
+
+    # Rewritten in place, without losing the manifest if the write is interrupted.
+    tmp_path = f"{args.manifest}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, args.manifest)
+    metrics.stop_exporters(exporters)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Drive metadata for manifest entries, fetched with batched ``files().get`` calls."""
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+from .drive_client import BATCH_SIZE, get_drive_service, get_files_batch
+from .logging_utils import get_logger
+
+logger = get_logger()
+
+ENRICH_FIELDS = ("size", "md5Checksum", "modifiedTime", "parents")
+GET_FIELDS = "id, " + ", ".join(ENRICH_FIELDS)
+
+
+def _file_entries(reports: list[dict]) -> Iterator[dict]:
+    for report in reports:
+        for section in ("included", "skipped"):
+            yield from report.get(section, [])
+
+
+def enrich_reports(creds, reports: list[dict], workers: int = 4, force: bool = False) -> Counter:
+    """Add ``size``, ``md5Checksum``, ``modifiedTime`` and ``parents`` to the file entries of ``reports``.
+
+    Entries that already have all four are skipped unless ``force``. The
+    files are fetched in batch requests of ``BATCH_SIZE`` calls, on ``workers``
+    threads. ``size`` and ``md5Checksum`` are ``None`` for files Drive keeps no
+    binary content for; entries of files gone from Drive get ``missing: true``.
+    A file whose call fails for good (403, 400, retries used up) only gets a
+    ``metadata_error`` and is fetched again by the next run.
+    """
+    wanted: dict[str, list[dict]] = defaultdict(list)
+    for entry in _file_entries(reports):
+        if force or any(field not in entry for field in ENRICH_FIELDS):
+            wanted[entry["file_id"]].append(entry)
+    file_ids = list(wanted)
+    chunks = [file_ids[i : i + BATCH_SIZE] for i in range(0, len(file_ids), BATCH_SIZE)]
+
+    def fetch(chunk: list[str]) -> tuple[dict, dict]:
+        errors: dict[str, BaseException] = {}
+        try:
+            found = get_files_batch(get_drive_service(creds), chunk, GET_FIELDS, errors=errors)
+        except Exception as exc:
+            # The batch request itself failed for good: every file of the chunk did.
+            return {}, dict.fromkeys(chunk, exc)
+        return found, errors
+
+    counts: Counter = Counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="enrich") as pool:
+        for found, errors in pool.map(fetch, chunks):
+            for file_id, exc in errors.items():
+                for entry in wanted[file_id]:
+                    entry["metadata_error"] = f"{type(exc).__name__}: {exc}"
+                    counts["failed"] += 1
+            for file_id, meta in found.items():
+                for entry in wanted[file_id]:
+                    entry.pop("metadata_error", None)
+                    if meta is None:
+                        entry["missing"] = True
+                        counts["missing"] += 1
+                        continue
+                    entry.pop("missing", None)
+                    entry["size"] = int(meta["size"]) if "size" in meta else None
+                    entry["md5Checksum"] = meta.get("md5Checksum")
+                    entry["modifiedTime"] = meta.get("modifiedTime")
+                    entry["parents"] = meta.get("parents", [])
+                    counts["enriched"] += 1
+
+    logger.info(
+        "Enriched %s files in %s batches, %s missing from Drive",
+        counts["enriched"],
+        len(chunks),
+        counts["missing"],
+    )
+    if counts["failed"]:
+        logger.warning("No metadata for %s files, see metadata_error in the manifest", counts["failed"])
+    return counts
@@ -0,0 +1,361 @@
+"""In-memory stand-in for the Drive v3 service, for tests, benchmarks and offline runs.
+
+Only what ``drive_scanner`` calls is implemented: ``files().list`` with
+``'<id>' in parents`` queries (OR'ed or not), ``files().get`` (also in batch
+requests), ``files().get_media`` (through ``MediaIoBaseDownload``) and the
+changes feed.
+Mutations (``add_folder``, ``rename``, ``move``, ...) are recorded as changes,
+like Drive does.
+
+Every request can be slowed down (``latency``), answered with a random 429 or
+5xx (``error_rate``) or rejected with a 403 ``userRateLimitExceeded`` above
+``rate_limit`` requests per second, and listings are cut into pages of at most
+``page_size`` items. ``populate`` fills the drive with a generated tree of
+employee folders and synthetic cartellini::
+
+    drive = FakeDrive(latency=0.05, error_rate=0.01)
+    root = populate(drive, employees=10_000)
+    set_service_factory(lambda creds: drive)
+"""
+import collections
+import hashlib
+import itertools
+import random
+import re
+import threading
+import time
+
+FOLDER_MIME = "application/vnd.google-apps.folder"
+PDF_MIME = "application/pdf"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+_PARENT_RE = re.compile(r"'([^']+)' in parents")
+_RANGE_RE = re.compile(r"bytes=(\d+)-(\d+)")
+BATCH_LIMIT = 100
+ERROR_MESSAGES = {
+    400: "Bad request",
+    403: "User rate limit exceeded: userRateLimitExceeded",
+    404: "File not found",
+    429: "Too many requests: rateLimitExceeded",
+    500: "Internal error",
+    503: "Service unavailable: backendError",
+}
+
+
+def _http_error(status: int, message: str):
+    import httplib2
+    from googleapiclient.errors import HttpError
+
+    return HttpError(httplib2.Response({"status": status}), message.encode("utf-8"))
+
+
+class _Request:
+    def __init__(self, drive, operation: str, call):
+        self._drive = drive
+        self._operation = operation
+        self._call = call
+
+    def execute(self):
+        status = self._drive._serve(self._operation)
+        if status is not None:
+            raise _http_error(status, ERROR_MESSAGES[status])
+        return self._call()
+
+
+class _MediaHttp:
+    """The ``http`` of a media request: answers ``MediaIoBaseDownload``'s ranged GETs."""
+
+    def __init__(self, drive, file_id: str):
+        self._drive = drive
+        self._file_id = file_id
+
+    def request(self, uri, method="GET", headers=None, **kwargs):
+        import httplib2
+
+        status = self._drive._serve("files.get_media")
+        data = self._drive.blobs.get(self._file_id)
+        if status is None and data is None:
+            status = 404
+        if status is not None:
+            return httplib2.Response({"status": status}), ERROR_MESSAGES[status].encode("utf-8")
+        match = _RANGE_RE.fullmatch((headers or {}).get("range", ""))
+        if not match:
+            return httplib2.Response({"status": 200, "content-length": str(len(data))}), data
+        start, end = int(match.group(1)), min(int(match.group(2)), len(data) - 1)
+        if start >= len(data):
+            return httplib2.Response({"status": 416, "content-range": f"bytes */{len(data)}"}), b""
+        headers = {"status": 206, "content-range": f"bytes {start}-{end}/{len(data)}"}
+        return httplib2.Response(headers), data[start : end + 1]
+
+
+class _MediaRequest:
+    def __init__(self, drive, file_id: str):
+        self.uri = f"fake://drive/v3/files/{file_id}?alt=media"
+        self.headers: dict = {}
+        self.http = _MediaHttp(drive, file_id)
+
+
+class _Batch:
+    """``new_batch_http_request``: one request to Drive, then each call answered on its own."""
+
+    def __init__(self, drive, callback):
+        self._drive = drive
+        self._callback = callback
+        self._calls: list[tuple[str, _Request, object]] = []
+
+    def add(self, request, callback=None, request_id=None):
+        self._calls.append((request_id or str(len(self._calls) + 1), request, callback or self._callback))
+
+    def execute(self):
+        status = self._drive._serve("batch")
+        if status is None and len(self._calls) > BATCH_LIMIT:
+            status = 400
+        if status is not None:
+            raise _http_error(status, ERROR_MESSAGES[status])
+        for request_id, request, callback in self._calls:
+            with self._drive._lock:
+                status = self._drive._fault()
+            try:
+                if status is not None:
+                    raise _http_error(status, ERROR_MESSAGES[status])
+                response, exception = request._call(), None
+            except Exception as exc:
+                response, exception = None, exc
+            if callback is not None:
+                callback(request_id, response, exception)
+
+
+class _Files:
+    def __init__(self, drive):
+        self._drive = drive
+
+    def list(self, q="", pageSize=100, pageToken=None, **kwargs):
+        return _Request(self._drive, "files.list", lambda: self._drive._list(q, pageSize, pageToken))
+
+    def get(self, fileId, **kwargs):
+        return _Request(self._drive, "files.get", lambda: self._drive._get(fileId))
+
+    def get_media(self, fileId, **kwargs):
+        return _MediaRequest(self._drive, fileId)
+
+
+class _Changes:
+    def __init__(self, drive):
+        self._drive = drive
+
+    def getStartPageToken(self, **kwargs):
+        return _Request(
+            self._drive, "changes.getStartPageToken", lambda: {"startPageToken": str(self._drive._next_change)}
+        )
+
+    def list(self, pageToken, pageSize=100, **kwargs):
+        return _Request(self._drive, "changes.list", lambda: self._drive._changes(pageToken, pageSize))
+
+
+class FakeDrive:
+    """A Drive with ``items`` (id -> metadata) and ``blobs`` (id -> file bytes).
+
+    ``requests`` lists the operation of every request served and ``errors``
+    counts the injected failures by status. One instance is safe to share
+    between threads, like one ``set_service_factory`` target for all workers.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        page_size: int = 1000,
+        error_rate: float = 0.0,
+        error_statuses=(429, 500, 503),
+        rate_limit: float | None = None,
+        seed: int = 0,
+    ):
+        self.items: dict[str, dict] = {}
+        # parent id -> ids of its children, in insertion order
+        self._children: dict[str, dict[str, None]] = collections.defaultdict(dict)
+        self.blobs: dict[str, bytes] = {}
+        self.requests: list[str] = []
+        self.errors: collections.Counter = collections.Counter()
+        self.latency = latency
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.rate_limit = rate_limit
+        self._rng = random.Random(seed)
+        self._window: collections.deque = collections.deque()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._log: list[tuple[int, str]] = []
+        self._next_change = 1
+
+    # -- building and changing the tree ------------------------------------
+
+    def _record(self, file_id: str):
+        self._log.append((self._next_change, file_id))
+        self._next_change += 1
+
+    def add(self, name: str, parent: str | None, mime_type: str, file_id: str | None = None) -> str:
+        file_id = file_id or f"id{next(self._ids):06d}"
+        self.items[file_id] = {
+            "id": file_id,
+            "name": name,
+            "mimeType": mime_type,
+            "parents": [parent] if parent else [],
+            "trashed": False,
+            "modifiedTime": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+        }
+        if parent:
+            self._children[parent][file_id] = None
+        self._record(file_id)
+        return file_id
+
+    def add_folder(self, name: str, parent: str | None = None, file_id: str | None = None) -> str:
+        return self.add(name, parent, FOLDER_MIME, file_id)
+
+    def add_file(
+        self,
+        name: str,
+        parent: str | None,
+        mime_type: str = PDF_MIME,
+        file_id: str | None = None,
+        content: bytes | None = None,
+    ) -> str:
+        file_id = self.add(name, parent, mime_type, file_id)
+        if content is not None:
+            self.blobs[file_id] = content
+            self.items[file_id]["size"] = str(len(content))
+            self.items[file_id]["md5Checksum"] = hashlib.md5(content).hexdigest()
+        return file_id
+
+    def rename(self, file_id: str, name: str):
+        self.items[file_id]["name"] = name
+        self._record(file_id)
+
+    def move(self, file_id: str, parent: str):
+        for old in self.items[file_id]["parents"]:
+            self._children[old].pop(file_id, None)
+        self.items[file_id]["parents"] = [parent]
+        self._children[parent][file_id] = None
+        self._record(file_id)
+
+    def trash(self, file_id: str):
+        self.items[file_id]["trashed"] = True
+        self._record(file_id)
+
+    def delete(self, file_id: str):
+        for parent in self.items.pop(file_id)["parents"]:
+            self._children[parent].pop(file_id, None)
+        self.blobs.pop(file_id, None)
+        self._record(file_id)
+
+    # -- API ---------------------------------------------------------------
+
+    def files(self):
+        return _Files(self)
+
+    def changes(self):
+        return _Changes(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _Batch(self, callback)
+
+    def _serve(self, operation: str) -> int | None:
+        """Account for one request; the HTTP status to fail it with, if any."""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests.append(operation)
+            return self._fault()
+
+    def _fault(self) -> int | None:
+        # Called with the lock held, once per request or call of a batch.
+        status = None
+        if self.rate_limit is not None:
+            now = time.monotonic()
+            while self._window and now - self._window[0] >= 1.0:
+                self._window.popleft()
+            if len(self._window) >= self.rate_limit:
+                status = 403
+            else:
+                self._window.append(now)
+        if status is None and self.error_rate and self._rng.random() < self.error_rate:
+            status = self._rng.choice(self.error_statuses)
+        if status is not None:
+            self.errors[status] += 1
+        return status
+
+    def _list(self, q: str, page_size: int, page_token: str | None) -> dict:
+        skip_trashed = "trashed=false" in q.replace(" ", "")
+        page_size = min(page_size, self.page_size)
+        matches = []
+        seen = set()
+        for parent in dict.fromkeys(_PARENT_RE.findall(q)):
+            for file_id in list(self._children.get(parent, ())):
+                item = self.items[file_id]
+                if file_id not in seen and not (skip_trashed and item["trashed"]):
+                    seen.add(file_id)
+                    matches.append(dict(item))
+        offset = int(page_token or 0)
+        res = {"files": matches[offset : offset + page_size]}
+        if offset + page_size < len(matches):
+            res["nextPageToken"] = str(offset + page_size)
+        return res
+
+    def _get(self, file_id: str) -> dict:
+        if file_id not in self.items:
+            raise _http_error(404, f"File not found: {file_id}")
+        return dict(self.items[file_id])
+
+    def _changes(self, page_token: str, page_size: int) -> dict:
+        start = int(page_token)
+        pending = [(change_id, file_id) for change_id, file_id in self._log if change_id >= start]
+        page = pending[:page_size]
+        changes = []
+        for _, file_id in page:
+            item = self.items.get(file_id)
+            if item is None:
+                changes.append({"fileId": file_id, "removed": True})
+            else:
+                changes.append({"fileId": file_id, "removed": False, "file": dict(item)})
+        if len(pending) > page_size:
+            return {"changes": changes, "nextPageToken": str(pending[page_size][0])}
+        return {"changes": changes, "newStartPageToken": str(self._next_change)}
+
+
+def populate(
+    drive: FakeDrive,
+    employees: int = 100,
+    months: int = 24,
+    first_month: tuple[int, int] = (2022, 1),
+    distinct_pdfs: int = 64,
+    seed: int = 0,
+) -> str:
+    """Fill ``drive`` with a generated root folder and return its id.
+
+    Each employee folder holds one subfolder per year with a monthly
+    ``Cartellino mensile-YYYY-MM.pdf``, a ``Cedolini`` folder of payslips (excluded
+    by the default terms) and a stray non-PDF file. The cartellini are real
+    synthetic PDFs; ``distinct_pdfs`` of them are rendered and shared between
+    files so that large trees stay cheap to hold in memory.
+    """
+    from cartellino_parser.synthetic import _months, generate_employees, pdf_bytes, render_month
+
+    rng = random.Random(seed)
+    people = generate_employees(employees, rng)
+    pool = []
+    for person, (year, month) in zip(itertools.cycle(people[:distinct_pdfs]), _months(first_month, distinct_pdfs)):
+        pool.append(pdf_bytes([render_month(person, year, month, rng).lines]))
+
+    root = drive.add_folder("Dipendenti")
+    blobs = itertools.cycle(pool)
+    for person in people:
+        emp = drive.add_folder(person.name, root, file_id=person.folder_id)
+        years: dict[int, str] = {}
+        for year, month in _months(first_month, months):
+            if year not in years:
+                years[year] = drive.add_folder(str(year), emp)
+            drive.add_file(f"Cartellino mensile-{year}-{month:02d}.pdf", years[year], content=next(blobs))
+        payslips = drive.add_folder("Cedolini", emp)
+        for year in years:
+            drive.add_file(f"Cedolino {year}-12.pdf", payslips, content=pool[0])
+        drive.add_file("note.docx", emp, mime_type=DOCX_MIME)
+    return root
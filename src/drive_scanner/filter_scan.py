@@ -1,22 +1,34 @@
 import os
 import io
 import json
+import hashlib
 import time
+import queue
+import signal
 import argparse
+import functools
+import dataclasses
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
-from googleapiclient.http import MediaIoBaseDownload
-
-from . import config
+from . import config, metrics
 from .auth_service import load_creds
-from .drive_client import get_drive_service
+from .drive_client import call_with_retry, get_drive_service
 from .fs_utils import ensure_dir
 from .logging_utils import setup_logging, get_logger
-from cartellino_parser.parser import parse_pdf
+from .run_stats import RunStats, format_duration
+from cartellino_parser.cache import ParseCache, content_key
+from cartellino_parser.dataset import DEFAULT_FLUSH_ROWS, DatasetWriter
+from cartellino_parser.store import DB_NAME, ResultStore
+from cartellino_parser.extract import BACKENDS, DEFAULT_BACKEND
+from cartellino_parser.models import ParsedCartellino, UnknownLayoutError
+from cartellino_parser.profiling import SlowDocumentCapture
 
 logger = get_logger()
 
+# Seconds between progress lines when documents complete slowly.
+PROGRESS_INTERVAL = 30.0
+
 
 def load_manifest(path: str) -> dict:
     with open(path, "r", encoding="utf-8") as f:
@@ -42,12 +54,14 @@ def safe_name(name: str, max_len: int = 120) -> str:
 
 
 def download_pdf_stream(drive, file_id: str) -> io.BytesIO:
+    from googleapiclient.http import MediaIoBaseDownload
+
     request = drive.files().get_media(fileId=file_id, supportsAllDrives=True)
     stream = io.BytesIO()
     downloader = MediaIoBaseDownload(stream, request, chunksize=4 * 1024 * 1024)
     done = False
     while not done:
-        _, done = downloader.next_chunk()
+        _, done = call_with_retry(downloader.next_chunk, "get_media")
     stream.seek(0)
     return stream
 
@@ -57,16 +71,33 @@ def _write_json(path: str, payload: dict):
         json.dump(payload, f, indent=2, ensure_ascii=False)
 
 
-def _write_report(path: str, root_id: str | None, employees: list[dict]):
-    _write_json(
-        path,
-        {
-            "root_id": root_id,
-            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-            "employee_count": len(employees),
-            "employees": employees,
-        },
-    )
+def _write_report(path: str, root_id: str | None, employees: list[dict], run: dict | None = None):
+    payload = {
+        "root_id": root_id,
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "employee_count": len(employees),
+        "employees": employees,
+    }
+    if run:
+        payload["run"] = run
+    _write_json(path, payload)
+
+
+def _track_unknown_layout(unknown: dict, result: dict, sample_limit: int = 5):
+    if result["status"] == "success":
+        if result.get("layout"):
+            return
+        fp = result.get("layout_fingerprint") or "unrecognised"
+    elif result.get("unknown_layout"):
+        fp = result.get("layout_fingerprint") or "unrecognised"
+    else:
+        return
+    entry = unknown.setdefault(fp, {"count": 0, "samples": []})
+    entry["count"] += 1
+    if len(entry["samples"]) < sample_limit:
+        entry["samples"].append(
+            {"file_id": result.get("file_id"), "file_name": result.get("file_name")}
+        )
 
 
 def _normalize_name(value: str | None) -> str:
@@ -98,6 +129,66 @@ def _upsert_item(items: list[dict], item: dict):
     items.append(item)
 
 
+def _sink_documents(result: dict) -> list[str]:
+    outputs = result.get("outputs") or {}
+    if "segments" in outputs:
+        return [seg["outputs"]["document"] for seg in outputs["segments"] if seg["status"] == "success"]
+    return [outputs["document"]]
+
+
+class SinkProgress:
+    """Holds successful files back from the report until the sink has their rows.
+
+    ``DatasetWriter`` only writes every ``--flush-rows`` rows and ``ResultStore``
+    commits on its own thread, so a file is done once every document it wrote
+    shows up in ``sink.drain_settled()``. A document the sink failed to store
+    turns its file into a skipped one.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self._files: dict[str, dict] = {}
+        self._owners: dict[str, str] = {}
+        # Settled before their result reached the main thread (in-thread parsing).
+        self._early: dict[str, str | None] = {}
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def hold(self, emp_key: str, result: dict, item: dict):
+        documents = _sink_documents(result)
+        self._files[item["file_id"]] = {"emp_key": emp_key, "item": item, "documents": set(documents), "errors": []}
+        for document in documents:
+            self._owners[document] = item["file_id"]
+
+    def settle(self) -> list[tuple[str, str, dict]]:
+        """``(emp_key, "included" | "skipped", item)`` for every file now written."""
+        self._early.update(self.sink.drain_settled())
+        done = []
+        for document in [document for document in self._early if document in self._owners]:
+            error = self._early.pop(document)
+            file_id = self._owners.pop(document)
+            entry = self._files[file_id]
+            entry["documents"].discard(document)
+            if error is not None:
+                entry["errors"].append(f"{document}: {error}")
+            if entry["documents"]:
+                continue
+            del self._files[file_id]
+            item = entry["item"]
+            if entry["errors"]:
+                logger.error("Could not store %s: %s", item["file_name"], "; ".join(entry["errors"]))
+                item = {
+                    "file_id": file_id,
+                    "file_name": item["file_name"],
+                    "reason": "store failed: " + "; ".join(entry["errors"]),
+                }
+                done.append((entry["emp_key"], "skipped", item))
+            else:
+                done.append((entry["emp_key"], "included", item))
+        return done
+
+
 def _collect_cached_ids(employees: list[dict]) -> set[str]:
     cached: set[str] = set()
     for emp in employees:
@@ -212,97 +303,622 @@ def _finalize_employees(base: dict[str, dict], order: list[dict]) -> list[dict]:
     return output
 
 
-def process_document(creds, employee: dict, doc: dict, out_dir: str, stop_event: threading.Event):
-    drive = get_drive_service(creds)
-    emp_name = _employee_name(employee)
+def _result(employee: dict, file_id: str | None, file_name: str, status: str, **extra) -> dict:
+    return {
+        "status": status,
+        "employee": _employee_name(employee),
+        "employee_id": employee.get("employee_id") or employee.get("id"),
+        "file_id": file_id,
+        "file_name": file_name,
+        **extra,
+    }
+
+
+def _failure_reason(exc: BaseException) -> str:
+    if isinstance(exc, RuntimeError) and str(exc) == "cancelled":
+        return "cancelled"
+    return f"{type(exc).__name__}: {exc}"
+
+
+def _measurements(job: dict) -> dict:
+    return {key: job[key] for key in ("bytes", "timings", "slow") if key in job}
+
+
+def _add_timings(timings: dict, extra: dict):
+    for stage, seconds in extra.items():
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def _failed_job(job: dict, exc: BaseException) -> dict:
+    measured = _measurements(job)
+    # Slow parses that ended in an error travel on the exception (see parse_document).
+    slow = getattr(exc, "slow_documents", None)
+    if slow:
+        measured["slow"] = measured.get("slow", []) + slow
+    if isinstance(exc, UnknownLayoutError):
+        measured["unknown_layout"] = True
+        measured["layout_fingerprint"] = exc.fingerprint
+    return _result(
+        job["employee"],
+        job["file_id"],
+        job["file_name"],
+        "failed",
+        reason=_failure_reason(exc),
+        **measured,
+    )
+
+
+def download_document(creds, employee: dict, doc: dict, out_dir: str, stop_event: threading.Event) -> dict:
+    """I/O stage: fetch the PDF bytes and prepare the output folder.
+
+    Returns a job dict carrying the raw ``data``, its size in ``bytes`` and the
+    download time in ``timings``; on failure the dict already is a final
+    ``failed`` result (it has a ``status`` key).
+    """
     file_id = doc.get("file_id")
     file_name = doc.get("file_name") or file_id or "unknown.pdf"
+    metrics.QUEUE_DEPTH.dec(queue="downloads")
 
     if stop_event.is_set():
-        return {
-            "status": "failed",
-            "employee": emp_name,
-            "employee_id": employee.get("employee_id") or employee.get("id"),
-            "file_id": file_id,
-            "file_name": file_name,
-            "reason": "cancelled",
-        }
-
+        return _result(employee, file_id, file_name, "failed", reason="cancelled")
     if not file_id:
-        return {
-            "status": "failed",
-            "employee": emp_name,
-            "file_id": file_id,
-            "file_name": file_name,
-            "reason": "missing file_id",
-        }
+        return _result(employee, file_id, file_name, "failed", reason="missing file_id")
 
-    safe_emp = safe_name(emp_name)
+    safe_emp = safe_name(_employee_name(employee))
     base_name = safe_name(file_name)
     if not base_name.lower().endswith(".pdf"):
         base_name = f"{base_name}.pdf"
     file_tag = f"{os.path.splitext(base_name)[0]}__{file_id[:8]}"
+    file_dir = os.path.join(out_dir, safe_emp, file_tag)
 
-    emp_dir = os.path.join(out_dir, safe_emp)
-    file_dir = os.path.join(emp_dir, file_tag)
-    ensure_dir(file_dir)
-
+    start = time.perf_counter()
+    metrics.INFLIGHT.inc(pool="download")
     try:
-        if stop_event.is_set():
-            raise RuntimeError("cancelled")
+        drive = get_drive_service(creds)
         stream = download_pdf_stream(drive, file_id)
+        try:
+            data = stream.getvalue()
+        finally:
+            stream.close()
         if stop_event.is_set():
             raise RuntimeError("cancelled")
-        parsed = parse_pdf(stream)
-
-        days_path = os.path.join(file_dir, "days.csv")
-        pairs_path = os.path.join(file_dir, "pairs.csv")
-        totals_path = os.path.join(file_dir, "totals.json")
-        report_path = os.path.join(file_dir, "report.json")
-
-        parsed.days_df.to_csv(days_path, index=False)
-        parsed.pairs_df.to_csv(pairs_path, index=False)
-        _write_json(totals_path, parsed.totals)
-        _write_json(
-            report_path,
-            {
-                "meta": parsed.meta,
-                "totals": parsed.totals,
-                "validation": parsed.validation,
-            },
+    except Exception as exc:
+        metrics.DOWNLOADS.inc(outcome="error")
+        return _result(
+            employee,
+            file_id,
+            file_name,
+            "failed",
+            reason=_failure_reason(exc),
+            timings={"download": time.perf_counter() - start},
         )
-        return {
-            "status": "success",
-            "employee": emp_name,
-            "employee_id": employee.get("employee_id") or employee.get("id"),
-            "file_id": file_id,
-            "file_name": file_name,
-            "outputs": {
-                "days_csv": days_path,
-                "pairs_csv": pairs_path,
-                "totals_json": totals_path,
-                "report_json": report_path,
-            },
-        }
+    finally:
+        metrics.INFLIGHT.dec(pool="download")
+
+    metrics.DOWNLOADS.inc(outcome="ok")
+    metrics.DOWNLOAD_BYTES.inc(len(data))
+    return {
+        "employee": employee,
+        "file_id": file_id,
+        "file_name": file_name,
+        "file_dir": file_dir,
+        "data": data,
+        "content_hash": hashlib.sha256(data).hexdigest(),
+        "bytes": len(data),
+        "timings": {"download": time.perf_counter() - start},
+    }
+
+
+def plan_segments(data: bytes, timings: dict | None = None) -> list | None:
+    """Page ranges of a multi-month bundle, or ``None`` for a single cartellino.
+
+    Only PDFs that ``may_be_bundle`` (a page count, plus the first and last
+    page headers of multi-page files) are segmented in full. Reading the page
+    headers counts as extraction time in ``timings``. This reads the PDF, so
+    it belongs in a parse worker, not a download thread.
+    """
+    from cartellino_parser.segments import may_be_bundle, segment_pages
+
+    start = time.perf_counter()
+    segments = segment_pages(io.BytesIO(data)) if may_be_bundle(io.BytesIO(data)) else []
+    if timings is not None:
+        _add_timings(timings, {"extract": time.perf_counter() - start})
+    return segments if len(segments) > 1 else None
+
+
+def lookup_document(
+    data: bytes, cache: ParseCache | None = None, backend: str = DEFAULT_BACKEND
+) -> tuple[str | None, dict | None, list | None]:
+    """``(cache key, cached record, cached bundle segments)`` for downloaded PDF bytes.
+
+    Only hashes the bytes, no page is read: a known single cartellino comes
+    back as its record, and a known bundle as the page ranges planned the
+    first time (cached under ``<key>-segments``, see ``_cache_plan``).
+    """
+    if cache is None:
+        return None, None, None
+    key = content_key(data, backend)
+    record = cache.get(key)
+    if record is not None:
+        return key, record, None
+    plan = cache.get(f"{key}-segments", count=False)
+    return key, None, None if plan is None else plan["segments"]
+
+
+def _cache_plan(cache: ParseCache | None, key: str | None, segments: list):
+    if cache is not None and key is not None:
+        cache.put(f"{key}-segments", {"segments": segments})
+
+
+def plan_and_parse(
+    data: bytes,
+    backend: str = DEFAULT_BACKEND,
+    capture=None,
+    document: str | None = None,
+) -> tuple[list | None, dict | None, dict, list]:
+    """CPU stage for PDFs not found in the cache: ``(segments, record, timings, slow)``.
+
+    A bundle comes back as its ``segments`` (and no record), for the caller to
+    spread over the workers; anything else is parsed right here.
+    """
+    timings: dict = {}
+    segments = plan_segments(data, timings)
+    if segments:
+        return segments, None, timings, []
+    record, parse_timings, slow = parse_document(data, None, backend, capture, document)
+    _add_timings(timings, parse_timings)
+    return None, record, timings, slow
+
+
+# Put on the results queue for a bundle whose segments were just planned.
+PLANNED = object()
+
+
+def _own_capture(capture):
+    # A private copy per call, so ``captured`` only holds this document's entries
+    # (the shared one is used from several download threads with --parse-workers 0).
+    return None if capture is None else dataclasses.replace(capture, captured=[])
+
+
+def parse_document(
+    data: bytes,
+    cache: ParseCache | None = None,
+    backend: str = DEFAULT_BACKEND,
+    capture=None,
+    document: str | None = None,
+) -> tuple[dict, dict, list]:
+    """CPU stage: parse PDF bytes into a compact, cheaply picklable record.
+
+    Returns ``(record, timings, slow)``: the extract/parse seconds and the
+    entries of a ``SlowDocumentCapture`` that profiled this document.
+    """
+    from cartellino_parser.parser import parse_pdf
+
+    timings: dict = {}
+    capture = _own_capture(capture)
+    stream = io.BytesIO(data)
+    if document:
+        stream.name = document
+    try:
+        parsed = parse_pdf(stream, cache=cache, backend=backend, timings=timings, capture=capture)
     except Exception as exc:
-        if isinstance(exc, RuntimeError) and str(exc) == "cancelled":
-            reason = "cancelled"
-        else:
-            reason = f"{type(exc).__name__}: {exc}"
-        return {
-            "status": "failed",
-            "employee": emp_name,
-            "employee_id": employee.get("employee_id") or employee.get("id"),
-            "file_id": file_id,
-            "file_name": file_name,
-            "reason": reason,
-        }
+        if capture is not None and capture.captured:
+            exc.slow_documents = capture.captured
+        raise
+    return parsed.to_record(), timings, [] if capture is None else capture.captured
+
+
+def parse_chunk(
+    data: bytes,
+    segments: list,
+    backend: str = DEFAULT_BACKEND,
+    capture=None,
+    document: str | None = None,
+) -> tuple[list, dict, list]:
+    """CPU stage for bundles: ``(segment results, timings, slow)`` for some of its page ranges."""
+    from cartellino_parser.segments import parse_segments
+
+    timings: dict = {}
+    capture = _own_capture(capture)
+    results = parse_segments(data, segments, backend, timings, capture, document)
+    return results, timings, [] if capture is None else capture.captured
+
+
+def _merge_chunks(chunks: list[tuple[list, dict, list]]) -> tuple[list, dict, list]:
+    results: list = []
+    timings: dict = {}
+    slow: list = []
+    for chunk_results, chunk_timings, chunk_slow in chunks:
+        results.extend(chunk_results)
+        _add_timings(timings, chunk_timings)
+        slow.extend(chunk_slow)
+    return results, timings, slow
+
+
+def _gather(futures: list[Future]) -> Future:
+    """One future resolving to the merged ``parse_chunk`` results of ``futures``, in order."""
+    gathered: Future = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            gathered.set_result(_merge_chunks([f.result() for f in futures]))
+        except BaseException as exc:
+            gathered.set_exception(exc)
+
+    for f in futures:
+        f.add_done_callback(on_done)
+    return gathered
+
+
+def _write_outputs(
+    file_dir: str,
+    parsed: ParsedCartellino,
+    sink=None,
+    document: str = "",
+    content_hash: str | None = None,
+) -> dict:
+    if sink is not None:
+        sink.add(parsed, document=document, content_hash=content_hash)
+        return sink.describe(document)
+
+    ensure_dir(file_dir)
+    days_path = os.path.join(file_dir, "days.csv")
+    pairs_path = os.path.join(file_dir, "pairs.csv")
+    totals_path = os.path.join(file_dir, "totals.json")
+    report_path = os.path.join(file_dir, "report.json")
+
+    parsed.days_df.to_csv(days_path, index=False)
+    parsed.pairs_df.to_csv(pairs_path, index=False)
+    _write_json(totals_path, parsed.totals)
+    _write_json(
+        report_path,
+        {
+            "meta": parsed.meta,
+            "totals": parsed.totals,
+            "validation": parsed.validation,
+        },
+    )
+    return {
+        "days_csv": days_path,
+        "pairs_csv": pairs_path,
+        "totals_json": totals_path,
+        "report_json": report_path,
+    }
+
+
+def write_segments(job: dict, results: list, sink=None) -> dict:
+    """Output stage for bundles: one ``<year>-<month>`` subfolder per segment."""
+    segments = []
+    layouts = set()
+    try:
+        for segment, (record, reason) in zip(job["segments"], results):
+            entry = {"pages": [segment.start + 1, segment.stop], "month": segment.month, "year": segment.year}
+            if record is None:
+                segments.append({**entry, "status": "failed", "reason": reason})
+                continue
+            parsed = ParsedCartellino.from_record(record)
+            seg_dir = os.path.join(job["file_dir"], segment.tag)
+            document = f"{job['file_id']}:{segment.tag}"
+            outputs = _write_outputs(seg_dir, parsed, sink, document, job.get("content_hash"))
+            layouts.add((parsed.meta.get("layout"), parsed.meta.get("layout_fingerprint")))
+            segments.append({**entry, "status": "success", "outputs": outputs})
+    except Exception as exc:
+        return _failed_job(job, exc)
+
+    parsed_count = sum(1 for entry in segments if entry["status"] == "success")
+    if not parsed_count:
+        return _result(
+            job["employee"],
+            job["file_id"],
+            job["file_name"],
+            "failed",
+            reason="no parsable segment",
+            segments=segments,
+        )
+    layout, layout_fingerprint = sorted(layouts, key=str)[0]
+    return _result(
+        job["employee"],
+        job["file_id"],
+        job["file_name"],
+        "success",
+        layout=layout,
+        layout_fingerprint=layout_fingerprint,
+        outputs={"segments": segments},
+    )
+
+
+def write_document(job: dict, record, sink=None) -> dict:
+    """Output stage: write days/pairs/totals/report for a parsed record.
+
+    With a ``sink`` (``DatasetWriter`` or ``ResultStore``) the rows go there
+    instead of per-file CSV/JSON. The result carries the job's ``bytes`` and
+    ``timings``, including the time spent here as ``write``.
+    """
+    start = time.perf_counter()
+    if "segments" in job:
+        result = write_segments(job, record, sink)
+    else:
+        result = _write_single(job, record, sink)
+    if "timings" in job:
+        _add_timings(job["timings"], {"write": time.perf_counter() - start})
+    result.update(_measurements(job))
+    return result
+
+
+def _write_single(job: dict, record, sink=None) -> dict:
+    employee = job["employee"]
+    file_dir = job["file_dir"]
+    try:
+        parsed = ParsedCartellino.from_record(record)
+        outputs = _write_outputs(file_dir, parsed, sink, job["file_id"], job.get("content_hash"))
+    except Exception as exc:
+        return _failed_job(job, exc)
+    return _result(
+        employee,
+        job["file_id"],
+        job["file_name"],
+        "success",
+        layout=parsed.meta.get("layout"),
+        layout_fingerprint=parsed.meta.get("layout_fingerprint"),
+        outputs=outputs,
+    )
+
+
+def process_document(
+    creds,
+    employee: dict,
+    doc: dict,
+    out_dir: str,
+    stop_event: threading.Event,
+    cache: ParseCache | None = None,
+    backend: str = DEFAULT_BACKEND,
+    sink=None,
+    capture=None,
+):
+    """Run all three stages in the calling thread (``--parse-workers 0``)."""
+    job = download_document(creds, employee, doc, out_dir, stop_event)
+    if "status" in job:
+        return job
+
+    data = job.pop("data")
+    metrics.INFLIGHT.inc(pool="parse")
+    try:
+        key, record, segments = lookup_document(data, cache, backend)
+        timings, slow = {}, []
+        if record is None and segments is None:
+            segments, record, timings, slow = plan_and_parse(data, backend, capture, job["file_id"])
+            if segments:
+                _cache_plan(cache, key, segments)
+            elif key is not None:
+                cache.put(key, record)
+        if segments:
+            job["segments"] = segments
+            record, chunk_timings, slow = parse_chunk(data, segments, backend, capture, job["file_id"])
+            _add_timings(timings, chunk_timings)
+    except Exception as exc:
+        return _failed_job(job, exc)
     finally:
+        metrics.INFLIGHT.dec(pool="parse")
+    _add_timings(job["timings"], timings)
+    if slow:
+        job["slow"] = slow
+    return write_document(job, record, sink)
+
+
+def _init_parse_worker():
+    # Ctrl-C is handled by the parent, which cancels pending work and flushes the report.
+    from cartellino_parser.parser import warm_up
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    warm_up()
+
+
+def _acquire_slot(slots: threading.Semaphore, stop_event: threading.Event) -> bool:
+    while not slots.acquire(timeout=0.5):
+        if stop_event.is_set():
+            return False
+    return True
+
+
+def _download_stage(creds, employee, doc, out_dir, stop_event, slots):
+    # A slot bounds how many downloaded-but-unparsed PDFs are held in memory.
+    if not _acquire_slot(slots, stop_event):
+        return _result(
+            employee,
+            doc.get("file_id"),
+            doc.get("file_name") or doc.get("file_id") or "unknown.pdf",
+            "failed",
+            reason="cancelled",
+        )
+    job = download_document(creds, employee, doc, out_dir, stop_event)
+    if "status" in job:
+        slots.release()
+    return job
+
+
+def iter_processed(
+    creds,
+    docs: list[tuple[dict, dict]],
+    out_dir: str,
+    stop_event: threading.Event,
+    download_workers: int,
+    parse_workers: int,
+    cache: ParseCache | None = None,
+    backend: str = DEFAULT_BACKEND,
+    sink=None,
+    capture=None,
+):
+    """Yield one result per document as the pipeline completes them.
+
+    Downloads run on a thread pool and feed a process pool of warm parse
+    workers; outputs are written from the consuming thread. With a ``cache``,
+    PDFs whose bytes were parsed before skip the parse stage entirely. PDFs
+    bundling several months are split into page ranges parsed in parallel.
+    With a ``SlowDocumentCapture``, results of profiled documents list its
+    entries under ``slow``.
+    """
+    metrics.QUEUE_DEPTH.set(len(docs), queue="downloads")
+    if parse_workers <= 0:
+        with ThreadPoolExecutor(max_workers=download_workers) as pool:
+            futures = [
+                pool.submit(
+                    process_document,
+                    creds,
+                    emp,
+                    doc,
+                    out_dir,
+                    stop_event,
+                    cache,
+                    backend,
+                    sink,
+                    capture,
+                )
+                for emp, doc in docs
+            ]
+            try:
+                for f in as_completed(futures):
+                    yield f.result()
+            except BaseException:
+                stop_event.set()
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+        return
+
+    from cartellino_parser.segments import split_contiguous
+
+    done: queue.Queue = queue.Queue()
+    slots = threading.BoundedSemaphore(parse_workers * 2)
+
+    io_pool = ThreadPoolExecutor(max_workers=download_workers)
+    cpu_pool = ProcessPoolExecutor(max_workers=parse_workers, initializer=_init_parse_worker)
+    with io_pool, cpu_pool:
+        parsing = [0]
+        parsing_lock = threading.Lock()
+
+        def track_parsing(delta):
+            # Documents between download and parsed: the first parse_workers
+            # occupy a worker, the rest wait in the process pool's queue.
+            with parsing_lock:
+                parsing[0] += delta
+                metrics.INFLIGHT.set(min(parsing[0], parse_workers), pool="parse")
+                metrics.QUEUE_DEPTH.set(max(parsing[0] - parse_workers, 0), queue="parse")
+
+        def release():
+            slots.release()
+            track_parsing(-1)
+
+        def on_parsed(job, future):
+            release()
+            done.put((job, future))
+
+        def on_downloaded(future):
+            if future.cancelled():
+                return
+            job = future.result()
+            if "status" in job:
+                done.put((job, None))
+                return
+            track_parsing(1)
+            try:
+                key, record, segments = lookup_document(job["data"], cache, backend)
+            except Exception as exc:
+                release()
+                done.put((_failed_job(job, exc), None))
+                return
+            if record is not None:
+                job.pop("data")
+                cached = Future()
+                cached.set_result((record, {}, []))
+                on_parsed(job, cached)
+                return
+            if key is not None:
+                job["cache_key"] = key
+            if segments:
+                submit_chunks(job, segments)
+                return
+            # Whether this is a bundle is decided in the worker: nothing is
+            # extracted on the download threads.
+            submit(plan_and_parse, job["data"], backend, capture, job["file_id"]).add_done_callback(
+                functools.partial(on_planned, job)
+            )
+
+        def submit(fn, *args):
+            try:
+                return cpu_pool.submit(fn, *args)
+            except RuntimeError as exc:
+                failed: Future = Future()
+                failed.set_exception(exc)
+                return failed
+
+        def on_planned(job, future):
+            try:
+                segments, record, timings, slow = future.result()
+            except Exception:
+                job.pop("data")
+                on_parsed(job, future)
+                return
+            _add_timings(job["timings"], timings)
+            if segments:
+                # Chunks are submitted from the consuming thread, not this callback.
+                job["segments"] = segments
+                done.put((job, PLANNED))
+                return
+            job.pop("data")
+            parsed = Future()
+            parsed.set_result((record, {}, slow))
+            on_parsed(job, parsed)
+
+        def submit_chunks(job, segments):
+            # Bundles of monthly cartellini: spread contiguous page ranges
+            # over the parse workers instead of parsing them in one process.
+            job["segments"] = segments
+            data = job.pop("data")
+            futures = [
+                submit(parse_chunk, data, chunk, backend, capture, job["file_id"])
+                for chunk in split_contiguous(segments, parse_workers)
+            ]
+            _gather(futures).add_done_callback(functools.partial(on_parsed, job))
+
+        for emp, doc in docs:
+            io_pool.submit(
+                _download_stage, creds, emp, doc, out_dir, stop_event, slots
+            ).add_done_callback(on_downloaded)
+
         try:
-            if "stream" in locals():
-                stream.close()
-        except Exception:
-            pass
+            remaining = len(docs)
+            while remaining:
+                job, parse_future = done.get()
+                metrics.QUEUE_DEPTH.set(done.qsize(), queue="write")
+                if parse_future is PLANNED:
+                    _cache_plan(cache, job.get("cache_key"), job["segments"])
+                    submit_chunks(job, job["segments"])
+                    continue
+                remaining -= 1
+                if parse_future is None:
+                    yield job
+                    continue
+                try:
+                    record, timings, slow = parse_future.result()
+                except Exception as exc:
+                    yield _failed_job(job, exc)
+                    continue
+                _add_timings(job["timings"], timings)
+                if slow:
+                    job["slow"] = slow
+                if "cache_key" in job and "segments" not in job:
+                    cache.put(job["cache_key"], record)
+                yield write_document(job, record, sink)
+        except BaseException:
+            stop_event.set()
+            io_pool.shutdown(wait=False, cancel_futures=True)
+            cpu_pool.shutdown(wait=False, cancel_futures=True)
+            raise
 
 
 def main():
@@ -310,16 +926,78 @@ def main():
     parser.add_argument("--manifest", required=True)
     parser.add_argument("--out", default="downloads")
     parser.add_argument("--report", default="report.json")
-    parser.add_argument("--workers", type=int, default=6)
+    parser.add_argument(
+        "--download-workers",
+        "--workers",
+        dest="download_workers",
+        type=int,
+        default=6,
+        help="Threads downloading PDFs from Drive",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes parsing PDFs (0 parses inside the download threads)",
+    )
+    parser.add_argument(
+        "--backend",
+        default=DEFAULT_BACKEND,
+        choices=sorted(BACKENDS),
+        help="PDF text extraction backend",
+    )
+    parser.add_argument("--cache-dir", help="Reuse parse results of identical PDFs from this folder")
+    parser.add_argument("--cache-max-mb", type=int, default=1024)
+    parser.add_argument(
+        "--format",
+        default="csv",
+        choices=["csv", "parquet", "sqlite"],
+        help=(
+            "csv: four files per PDF; parquet: days/pairs/totals dataset under --out; "
+            f"sqlite: {DB_NAME} under --out"
+        ),
+    )
+    parser.add_argument("--flush-rows", type=int, default=DEFAULT_FLUSH_ROWS)
+    parser.add_argument(
+        "--slow-seconds",
+        type=float,
+        help="Profile and keep a copy of documents whose parse takes longer than this",
+    )
+    parser.add_argument(
+        "--slow-mb",
+        type=float,
+        help="Profile and keep a copy of documents whose parse peaks above this many MB",
+    )
+    parser.add_argument("--slow-dir", help="Where slow documents go (default: <out>/slow)")
+    metrics.add_arguments(parser)
     parser.add_argument("--verbose", "-v", action="store_true")
     args = parser.parse_args()
+    if args.slow_mb is not None and args.parse_workers == 0 and args.download_workers > 1:
+        # tracemalloc is process-wide: download threads parsing side by side would share one peak.
+        parser.error("--slow-mb needs --parse-workers > 0 (or a single --download-workers)")
 
     setup_logging(args.verbose)
     config.validate_env()
     ensure_dir(args.out)
+    cache = None
+    if args.cache_dir:
+        cache = ParseCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+    sink = None
+    if args.format == "parquet":
+        sink = DatasetWriter(args.out, flush_rows=args.flush_rows)
+    elif args.format == "sqlite":
+        sink = ResultStore(os.path.join(args.out, DB_NAME))
+    capture = None
+    if args.slow_seconds is not None or args.slow_mb is not None:
+        capture = SlowDocumentCapture(
+            args.slow_dir or os.path.join(args.out, "slow"),
+            max_seconds=args.slow_seconds,
+            max_peak_mb=args.slow_mb,
+        )
 
     creds = load_creds()
     manifest = load_manifest(args.manifest)
+    exporters = metrics.start_exporters(args)
 
     employees = manifest.get("employees") or []
 
@@ -330,90 +1008,167 @@ def main():
     base_employees = _build_base_employees(employees)
     _merge_report_into_base(base_employees, report)
     cached = _collect_cached_ids(list(base_employees.values()))
+    # Documents profiled by earlier runs stay in the index: they are not parsed again.
+    slow_documents = list((report.get("run") or {}).get("slow_documents", []))
 
     docs = []
+    # A file with several parents can be listed under more than one folder.
+    queued: set[str] = set()
     for emp in employees:
         for doc in emp.get("included", []):
             file_id = doc.get("file_id")
-            if file_id and file_id in cached:
+            if file_id and (file_id in cached or file_id in queued):
                 continue
+            if file_id:
+                queued.add(file_id)
             docs.append((emp, doc))
 
     t0 = time.time()
-    flush_every = 25
-    processed_since_flush = 0
+    report_every = 25
+    processed_since_report = 0
+    progress = SinkProgress(sink) if sink is not None else None
     stop_event = threading.Event()
 
     interrupted = False
-    with ThreadPoolExecutor(max_workers=args.workers) as pool:
-        futures = [
-            pool.submit(process_document, creds, emp, doc, args.out, stop_event)
-            for emp, doc in docs
-        ]
-        try:
-            for i, f in enumerate(as_completed(futures), 1):
-                result = f.result()
-                if result["status"] == "failed":
-                    logger.debug("Failed %s (%s)", result["file_name"], result["reason"])
-                if result.get("employee_id"):
-                    emp_key = f"id:{result.get('employee_id')}"
-                else:
-                    emp_key = f"name:{_normalize_name(result.get('employee'))}"
-                if emp_key not in base_employees:
-                    base_employees[emp_key] = {
-                        "employee": result.get("employee") or "unknown",
-                        "employee_id": result.get("employee_id"),
-                        "included": [],
-                        "skipped": [],
-                        "excluded_folders": [],
+    unknown_layouts: dict = {}
+    total = len(docs)
+    stats = RunStats(total)
+    results = iter_processed(
+        creds,
+        docs,
+        args.out,
+        stop_event,
+        args.download_workers,
+        args.parse_workers,
+        cache,
+        args.backend,
+        sink,
+        capture,
+    )
+    try:
+        for i, result in enumerate(results, 1):
+            if result["status"] == "failed":
+                logger.debug("Failed %s (%s)", result["file_name"], result["reason"])
+            stats.add(result)
+            metrics.observe_document(result)
+            for entry in result.get("slow", []):
+                logger.info(
+                    "Slow document %s (%s), profile in %s",
+                    result["file_name"],
+                    ", ".join(entry["reasons"]),
+                    entry["path"],
+                )
+                slow_documents.append(
+                    {
+                        "file_id": result.get("file_id"),
+                        "file_name": result.get("file_name"),
+                        "employee": result.get("employee"),
+                        **entry,
                     }
-                if result["status"] == "success":
-                    _upsert_item(
-                        base_employees[emp_key]["included"],
-                        {
-                            "file_id": result.get("file_id"),
-                            "file_name": result.get("file_name"),
-                            "outputs": result.get("outputs"),
-                        },
-                    )
+                )
+            _track_unknown_layout(unknown_layouts, result)
+            if result.get("employee_id"):
+                emp_key = f"id:{result.get('employee_id')}"
+            else:
+                emp_key = f"name:{_normalize_name(result.get('employee'))}"
+            if emp_key not in base_employees:
+                base_employees[emp_key] = {
+                    "employee": result.get("employee") or "unknown",
+                    "employee_id": result.get("employee_id"),
+                    "included": [],
+                    "skipped": [],
+                    "excluded_folders": [],
+                }
+            if result["status"] == "success":
+                item = {
+                    "file_id": result.get("file_id"),
+                    "file_name": result.get("file_name"),
+                    "outputs": result.get("outputs"),
+                }
+                if progress is not None:
+                    progress.hold(emp_key, result, item)
                 else:
-                    _upsert_item(
-                        base_employees[emp_key]["skipped"],
-                        {
-                            "file_id": result.get("file_id"),
-                            "file_name": result.get("file_name"),
-                            "reason": result.get("reason"),
-                        },
-                    )
-                processed_since_flush += 1
-                if processed_since_flush >= flush_every:
-                    _write_report(
-                        report_path,
-                        manifest.get("root_id"),
-                        _finalize_employees(base_employees, employees),
-                    )
-                    processed_since_flush = 0
-                if i % 25 == 0 or i == len(futures):
-                    logger.info("Progress %s/%s files", i, len(futures))
-        except KeyboardInterrupt:
-            stop_event.set()
-            for future in futures:
-                future.cancel()
-            logger.warning("Interrupted by user, flushing report...")
-            interrupted = True
+                    _upsert_item(base_employees[emp_key]["included"], item)
+            else:
+                _upsert_item(
+                    base_employees[emp_key]["skipped"],
+                    {
+                        "file_id": result.get("file_id"),
+                        "file_name": result.get("file_name"),
+                        "reason": result.get("reason"),
+                    },
+                )
+            if progress is not None:
+                # Rows must be on disk before the report marks their files as done.
+                for key, section, item in progress.settle():
+                    _upsert_item(base_employees[key][section], item)
+            processed_since_report += 1
+            if processed_since_report >= report_every:
+                _write_report(
+                    report_path,
+                    manifest.get("root_id"),
+                    _finalize_employees(base_employees, employees),
+                    run={
+                        "unknown_layouts": unknown_layouts,
+                        "stats": stats.summary(),
+                        "slow_documents": slow_documents,
+                    },
+                )
+                processed_since_report = 0
+            if i % 25 == 0 or i == total or stats.since_log() >= PROGRESS_INTERVAL:
+                logger.info("Progress %s", stats.progress())
+    except KeyboardInterrupt:
+        stop_event.set()
+        results.close()
+        logger.warning("Interrupted by user, flushing report...")
+        interrupted = True
 
     if interrupted:
         logger.info("Stopped after %.1fs", time.time() - t0)
     else:
         logger.info("Done in %.1fs", time.time() - t0)
+    summary = stats.summary()
+    logger.info(
+        "%s documents (%s failed), %.1f MB in %s: %.1f docs/s, %.2f MB/s",
+        summary["documents"],
+        summary["failed"],
+        summary["bytes"] / (1024 * 1024),
+        format_duration(summary["elapsed_s"]),
+        summary["docs_per_s"],
+        summary["mb_per_s"],
+    )
+    for stage, entry in summary["stages"].items():
+        logger.info(
+            "Stage %-8s total %.1fs, p50 %.1f ms, p95 %.1f ms, max %.1f ms",
+            stage,
+            entry["total_s"],
+            entry["p50_ms"],
+            entry["p95_ms"],
+            entry["max_ms"],
+        )
+    if sink is not None:
+        sink.close()
+        for key, section, item in progress.settle():
+            _upsert_item(base_employees[key][section], item)
+        if len(progress):
+            logger.warning("%s file(s) not confirmed as written, left out of the report", len(progress))
+    if cache is not None:
+        logger.info("Parse cache: %s hits, %s misses", cache.hits, cache.misses)
+    if unknown_layouts:
+        logger.warning(
+            "Unknown layouts: %s",
+            ", ".join(f"{fp} x{entry['count']}" for fp, entry in unknown_layouts.items()),
+        )
 
     _write_report(
         report_path,
         manifest.get("root_id"),
         _finalize_employees(base_employees, employees),
+        run={"unknown_layouts": unknown_layouts, "stats": summary, "slow_documents": slow_documents},
     )
 
     logger.info("Report saved to %s", report_path)
+    metrics.stop_exporters(exporters)
 
 
 if __name__ == "__main__":
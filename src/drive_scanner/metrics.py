@@ -0,0 +1,276 @@
+"""Prometheus text-format metrics for long ``drive-scan``/``drive-filter`` runs.
+
+Dependency free: counters, gauges and histograms live in a process-wide
+registry and are exported either by rewriting a ``.prom`` file every few
+seconds (for node_exporter's textfile collector) or on a local HTTP endpoint.
+"""
+import os
+import bisect
+import threading
+
+PREFIX = "drive_scanner_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _label_key(label_names: tuple, labels: dict) -> tuple:
+    if set(labels) != set(label_names):
+        raise ValueError(f"expected labels {label_names}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in label_names)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = PREFIX + name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = self._header()
+        for key, value in values:
+            lines.append(f"{self.name}{_labels_text(self.label_names, key)} {_number(value)}")
+        return lines
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(self.label_names, labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket (not yet cumulative) counts, then sum and count.
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def value(self, **labels) -> float:
+        """Number of observations."""
+        with self._lock:
+            entry = self._values.get(_label_key(self.label_names, labels))
+            return entry[2] if entry else 0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted((key, (list(e[0]), e[1], e[2])) for key, e in self._values.items())
+        lines = self._header()
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels_text(self.label_names, key, le)} {cumulative}")
+            labels = _labels_text(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[_Metric] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+    def reset(self):
+        for metric in self.metrics:
+            metric.reset()
+
+
+REGISTRY = Registry()
+
+DRIVE_CALLS = REGISTRY.register(
+    Counter("drive_calls_total", "Drive API requests by operation and outcome", ("operation", "outcome"))
+)
+DRIVE_CALL_SECONDS = REGISTRY.register(
+    Histogram("drive_call_seconds", "Drive API request latency, retries included", ("operation",))
+)
+DRIVE_RETRIES = REGISTRY.register(
+    Counter("drive_retries_total", "Drive API requests retried after an error", ("operation", "reason"))
+)
+DRIVE_BACKOFF_SECONDS = REGISTRY.register(
+    Counter("drive_backoff_seconds_total", "Seconds slept before retrying Drive API requests", ("operation",))
+)
+TOKEN_REFRESHES = REGISTRY.register(Counter("token_refreshes_total", "OAuth access token refreshes"))
+SCAN_FOLDERS = REGISTRY.register(
+    Counter("scan_folders_total", "Folders listed by drive-scan", ("outcome",))
+)
+SCAN_FILES = REGISTRY.register(Counter("scan_files_total", "Files collected by drive-scan", ("kind",)))
+DOWNLOADS = REGISTRY.register(Counter("downloads_total", "PDF downloads by outcome", ("outcome",)))
+DOWNLOAD_BYTES = REGISTRY.register(Counter("download_bytes_total", "Bytes of PDF downloaded"))
+DOCUMENTS = REGISTRY.register(
+    Counter("documents_total", "Documents processed by drive-filter", ("status", "reason"))
+)
+STAGE_SECONDS = REGISTRY.register(
+    Histogram("stage_seconds", "Per-document time spent in each pipeline stage", ("stage",))
+)
+QUEUE_DEPTH = REGISTRY.register(Gauge("queue_depth", "Work items waiting in each queue", ("queue",)))
+INFLIGHT = REGISTRY.register(Gauge("inflight_workers", "Workers busy in each pool", ("pool",)))
+
+
+def failure_kind(reason: str | None) -> str:
+    """Low-cardinality label for a failure reason: the exception name or the short reason."""
+    if not reason:
+        return "unknown"
+    return reason.split(":", 1)[0].strip()[:60]
+
+
+def observe_document(result: dict):
+    """Count one ``drive-filter`` result and its per-stage timings."""
+    if result.get("status") == "success":
+        DOCUMENTS.inc(status="success", reason="")
+    else:
+        DOCUMENTS.inc(status="failed", reason=failure_kind(result.get("reason")))
+    for stage, seconds in (result.get("timings") or {}).items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+class MetricsFileWriter:
+    """Rewrites ``path`` with the registry contents every ``interval`` seconds."""
+
+    def __init__(self, path: str, interval: float = 15.0, registry: Registry = REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-file", daemon=True)
+        self._thread.start()
+
+    def write(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.registry.render())
+        # Atomic swap: scrapers never see a half-written file.
+        os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.write()
+
+
+class MetricsServer:
+    """Serves the registry on ``http://<host>:<port>/metrics`` from a daemon thread."""
+
+    def __init__(self, port: int, host: str = "127.0.0.1", registry: Registry = REGISTRY):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._thread.join()
+
+
+def add_arguments(parser):
+    parser.add_argument("--metrics-file", help="Rewrite Prometheus text-format metrics to this file")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--metrics-interval", type=float, default=15.0, help="Seconds between metrics-file writes")
+
+
+def start_exporters(args) -> list:
+    exporters = []
+    if args.metrics_file:
+        exporters.append(MetricsFileWriter(args.metrics_file, args.metrics_interval))
+    if args.metrics_port is not None:
+        exporters.append(MetricsServer(args.metrics_port))
+    return exporters
+
+
+def stop_exporters(exporters: list):
+    for exporter in exporters:
+        exporter.stop()
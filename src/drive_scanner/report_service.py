@@ -3,17 +3,31 @@ import time
 import os
 
 
-def write_manifest(out_dir: str, root_id: str, reports: list[dict]):
-    report_path = os.path.join(out_dir, "manifest.json")
-    with open(report_path, "w", encoding="utf-8") as f:
-        json.dump(
-            {
-                "root_id": root_id,
-                "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                "employee_count": len(reports),
-                "employees": reports,
-            },
-            f,
-            indent=2,
-        )
+MANIFEST_NAME = "manifest.json"
+
+
+def write_manifest(out_dir: str, root_id: str, reports: list[dict], changes_page_token: str | None = None):
+    report_path = os.path.join(out_dir, MANIFEST_NAME)
+    manifest = {
+        "root_id": root_id,
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "employee_count": len(reports),
+        "employees": reports,
+    }
+    if changes_page_token is not None:
+        # Where the next ``drive-scan --incremental`` resumes the changes feed.
+        manifest["changes_page_token"] = changes_page_token
+    # Replaced in one step: an interrupted write leaves the previous manifest.
+    tmp_path = f"{report_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, report_path)
     return report_path
+
+
+def load_manifest(out_dir: str) -> dict | None:
+    report_path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(report_path):
+        return None
+    with open(report_path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,108 @@
+import time
+import statistics
+from array import array
+
+STAGES = ("download", "extract", "parse", "write")
+MB = 1024 * 1024
+
+
+def _percentile(samples, pct: int) -> float:
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+def format_duration(seconds: float | None) -> str:
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+
+class RunStats:
+    """Aggregates the ``bytes`` and per-stage ``timings`` of processed documents.
+
+    Feeds the periodic progress log (documents/s, MB/s, ETA) and the ``stats``
+    section of the run report (throughput plus per-stage latency percentiles).
+    """
+
+    def __init__(self, total: int, clock=time.monotonic):
+        self.total = total
+        self.clock = clock
+        self.started = clock()
+        self.last_logged = self.started
+        self.documents = 0
+        self.failed = 0
+        self.bytes = 0
+        # Compact float arrays: four samples per document for runs of 100k+ PDFs.
+        self.samples = {stage: array("d") for stage in STAGES}
+
+    def add(self, result: dict):
+        self.documents += 1
+        if result.get("status") != "success":
+            self.failed += 1
+        self.bytes += result.get("bytes") or 0
+        for stage, seconds in (result.get("timings") or {}).items():
+            self.samples.setdefault(stage, array("d")).append(seconds)
+
+    def elapsed(self) -> float:
+        return max(self.clock() - self.started, 1e-9)
+
+    def docs_per_s(self) -> float:
+        return self.documents / self.elapsed()
+
+    def mb_per_s(self) -> float:
+        return self.bytes / MB / self.elapsed()
+
+    def eta_s(self) -> float | None:
+        rate = self.docs_per_s()
+        if not rate:
+            return None
+        return (self.total - self.documents) / rate
+
+    def since_log(self) -> float:
+        return self.clock() - self.last_logged
+
+    def progress(self) -> str:
+        self.last_logged = self.clock()
+        return (
+            f"{self.documents}/{self.total} files, {self.docs_per_s():.1f} docs/s, "
+            f"{self.mb_per_s():.2f} MB/s, ETA {format_duration(self.eta_s())}"
+        )
+
+    def stage_summary(self) -> dict:
+        stages = {}
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            total = sum(samples)
+            stages[stage] = {
+                "count": len(samples),
+                "total_s": round(total, 3),
+                "mean_ms": round(total / len(samples) * 1e3, 2),
+                "p50_ms": round(_percentile(samples, 50) * 1e3, 2),
+                "p95_ms": round(_percentile(samples, 95) * 1e3, 2),
+                "p99_ms": round(_percentile(samples, 99) * 1e3, 2),
+                "max_ms": round(max(samples) * 1e3, 2),
+            }
+        return stages
+
+    def summary(self) -> dict:
+        return {
+            "documents": self.documents,
+            "total": self.total,
+            "succeeded": self.documents - self.failed,
+            "failed": self.failed,
+            "bytes": self.bytes,
+            "elapsed_s": round(self.elapsed(), 3),
+            "docs_per_s": round(self.docs_per_s(), 3),
+            "mb_per_s": round(self.mb_per_s(), 3),
+            "eta_s": None if self.eta_s() is None else round(self.eta_s(), 1),
+            "stages": self.stage_summary(),
+        }
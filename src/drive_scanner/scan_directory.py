@@ -1,23 +1,61 @@
 import time
 import argparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from . import config
+from . import config, metrics
 from .auth_service import load_creds
-from .drive_client import get_drive_service, list_children
+from .changes_service import ManifestUpdater, can_update
+from .drive_client import get_drive_service, get_start_page_token, list_changes, list_children
+from .enrich_service import enrich_reports
 from .fs_utils import ensure_dir
 from .logging_utils import setup_logging, get_logger
-from .report_service import write_manifest
-from .scan_service import build_employee_report, normalize_term
+from .report_service import load_manifest, write_manifest
+from .scan_service import FolderCrawler, normalize_term
 
 logger = get_logger()
 
 
+def full_scan(creds, drive, root_id: str, exclude_terms: list[str], workers: int) -> list[dict]:
+    employees = [
+        f for f in list_children(drive, root_id)
+        if f["mimeType"] == "application/vnd.google-apps.folder"
+    ]
+
+    reports = []
+
+    # Folders, not employees, are the unit of work: a few deep trees cannot
+    # leave the other workers idle at the end of the scan.
+    crawler = FolderCrawler(creds, exclude_terms, workers=workers)
+    metrics.QUEUE_DEPTH.set(len(employees), queue="employees")
+    total_included = 0
+    for i, report in enumerate(crawler.crawl(employees), 1):
+        metrics.QUEUE_DEPTH.dec(queue="employees")
+        reports.append(report)
+        total_included += len(report["included"])
+        logger.info(
+            "Progress %s/%s employees, %s files",
+            i,
+            len(employees),
+            total_included,
+        )
+    return reports
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--root", default=config.DRIVE_ROOT_FOLDER_ID)
     parser.add_argument("--out", default=config.SCAN_REPORT_PATH)
     parser.add_argument("--workers", type=int, default=6)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Update the existing manifest from the Drive changes feed instead of crawling everything",
+    )
+    parser.add_argument(
+        "--enrich",
+        action="store_true",
+        help="Add size, md5Checksum, modifiedTime and parents to the files, in batched requests",
+    )
+    metrics.add_arguments(parser)
     parser.add_argument("--verbose", "-v", action="store_true")
     args = parser.parse_args()
 
@@ -25,36 +63,33 @@ def main():
     config.validate_env()
     ensure_dir(args.out)
     creds = load_creds()
+    exporters = metrics.start_exporters(args)
 
     drive = get_drive_service(creds)
     exclude_terms = [normalize_term(term) for term in config.EXCLUDE_TERMS]
 
-    employees = [
-        f for f in list_children(drive, args.root)
-        if f["mimeType"] == "application/vnd.google-apps.folder"
-    ]
-
     t0 = time.time()
-    reports = []
-
-    with ThreadPoolExecutor(max_workers=args.workers) as pool:
-        futures = [
-            pool.submit(build_employee_report, creds, emp, exclude_terms)
-            for emp in employees
-        ]
-        for i, f in enumerate(as_completed(futures), 1):
-            report = f.result()
-            reports.append(report)
-            total_included = sum(len(r["included"]) for r in reports)
-            logger.info(
-                "Progress %s/%s employees, %s files",
-                i,
-                len(futures),
-                total_included,
-            )
+    previous = load_manifest(args.out) if args.incremental else None
+    if previous is not None and can_update(previous, args.root):
+        changes, token = list_changes(drive, previous["changes_page_token"])
+        crawler = FolderCrawler(creds, exclude_terms, workers=args.workers)
+        updater = ManifestUpdater(drive, args.root, previous["employees"], exclude_terms, crawler.crawl)
+        reports = updater.apply(changes)
+    else:
+        if args.incremental:
+            logger.info("No manifest with a changes token for this root; running a full scan")
+        # Taken before the crawl, so changes made while it runs are replayed next time.
+        token = get_start_page_token(drive)
+        reports = full_scan(creds, drive, args.root, exclude_terms, args.workers)
+    # Written before enrichment too, so a failure there does not lose the crawl.
+    write_manifest(args.out, args.root, reports, changes_page_token=token)
+    if args.enrich:
+        # Only entries without metadata yet, so incremental runs fetch just the new files.
+        enrich_reports(creds, reports, workers=args.workers)
+        write_manifest(args.out, args.root, reports, changes_page_token=token)
 
     logger.info("Done in %.1fs", time.time() - t0)
-    write_manifest(args.out, args.root, reports)
+    metrics.stop_exporters(exporters)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,95 @@
+"""One pooled, thread-safe HTTP transport shared by every Drive client of a process."""
+import json
+import threading
+
+from . import metrics
+from .logging_utils import get_logger
+
+logger = get_logger()
+
+# Keep-alive connections kept open to googleapis.com; workers beyond this wait for one.
+POOL_SIZE = 32
+# (connect, read) seconds.
+TIMEOUT = (10, 120)
+
+_discovery_lock = threading.Lock()
+_discovery: dict = {}
+
+
+def discovery_document(api: str = "drive", version: str = "v3") -> dict:
+    """The bundled discovery document of ``api``, read and parsed once per process."""
+    with _discovery_lock:
+        if (api, version) not in _discovery:
+            from googleapiclient.discovery_cache import get_static_doc
+
+            _discovery[(api, version)] = json.loads(get_static_doc(api, version))
+        return _discovery[(api, version)]
+
+
+class SharedTransport:
+    """An ``httplib2.Http`` stand-in for googleapiclient over one pooled ``requests.Session``.
+
+    httplib2 holds a single connection and is not thread-safe, so every worker
+    used to open (and TLS-handshake) its own. Here all workers share a bounded
+    pool of keep-alive connections. The access token is refreshed under a lock,
+    once for all workers: a worker that finds it expired refreshes it and the
+    others reuse the new one. A 401 is retried once after a refresh.
+    """
+
+    def __init__(self, creds, pool_size: int = POOL_SIZE, timeout=TIMEOUT):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.creds = creds
+        self._refresh_lock = threading.Lock()
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _token(self, stale: str | None = None) -> str | None:
+        if self.creds is None:
+            return None
+        with self._refresh_lock:
+            # Another worker may have refreshed while this one waited for the lock.
+            if not self.creds.valid or (stale is not None and self.creds.token == stale):
+                from google.auth.transport.requests import Request
+
+                logger.debug("Refreshing the Drive access token")
+                self.creds.refresh(Request(self.session))
+                metrics.TOKEN_REFRESHES.inc()
+            return self.creds.token
+
+    def _send(self, uri, method, body, headers, token):
+        import requests
+
+        if token is not None:
+            headers = {**headers, "authorization": f"Bearer {token}"}
+        try:
+            return self.session.request(method, uri, data=body, headers=headers, timeout=self.timeout)
+        except requests.Timeout as exc:
+            raise TimeoutError(str(exc)) from exc
+        except requests.ConnectionError as exc:
+            raise ConnectionError(str(exc)) from exc
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        import httplib2
+
+        headers = dict(headers or {})
+        token = self._token()
+        resp = self._send(uri, method, body, headers, token)
+        if resp.status_code == 401 and token is not None:
+            resp = self._send(uri, method, body, headers, self._token(stale=token))
+
+        info = {key.lower(): value for key, value in resp.headers.items()}
+        # requests has already decoded the body.
+        info.pop("content-encoding", None)
+        info["content-length"] = str(len(resp.content))
+        info["status"] = str(resp.status_code)
+        response = httplib2.Response(info)
+        response.reason = resp.reason
+        return response, resp.content
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from cartellino_parser import parse_pdf
+from cartellino_parser.extract import get_backend
+
+DOCUMENTS = Path(__file__).resolve().parents[1] / "documents"
+
+
+@pytest.mark.parametrize("backend, module", [("pypdf", "pypdf"), ("pypdfium2", "pypdfium2")])
+def test_backend_matches_pdfplumber(backend, module) -> None:
+    pytest.importorskip(module)
+    pdf_path = DOCUMENTS / "Cartellino mensile-2022-07.pdf"
+
+    reference = parse_pdf(pdf_path)
+    parsed = parse_pdf(pdf_path, backend=backend)
+
+    pd.testing.assert_frame_equal(parsed.days_df, reference.days_df)
+    pd.testing.assert_frame_equal(parsed.pairs_df, reference.pairs_df)
+    assert parsed.totals == reference.totals
+
+
+def test_unknown_backend_is_rejected() -> None:
+    with pytest.raises(ValueError, match="available"):
+        get_backend("tesseract")
+
+
+def test_backend_must_implement_iter_page_texts() -> None:
+    from cartellino_parser.extract import TextBackend
+
+    class Incomplete(TextBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError, match="iter_page_texts"):
+        Incomplete()
@@ -0,0 +1,104 @@
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+from cartellino_parser import CartellinoParseError, ParsedCartellino, parse_many, parse_pdf
+from cartellino_parser import cli
+from cartellino_parser.cache import ParseCache
+from cartellino_parser.layouts import reset_unknown_layouts, unknown_layouts
+from cartellino_parser.synthetic import pdf_bytes
+
+DOCUMENTS = Path(__file__).resolve().parents[1] / "documents"
+MONTHLY = [
+    DOCUMENTS / "Cartellino mensile-2022-01.pdf",
+    DOCUMENTS / "Cartellino mensile-2022-07.pdf",
+    DOCUMENTS / "Cartellino mensile-2022-12.pdf",
+]
+NOT_A_CARTELLINO = pdf_bytes([["Gentile dipendente,", "in allegato il cedolino di luglio."]])
+
+
+@pytest.fixture
+def sources(tmp_path):
+    bad = tmp_path / "letter.pdf"
+    bad.write_bytes(NOT_A_CARTELLINO)
+    return [MONTHLY[0], bad, MONTHLY[1], io.BytesIO(MONTHLY[2].read_bytes())]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_parse_many_isolates_failures(sources, jobs):
+    reset_unknown_layouts()
+
+    results = list(parse_many(sources, jobs=jobs, ordered=True, backend="pypdf"))
+
+    assert [source for source, _ in results] == sources
+    outcomes = [outcome for _, outcome in results]
+    assert isinstance(outcomes[1], CartellinoParseError)
+    for path, outcome in zip(MONTHLY, outcomes[:1] + outcomes[2:]):
+        assert isinstance(outcome, ParsedCartellino)
+        assert outcome.days_df.equals(parse_pdf(path, backend="pypdf").days_df)
+    # Recorded in the worker, reported here.
+    assert unknown_layouts()["None"]["count"] >= 1
+
+
+def test_parse_many_unordered_yields_every_source(sources):
+    results = dict((id(source), outcome) for source, outcome in parse_many(sources, jobs=2, backend="pypdf"))
+
+    assert set(results) == {id(source) for source in sources}
+
+
+def test_parse_many_uses_the_cache_in_the_parent(tmp_path):
+    cache = ParseCache(tmp_path / "cache")
+    list(parse_many(MONTHLY, jobs=2, backend="pypdf", cache=cache))
+    assert cache.misses == len(MONTHLY)
+
+    results = list(parse_many(MONTHLY, jobs=2, ordered=True, backend="pypdf", cache=cache))
+
+    assert cache.hits == len(MONTHLY)
+    assert [parsed.meta["month"] for _, parsed in results] == [1, 7, 12]
+
+
+def test_cli_parses_subfolders_and_keeps_going(tmp_path, monkeypatch):
+    input_dir = tmp_path / "in"
+    (input_dir / "2022").mkdir(parents=True)
+    (input_dir / "2022" / "a.pdf").write_bytes(MONTHLY[0].read_bytes())
+    (input_dir / "b.pdf").write_bytes(NOT_A_CARTELLINO)
+    (input_dir / "c.pdf").write_bytes(MONTHLY[1].read_bytes())
+    out_dir = tmp_path / "out"
+    argv = ["cli", "parse", "--input", str(input_dir), "--out", str(out_dir), "--recursive", "--jobs", "2"]
+    monkeypatch.setattr(sys, "argv", argv + ["--backend", "pypdf"])
+
+    assert cli.main() == 1
+    assert (out_dir / "2022" / "a.days.csv").exists()
+    assert (out_dir / "c.days.csv").exists()
+    assert not (out_dir / "b.days.csv").exists()
+
+
+def test_parse_many_fails_only_the_document_that_kills_its_worker(tmp_path, monkeypatch):
+    import multiprocessing
+    import os
+
+    from concurrent.futures.process import BrokenProcessPool
+
+    from cartellino_parser import batch
+
+    if multiprocessing.get_start_method() != "fork":
+        pytest.skip("workers must inherit the patched parse_pdf")
+    poison = tmp_path / "poison.pdf"
+    poison.write_bytes(MONTHLY[0].read_bytes())
+
+    def crash_on_poison(source, **kwargs):
+        if str(source) == str(poison):
+            os._exit(1)
+        return parse_pdf(source, **kwargs)
+
+    monkeypatch.setattr(batch, "parse_pdf", crash_on_poison)
+    sources = [MONTHLY[0], MONTHLY[1], poison, MONTHLY[2], MONTHLY[1]]
+
+    results = list(parse_many(sources, jobs=2, ordered=True, backend="pypdf"))
+
+    assert [source for source, _ in results] == sources
+    outcomes = [outcome for _, outcome in results]
+    assert isinstance(outcomes[2], BrokenProcessPool)
+    assert [outcome.meta["month"] for outcome in outcomes[:2] + outcomes[3:]] == [1, 7, 12, 7]
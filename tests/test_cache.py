@@ -0,0 +1,94 @@
+import io
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from cartellino_parser import parse_pdf
+from cartellino_parser.cache import ParseCache
+
+DOCUMENTS = Path(__file__).resolve().parents[1] / "documents"
+
+
+def test_identical_bytes_are_parsed_once(tmp_path, monkeypatch) -> None:
+    original = DOCUMENTS / "Cartellino mensile-2022-07.pdf"
+    copy = tmp_path / "other-employee" / "copy.pdf"
+    copy.parent.mkdir()
+    shutil.copy(original, copy)
+    cache = ParseCache(tmp_path / "cache")
+
+    first = parse_pdf(original, cache=cache)
+    second = parse_pdf(io.BytesIO(copy.read_bytes()), cache=cache)
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert second.meta == first.meta
+    assert second.totals == first.totals
+    pd.testing.assert_frame_equal(second.days_df, first.days_df)
+    pd.testing.assert_frame_equal(second.pairs_df, first.pairs_df)
+
+
+def test_parser_version_change_drops_old_entries(tmp_path) -> None:
+    old = ParseCache(tmp_path, version="old")
+    old.put("k", {"meta": {}})
+
+    new = ParseCache(tmp_path, version="new")
+
+    assert new.get("k") is None
+    assert not (tmp_path / "old").exists()
+
+
+def test_size_bound_evicts_least_recently_used(tmp_path) -> None:
+    record = {"payload": "x" * 1000}
+    cache = ParseCache(tmp_path, max_bytes=3500, version="v")
+    for key in ("a", "b", "c"):
+        cache.put(key, record)
+    cache.get("a")
+
+    cache.put("d", record)
+
+    assert cache.size <= 3500
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("d") is not None
+
+
+def test_open_leaves_unrelated_directories_alone(tmp_path) -> None:
+    ParseCache(tmp_path, version="old").put("k", {"meta": {}})
+    (tmp_path / "downloads").mkdir()
+    (tmp_path / "downloads" / "keep.pdf").write_bytes(b"%PDF")
+    # Named like a parser version, but without the marker: not ours to delete.
+    (tmp_path / "0123456789abcdef").mkdir()
+
+    ParseCache(tmp_path, version="new")
+
+    assert (tmp_path / "downloads" / "keep.pdf").exists()
+    assert not (tmp_path / "old").exists()
+    assert (tmp_path / "0123456789abcdef").exists()
+
+
+def test_parser_version_ignores_non_parsing_modules(tmp_path, monkeypatch) -> None:
+    import cartellino_parser.cache as cache_module
+
+    package = tmp_path / "pkg"
+    package.mkdir()
+    for name in ("parser.py", "parse_days.py", "segments.py", "cli.py"):
+        (package / name).write_text("x = 1\n")
+    monkeypatch.setattr(cache_module, "__file__", str(package / "cache.py"))
+
+    def version() -> str:
+        cache_module.parser_version.cache_clear()
+        return cache_module.parser_version()
+
+    try:
+        base = version()
+        (package / "cli.py").write_text("x = 2\n")
+        assert version() == base
+        (package / "parse_days.py").write_text("x = 2\n")
+        assert version() != base
+        # Segmentation decides which pages a bundle month parses from.
+        changed = version()
+        (package / "segments.py").write_text("x = 2\n")
+        assert version() != changed
+    finally:
+        monkeypatch.undo()
+        cache_module.parser_version.cache_clear()
@@ -0,0 +1,99 @@
+import pytest
+
+from drive_scanner import scan_service
+from drive_scanner.changes_service import ManifestUpdater, can_update
+from drive_scanner.drive_client import get_start_page_token, list_changes, list_children
+from drive_scanner.fake_drive import FakeDrive
+from drive_scanner.scan_service import FOLDER_MIME, FolderCrawler
+
+EXCLUDE = ["cedolini", "cedolino"]
+
+
+@pytest.fixture
+def drive(monkeypatch):
+    fake = FakeDrive()
+    monkeypatch.setattr(scan_service, "get_drive_service", lambda creds: fake)
+    root = fake.add_folder("Dipendenti", file_id="root")
+    for name in ("Rossi", "Bianchi"):
+        emp = fake.add_folder(name, root, file_id=name.lower())
+        fake.add_file("Cartellino 2023-01.pdf", emp, file_id=f"{emp}-jan")
+        year = fake.add_folder("2023", emp, file_id=f"{emp}-2023")
+        fake.add_file("Cartellino 2023-02.pdf", year, file_id=f"{emp}-feb")
+        fake.add_file("cedolino 2023-02.pdf", year, file_id=f"{emp}-pay")
+        payslips = fake.add_folder("Cedolini", emp, file_id=f"{emp}-cedolini")
+        fake.add_file("cedolino 2023-03.pdf", payslips)
+    return fake
+
+
+def _full_scan(drive):
+    employees = [f for f in list_children(drive, "root") if f["mimeType"] == FOLDER_MIME]
+    return list(FolderCrawler(None, EXCLUDE, workers=2).crawl(employees))
+
+
+def _normalized(reports):
+    normalized = {}
+    for report in reports:
+        report = dict(report)
+        for key in ("included", "skipped", "excluded_folders"):
+            report[key] = sorted(report[key], key=lambda item: item.get("file_id") or item["folder_id"])
+        report["folders"] = sorted(report["folders"])
+        normalized[report["employee_id"]] = report
+    return normalized
+
+
+def test_changes_feed_updates_manifest_like_a_full_scan(drive):
+    token = get_start_page_token(drive)
+    reports = _full_scan(drive)
+
+    drive.add_file("Cartellino 2023-04.pdf", "rossi-2023", file_id="rossi-apr")
+    drive.rename("rossi-jan", "cedolino 2023-01.pdf")
+    drive.move("bianchi-feb", "rossi")
+    drive.trash("bianchi-jan")
+    drive.add_file("notes.txt", "rossi", mime_type="text/plain")
+    new_year = drive.add_folder("2024", "bianchi")
+    drive.add_file("Cartellino 2024-01.pdf", new_year)
+    drive.add_file("cedolino 2023-05.pdf", "rossi-cedolini")
+    verdi = drive.add_folder("Verdi", "root", file_id="verdi")
+    drive.add_file("Cartellino 2023-01.pdf", verdi)
+    drive.add_file("stray.pdf", "root")
+    drive.add_file("elsewhere.pdf", None)
+
+    changes, new_token = list_changes(drive, token)
+    drive.requests.clear()
+    calls = []
+
+    def crawl(employees):
+        calls.append([emp["id"] for emp in employees])
+        return FolderCrawler(None, EXCLUDE, workers=2).crawl(employees)
+
+    updater = ManifestUpdater(drive, "root", reports, EXCLUDE, crawl)
+    updated = updater.apply(changes)
+
+    assert _normalized(updated) == _normalized(_full_scan(drive))
+    # Only Bianchi (new folder) and Verdi (new employee) are crawled again.
+    assert calls == [["bianchi", "verdi"]]
+    assert new_token != token
+    assert list_changes(drive, new_token)[0] == []
+
+
+def test_removed_employee_folder_is_dropped(drive):
+    token = get_start_page_token(drive)
+    reports = _full_scan(drive)
+
+    drive.delete("bianchi")
+    drive.rename("rossi", "Rossi Mario")
+    changes, _ = list_changes(drive, token)
+    updated = ManifestUpdater(drive, "root", reports, EXCLUDE, FolderCrawler(None, EXCLUDE).crawl).apply(changes)
+
+    assert [(report["employee_id"], report["employee"]) for report in updated] == [("rossi", "Rossi Mario")]
+
+
+def test_can_update_needs_token_and_folder_lists(drive):
+    reports = _full_scan(drive)
+    manifest = {"root_id": "root", "employees": reports, "changes_page_token": "7"}
+
+    assert can_update(manifest, "root")
+    assert not can_update(manifest, "other")
+    assert not can_update({**manifest, "changes_page_token": None}, "root")
+    legacy = [{key: value for key, value in report.items() if key != "folders"} for report in reports]
+    assert not can_update({**manifest, "employees": legacy}, "root")
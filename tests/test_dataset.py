@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from cartellino_parser import parse_pdf
+from cartellino_parser.models import DAY_COLUMNS, PAIR_COLUMNS
+
+pytest.importorskip("pyarrow")
+
+from cartellino_parser.dataset import DatasetWriter, read_table  # noqa: E402
+
+DOCUMENTS = Path(__file__).resolve().parents[1] / "documents"
+
+
+def test_dataset_round_trips_typed_rows(tmp_path):
+    parsed = {path.name: parse_pdf(path) for path in sorted(DOCUMENTS.glob("*.pdf"))}
+    with DatasetWriter(tmp_path, flush_rows=100) as writer:
+        for name, item in parsed.items():
+            writer.add(item, document=name)
+
+    days = read_table(tmp_path, "days")
+    pairs = read_table(tmp_path, "pairs")
+    totals = read_table(tmp_path, "totals")
+
+    assert pairs["entry_ts"].dtype.kind == "M"
+    assert len(totals) == len(parsed)
+    assert writer.rows_written == len(days) + len(pairs) + len(totals)
+    for name, item in parsed.items():
+        doc_days = days[days.document == name][DAY_COLUMNS].sort_values("day", kind="stable")
+        doc_pairs = pairs[pairs.document == name][PAIR_COLUMNS].sort_values(["day", "pair_index"])
+        pd.testing.assert_frame_equal(doc_days.reset_index(drop=True), item.days_df, check_dtype=False)
+        pd.testing.assert_frame_equal(doc_pairs.reset_index(drop=True), item.pairs_df, check_dtype=False)
+
+
+def test_dataset_is_partitioned_by_employee_and_year(tmp_path):
+    with DatasetWriter(tmp_path) as writer:
+        writer.add(parse_pdf(DOCUMENTS / "Cartellino mensile-2022-07.pdf"), document="a.pdf")
+        assert not (tmp_path / "days").exists()
+
+    files = sorted(p.relative_to(tmp_path).parts[:3] for p in tmp_path.rglob("*.parquet"))
+    assert files == [
+        ("days", "employee_id=5352", "year=2022"),
+        ("pairs", "employee_id=5352", "year=2022"),
+        ("totals", "employee_id=5352", "year=2022"),
+    ]
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import HttpMockSequence
+
+from drive_scanner import drive_client
+from drive_scanner.drive_client import get_files_batch, list_children, set_service_factory
+from drive_scanner.enrich_service import enrich_reports
+from drive_scanner.fake_drive import FOLDER_MIME, FakeDrive, populate
+from drive_scanner.scan_service import FolderCrawler
+from drive_scanner.transport import discovery_document
+
+EXCLUDE = ["cedolini", "cedolino"]
+
+
+@pytest.fixture
+def drive(monkeypatch):
+    monkeypatch.setattr(drive_client, "BACKOFF_BASE", 0.0)
+    fake = FakeDrive(seed=3)
+    set_service_factory(lambda creds: fake)
+    yield fake
+    set_service_factory(None)
+
+
+def _reports(drive, employees=3, months=50):
+    root = populate(drive, employees=employees, months=months, distinct_pdfs=5)
+    employees = [f for f in list_children(drive, root) if f["mimeType"] == FOLDER_MIME]
+    return list(FolderCrawler(None, EXCLUDE, workers=2).crawl(employees))
+
+
+def test_enrich_fetches_metadata_in_batches_of_100(drive):
+    reports = _reports(drive)
+    gone = reports[0]["included"][0]["file_id"]
+    drive.delete(gone)
+    drive.requests.clear()
+
+    counts = enrich_reports(None, reports, workers=2)
+
+    assert counts == {"enriched": 149, "missing": 1}
+    assert drive.requests == ["batch"] * 2
+    for report in reports:
+        for entry in report["included"]:
+            if entry["file_id"] == gone:
+                assert entry["missing"] is True
+                continue
+            item = drive.items[entry["file_id"]]
+            assert entry["size"] == len(drive.blobs[entry["file_id"]])
+            assert entry["md5Checksum"] == item["md5Checksum"]
+            assert entry["parents"] == item["parents"]
+            assert entry["modifiedTime"]
+
+    # Only entries without metadata are fetched again.
+    drive.requests.clear()
+    assert enrich_reports(None, reports) == {"missing": 1}
+    assert drive.requests == ["batch"]
+
+
+def test_files_that_fail_for_good_get_a_metadata_error(drive):
+    reports = _reports(drive)
+    entries = [entry for report in reports for entry in report["included"]]
+    drive.error_statuses = (400,)
+    drive.error_rate = 0.1
+
+    counts = enrich_reports(None, reports, workers=2)
+
+    failed = [entry for entry in entries if "metadata_error" in entry]
+    assert failed and counts == {"enriched": len(entries) - len(failed), "failed": len(failed)}
+    assert all("HttpError" in entry["metadata_error"] and "size" not in entry for entry in failed)
+
+    # The next run fetches only those files, and clears the error.
+    drive.error_rate = 0.0
+    assert enrich_reports(None, reports) == {"enriched": len(failed)}
+    assert not any("metadata_error" in entry for entry in entries)
+
+
+def test_failed_calls_of_a_batch_are_retried(drive):
+    reports = _reports(drive, employees=2, months=60)
+    file_ids = [entry["file_id"] for report in reports for entry in report["included"]]
+    drive.error_rate = 0.2
+
+    found = get_files_batch(drive, file_ids, "id, size")
+
+    assert set(found) == set(file_ids)
+    assert all(found[file_id]["id"] == file_id for file_id in file_ids)
+    assert sum(drive.errors.values()) > 10
+    assert len(drive.requests) > 2
+
+
+def test_get_files_batch_over_a_real_batch_request():
+    boundary = "batch_abc"
+    parts = [
+        ("a", "200 OK", {"id": "a", "size": "10"}),
+        ("b", "404 Not Found", {"error": {"code": 404, "message": "File not found: b."}}),
+    ]
+    body = "".join(
+        f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-x + {request_id}>\r\n\r\n"
+        f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n\r\n{json.dumps(payload)}\r\n"
+        for request_id, status, payload in parts
+    ) + f"--{boundary}--"
+    http = HttpMockSequence([({"status": "200", "content-type": f"multipart/mixed; boundary={boundary}"}, body)])
+    service = build_from_document(discovery_document(), http=http)
+
+    assert get_files_batch(service, ["a", "b"], "id, size") == {"a": {"id": "a", "size": "10"}, "b": None}
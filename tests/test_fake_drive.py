@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from drive_scanner import drive_client, filter_scan
+from drive_scanner.drive_client import list_children, list_children_many, set_service_factory
+from drive_scanner.fake_drive import FOLDER_MIME, FakeDrive, populate
+from drive_scanner.scan_service import FolderCrawler
+
+EXCLUDE = ["cedolini", "cedolino"]
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(drive_client, "BACKOFF_BASE", 0.0)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    def install(drive):
+        set_service_factory(lambda creds: drive)
+        return drive
+
+    yield install
+    set_service_factory(None)
+
+
+def test_populated_tree_scans_and_downloads(service, tmp_path):
+    drive = service(FakeDrive(page_size=7))
+    root = populate(drive, employees=5, months=14, distinct_pdfs=4)
+    employees = [f for f in list_children(drive, root) if f["mimeType"] == FOLDER_MIME]
+
+    reports = list(FolderCrawler(None, EXCLUDE, workers=3).crawl(employees))
+
+    assert [report["counts"] for report in reports] == [
+        {"included": 14, "skipped_files": 0, "excluded_folders": 1}
+    ] * 5
+    job = filter_scan.download_document(
+        None, reports[0], reports[0]["included"][0], str(tmp_path), threading.Event()
+    )
+    assert job["data"] == drive.blobs[reports[0]["included"][0]["file_id"]]
+    assert job["data"].startswith(b"%PDF")
+
+
+def test_listing_pages_are_capped(service):
+    drive = service(FakeDrive(page_size=3))
+    folders = [drive.add_folder(f"f{i}") for i in range(2)]
+    for folder in folders:
+        for i in range(5):
+            drive.add_file(f"{i}.pdf", folder)
+
+    children = list_children_many(drive, folders)
+
+    assert [len(children[folder]) for folder in folders] == [5, 5]
+    assert drive.requests == ["files.list"] * 4
+
+
+def test_injected_errors_are_retried(service, no_backoff):
+    drive = service(FakeDrive(error_rate=0.5, seed=1))
+    folder = drive.add_folder("f")
+    file_id = drive.add_file("a.pdf", folder, content=b"%PDF-1.4 data")
+
+    for _ in range(10):
+        assert [item["id"] for item in list_children(drive, folder)] == [file_id]
+        assert filter_scan.download_pdf_stream(drive, file_id).getvalue() == b"%PDF-1.4 data"
+
+    assert sum(drive.errors.values()) > 5
+    assert set(drive.errors) <= {429, 500, 503}
+
+
+def test_rate_limit_answers_403_user_rate_limit(service):
+    drive = service(FakeDrive(rate_limit=2))
+    folder = drive.add_folder("f")
+    drive.files().list(q=f"'{folder}' in parents").execute()
+    drive.files().list(q=f"'{folder}' in parents").execute()
+
+    with pytest.raises(HttpError) as excinfo:
+        drive.files().list(q=f"'{folder}' in parents").execute()
+
+    assert excinfo.value.status_code == 403
+    assert drive_client._retry_reason(excinfo.value) == "403"
+
+
+def test_missing_media_is_not_retried(service):
+    drive = service(FakeDrive())
+    file_id = drive.add_file("a.pdf", None)
+
+    with pytest.raises(HttpError):
+        filter_scan.download_pdf_stream(drive, file_id)
+    assert drive.requests == ["files.get_media"]
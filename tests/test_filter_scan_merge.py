@@ -1,7 +1,10 @@
+from cartellino_parser.models import CartellinoParseError, UnknownLayoutError
 from drive_scanner.filter_scan import (
     _build_base_employees,
+    _failed_job,
     _finalize_employees,
     _merge_report_into_base,
+    _track_unknown_layout,
 )
 
 
@@ -68,3 +71,17 @@ def test_merge_new_style_report_dedupes_by_id():
 
     assert len(merged) == 1
     assert len(merged[0]["included"]) == 1
+
+
+def test_unknown_layouts_are_tracked_by_error_type():
+    employee = {"employee": "Alice Rossi", "employee_id": "E001"}
+    unknown: dict = {}
+    for file_id, exc in [
+        ("f1", UnknownLayoutError("Unrecognised layout on first page of f1")),
+        ("f2", UnknownLayoutError("Layout not supported", "abc123")),
+        ("f3", CartellinoParseError("No day lines found in f3; Unrecognised layout")),
+    ]:
+        job = {"employee": employee, "file_id": file_id, "file_name": f"{file_id}.pdf"}
+        _track_unknown_layout(unknown, _failed_job(job, exc))
+
+    assert {fp: entry["count"] for fp, entry in unknown.items()} == {"unrecognised": 1, "abc123": 1}
@@ -0,0 +1,241 @@
+import io
+import threading
+from pathlib import Path
+
+import pytest
+
+from drive_scanner import filter_scan
+
+DOCUMENTS = Path(__file__).resolve().parents[1] / "documents"
+
+
+@pytest.fixture
+def local_drive(monkeypatch):
+    blobs = {
+        "f1": (DOCUMENTS / "Cartellino mensile-2022-07.pdf").read_bytes(),
+        "f2": (DOCUMENTS / "Cartellino mensile-2023-03-12.pdf").read_bytes(),
+        "bad": b"not a pdf",
+    }
+    monkeypatch.setattr(filter_scan, "get_drive_service", lambda creds: None)
+    monkeypatch.setattr(
+        filter_scan, "download_pdf_stream", lambda drive, file_id: io.BytesIO(blobs[file_id])
+    )
+    return blobs
+
+
+@pytest.mark.parametrize("parse_workers", [0, 2])
+def test_pipeline_isolates_failures(local_drive, tmp_path, parse_workers):
+    employee = {"employee": "Alice Rossi", "employee_id": "E001"}
+    docs = [
+        (employee, {"file_id": "f1", "file_name": "A.pdf"}),
+        (employee, {"file_id": "bad", "file_name": "B.pdf"}),
+        (employee, {"file_id": "f2", "file_name": "C.pdf"}),
+        (employee, {"file_name": "D.pdf"}),
+    ]
+
+    results = list(
+        filter_scan.iter_processed(
+            None, docs, str(tmp_path), threading.Event(), download_workers=2, parse_workers=parse_workers
+        )
+    )
+
+    by_name = {result["file_name"]: result for result in results}
+    assert len(results) == 4
+    assert by_name["A.pdf"]["status"] == "success"
+    assert by_name["C.pdf"]["status"] == "success"
+    assert by_name["B.pdf"]["status"] == "failed"
+    assert by_name["D.pdf"]["reason"] == "missing file_id"
+    assert Path(by_name["A.pdf"]["outputs"]["days_csv"]).read_text().count("\n") == 32
+    assert by_name["A.pdf"]["bytes"] == len(local_drive["f1"])
+    assert set(by_name["A.pdf"]["timings"]) == {"download", "extract", "parse", "write"}
+    assert set(by_name["B.pdf"]["timings"]) == {"download"}
+
+
+def test_run_stats_summary():
+    from drive_scanner.run_stats import RunStats
+
+    now = [0.0]
+    stats = RunStats(total=4, clock=lambda: now[0])
+    stats.add({"status": "success", "bytes": 1024 * 1024, "timings": {"download": 0.2, "parse": 0.5}})
+    stats.add({"status": "failed", "bytes": 1024 * 1024, "timings": {"download": 0.4}})
+    now[0] = 2.0
+
+    summary = stats.summary()
+    assert (summary["succeeded"], summary["failed"]) == (1, 1)
+    assert summary["docs_per_s"] == 1.0
+    assert summary["mb_per_s"] == 1.0
+    assert summary["eta_s"] == 2.0
+    assert summary["stages"]["download"]["count"] == 2
+    assert summary["stages"]["download"]["p50_ms"] == pytest.approx(300.0)
+    assert stats.progress() == "2/4 files, 1.0 docs/s, 1.00 MB/s, ETA 2s"
+
+
+@pytest.mark.parametrize("parse_workers", [0, 1])
+def test_pipeline_reuses_cached_parse_results(local_drive, tmp_path, parse_workers):
+    from cartellino_parser.cache import ParseCache
+
+    cache = ParseCache(tmp_path / "cache")
+    employee = {"employee": "Alice Rossi", "employee_id": "E001"}
+    docs = [(employee, {"file_id": "f1", "file_name": "A.pdf"})]
+    for out in ("run1", "run2"):
+        results = list(
+            filter_scan.iter_processed(
+                None, docs, str(tmp_path / out), threading.Event(), 1, parse_workers, cache
+            )
+        )
+        assert results[0]["status"] == "success"
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    # The second run finds the document in the cache without reading its pages.
+    assert "extract" not in results[0]["timings"]
+    assert (tmp_path / "run1" / "Alice Rossi" / "A__f1" / "days.csv").read_text() == (
+        tmp_path / "run2" / "Alice Rossi" / "A__f1" / "days.csv"
+    ).read_text()
+
+
+def _add_bundle(local_drive):
+    pypdf = pytest.importorskip("pypdf")
+    writer = pypdf.PdfWriter()
+    for file_id in ("f1", "f2"):
+        for page in pypdf.PdfReader(io.BytesIO(local_drive[file_id])).pages:
+            writer.add_page(page)
+    bundle = io.BytesIO()
+    writer.write(bundle)
+    local_drive["bundle"] = bundle.getvalue()
+
+
+@pytest.mark.parametrize("parse_workers", [0, 2])
+def test_pipeline_caches_the_segment_plan_of_bundles(local_drive, tmp_path, parse_workers):
+    from cartellino_parser.cache import ParseCache
+
+    _add_bundle(local_drive)
+    cache = ParseCache(tmp_path / "cache")
+    employee = {"employee": "Alice Rossi", "employee_id": "E001"}
+    docs = [(employee, {"file_id": "bundle", "file_name": "DOCUMENTI.pdf"})]
+
+    for out in ("run1", "run2"):
+        [result] = filter_scan.iter_processed(
+            None, docs, str(tmp_path / out), threading.Event(), 1, parse_workers, cache
+        )
+        assert result["status"] == "success"
+        assert [s["month"] for s in result["outputs"]["segments"]] == [7, 3]
+
+    key, record, segments = filter_scan.lookup_document(local_drive["bundle"], cache)
+    assert record is None
+    assert [segment.tag for segment in segments] == ["2022-07", "2023-03"]
+    # Bundles are never cached as one record: both runs missed, neither hit.
+    assert (cache.hits, cache.misses) == (0, 3)
+
+
+@pytest.mark.parametrize("parse_workers", [0, 2])
+def test_pipeline_splits_multi_month_bundles(local_drive, tmp_path, parse_workers):
+    _add_bundle(local_drive)
+
+    employee = {"employee": "Alice Rossi", "employee_id": "E001"}
+    docs = [(employee, {"file_id": "bundle", "file_name": "DOCUMENTI.pdf"})]
+    results = list(
+        filter_scan.iter_processed(
+            None, docs, str(tmp_path), threading.Event(), download_workers=1, parse_workers=parse_workers
+        )
+    )
+
+    assert results[0]["status"] == "success"
+    segments = results[0]["outputs"]["segments"]
+    assert [(s["year"], s["month"], s["status"]) for s in segments] == [
+        (2022, 7, "success"),
+        (2023, 3, "success"),
+    ]
+    assert (tmp_path / "Alice Rossi" / "DOCUMENTI__bundle" / "2022-07" / "days.csv").exists()
+
+
+def test_pipeline_appends_to_parquet_dataset(local_drive, tmp_path):
+    pytest.importorskip("pyarrow")
+    from cartellino_parser.dataset import DatasetWriter, read_table
+
+    employee = {"employee": "Alice Rossi", "employee_id": "E001"}
+    docs = [
+        (employee, {"file_id": "f1", "file_name": "A.pdf"}),
+        (employee, {"file_id": "f2", "file_name": "C.pdf"}),
+    ]
+    with DatasetWriter(tmp_path / "out") as dataset:
+        results = list(
+            filter_scan.iter_processed(
+                None, docs, str(tmp_path / "out"), threading.Event(), 1, 1, sink=dataset
+            )
+        )
+
+    assert [r["status"] for r in results] == ["success", "success"]
+    assert not (tmp_path / "out" / "Alice Rossi").exists()
+    assert sorted(read_table(tmp_path / "out", "totals")["document"]) == ["f1", "f2"]
+
+
+def test_files_reach_the_report_only_once_the_dataset_wrote_them(local_drive, tmp_path):
+    pytest.importorskip("pyarrow")
+    from cartellino_parser.dataset import DatasetWriter
+
+    employee = {"employee": "Alice Rossi", "employee_id": "E001"}
+    docs = [
+        (employee, {"file_id": "f1", "file_name": "A.pdf"}),
+        (employee, {"file_id": "f2", "file_name": "C.pdf"}),
+    ]
+    with DatasetWriter(tmp_path / "out", flush_rows=10**6) as dataset:
+        progress = filter_scan.SinkProgress(dataset)
+        for result in filter_scan.iter_processed(
+            None, docs, str(tmp_path / "out"), threading.Event(), 1, 0, sink=dataset
+        ):
+            progress.hold("id:E001", result, {"file_id": result["file_id"], "file_name": result["file_name"]})
+            assert progress.settle() == []
+        assert dataset.files_written == 0
+
+        dataset.flush()
+        settled = progress.settle()
+
+    assert sorted(item["file_id"] for _, section, item in settled if section == "included") == ["f1", "f2"]
+    assert len(progress) == 0
+
+
+def test_files_the_store_cannot_write_are_skipped(tmp_path):
+    from cartellino_parser import parse_pdf
+    from cartellino_parser.store import ResultStore
+
+    bad = parse_pdf(DOCUMENTS / "Cartellino mensile-2022-07.pdf")
+    bad.days_df["raw"] = [["not", "bindable"]] * len(bad.days_df)
+    with ResultStore(tmp_path / "results.db") as store:
+        progress = filter_scan.SinkProgress(store)
+        store.add(bad, document="f1")
+        progress.hold("id:E001", {"outputs": store.describe("f1")}, {"file_id": "f1", "file_name": "A.pdf"})
+        store.flush()
+        (key, section, item), = progress.settle()
+
+    assert (key, section) == ("id:E001", "skipped")
+    assert item["reason"].startswith("store failed: f1:")
+
+
+@pytest.mark.parametrize("parse_workers", [0, 1])
+def test_pipeline_captures_slow_documents(local_drive, tmp_path, parse_workers):
+    from cartellino_parser.profiling import SlowDocumentCapture
+    from cartellino_parser.synthetic import pdf_bytes
+
+    local_drive["letter"] = pdf_bytes([["Gentile dipendente,", "la informiamo che..."]])
+    capture = SlowDocumentCapture(tmp_path / "slow", max_seconds=0.0)
+    employee = {"employee": "Alice Rossi", "employee_id": "E001"}
+    docs = [
+        (employee, {"file_id": "f1", "file_name": "A.pdf"}),
+        (employee, {"file_id": "letter", "file_name": "B.pdf"}),
+    ]
+    results = list(
+        filter_scan.iter_processed(
+            None, docs, str(tmp_path / "out"), threading.Event(), 1, parse_workers, capture=capture
+        )
+    )
+
+    by_name = {result["file_name"]: result for result in results}
+    [slow] = by_name["A.pdf"]["slow"]
+    assert slow["document"] == "f1"
+    assert slow["reasons"] == ["latency"]
+    assert (Path(slow["path"]) / "document.pdf").read_bytes() == local_drive["f1"]
+    assert (Path(slow["path"]) / "profile.pstats").exists()
+    assert "_parse" in (Path(slow["path"]) / "profile.txt").read_text()
+    assert by_name["B.pdf"]["status"] == "failed"
+    [failed] = by_name["B.pdf"]["slow"]
+    assert failed["error"].startswith("UnknownLayoutError")
@@ -0,0 +1,52 @@
+import subprocess
+import sys
+
+import pytest
+
+# Cumulative import time allowed per entry module, in microseconds. Importing
+# pandas alone takes ~500 ms, so any heavy dependency leaking back in fails this.
+IMPORT_BUDGET_US = 250_000
+HEAVY_MODULES = (
+    "pandas",
+    "numpy",
+    "pdfplumber",
+    "pdfminer",
+    "pypdf",
+    "pypdfium2",
+    "pyarrow",
+    "googleapiclient",
+    "google.auth",
+    "google.oauth2",
+    "google_auth_oauthlib",
+    "dotenv",
+)
+
+
+def _import_times(module: str) -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["cartellino_parser", "cartellino_parser.cli", "drive_scanner.scan_directory", "drive_scanner.filter_scan"],
+)
+def test_entry_points_import_lazily(module):
+    times = _import_times(module)
+
+    leaked = sorted(
+        name for name in times if any(name == heavy or name.startswith(f"{heavy}.") for heavy in HEAVY_MODULES)
+    )
+    assert not leaked, f"{module} imports {leaked} at load time"
+    assert times[module] < IMPORT_BUDGET_US
@@ -0,0 +1,123 @@
+import json
+import os
+import shutil
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+from cartellino_parser import cli
+from cartellino_parser.incremental import INDEX_NAME, ParseIndex, scan_pdfs
+
+DOCUMENTS = Path(__file__).resolve().parents[1] / "documents"
+JANUARY = DOCUMENTS / "Cartellino mensile-2022-01.pdf"
+JULY = DOCUMENTS / "Cartellino mensile-2022-07.pdf"
+
+
+def test_scan_pdfs_walks_lazily_in_a_stable_order(tmp_path):
+    for name in ["b.pdf", "a.PDF", "notes.txt", "sub/c.pdf", "sub/deeper/d.pdf"]:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(b"%PDF")
+
+    found = [path.relative_to(tmp_path).as_posix() for path, _ in scan_pdfs(tmp_path, recursive=True)]
+
+    assert found == ["a.PDF", "b.pdf", "sub/c.pdf", "sub/deeper/d.pdf"]
+    assert [path.name for path, _ in scan_pdfs(tmp_path)] == ["a.PDF", "b.pdf"]
+
+
+def test_index_detects_changes_by_stat_then_hash(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"one")
+    with ParseIndex(tmp_path / INDEX_NAME, settings="csv:pypdf", version="v1") as index:
+        assert not index.is_current("a.pdf", pdf, pdf.stat())
+        index.record("a.pdf", pdf, ["a.days.csv"])
+
+    stat = pdf.stat()
+    os.utime(pdf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    with ParseIndex(tmp_path / INDEX_NAME, settings="csv:pypdf", version="v1") as index:
+        # Same bytes, new mtime: current, and the new mtime is remembered.
+        assert index.is_current("a.pdf", pdf, pdf.stat())
+        pdf.write_bytes(b"two")
+        assert not index.is_current("a.pdf", pdf, pdf.stat())
+    with ParseIndex(tmp_path / INDEX_NAME, settings="csv:pypdf", version="v2") as index:
+        assert not index.is_current("a.pdf", pdf, pdf.stat())
+
+
+def _run(monkeypatch, input_dir, out_dir, *extra):
+    argv = ["cli", "parse", "--input", str(input_dir), "--out", str(out_dir), "--backend", "pypdf"]
+    monkeypatch.setattr(sys, "argv", argv + ["--incremental", "--jobs", "1", *extra])
+    return cli.main()
+
+
+def test_cli_incremental_reparses_only_new_documents(tmp_path, monkeypatch, capsys):
+    input_dir, out_dir = tmp_path / "in", tmp_path / "out"
+    input_dir.mkdir()
+    shutil.copy(JANUARY, input_dir / "jan.pdf")
+    assert _run(monkeypatch, input_dir, out_dir) == 0
+    first = (out_dir / "jan.days.csv").stat().st_mtime_ns
+
+    shutil.copy(JULY, input_dir / "jul.pdf")
+    capsys.readouterr()
+    assert _run(monkeypatch, input_dir, out_dir) == 0
+
+    assert (out_dir / "jan.days.csv").stat().st_mtime_ns == first
+    assert (out_dir / "jul.days.csv").exists()
+    # One totals line per parsed document.
+    assert len(capsys.readouterr().out.splitlines()) == 1
+
+
+def test_cli_incremental_flags_then_deletes_orphans(tmp_path, monkeypatch):
+    input_dir, out_dir = tmp_path / "in", tmp_path / "out"
+    input_dir.mkdir()
+    shutil.copy(JANUARY, input_dir / "jan.pdf")
+    shutil.copy(JULY, input_dir / "jul.pdf")
+    assert _run(monkeypatch, input_dir, out_dir) == 0
+
+    (input_dir / "jan.pdf").unlink()
+    (input_dir / "jul.pdf").write_bytes(b"not a pdf")
+    assert _run(monkeypatch, input_dir, out_dir) == 1
+
+    orphans = json.loads((out_dir / "orphans.json").read_text())
+    assert set(orphans) == {"jan.pdf", "jul.pdf"}
+    assert (out_dir / "jan.days.csv").exists()
+
+    # The failing PDF is not retried, but its stale outputs are still reported.
+    assert _run(monkeypatch, input_dir, out_dir, "--orphans", "delete") == 0
+    assert not (out_dir / "orphans.json").exists()
+    assert not list(out_dir.glob("*.csv"))
+
+
+def test_cli_incremental_indexes_only_documents_the_store_committed(tmp_path, monkeypatch):
+    from cartellino_parser.store import ResultStore
+
+    input_dir, out_dir = tmp_path / "in", tmp_path / "out"
+    input_dir.mkdir()
+    shutil.copy(JANUARY, input_dir / "jan.pdf")
+    shutil.copy(JULY, input_dir / "jul.pdf")
+    real_commit = ResultStore._commit_entries
+
+    def fail_july(self, conn, batch):
+        if any(entry[0][0] == "jul.pdf" for entry in batch):
+            raise sqlite3.OperationalError("disk I/O error")
+        real_commit(self, conn, batch)
+
+    monkeypatch.setattr(ResultStore, "_commit_entries", fail_july)
+    assert _run(monkeypatch, input_dir, out_dir, "--format", "sqlite") == 1
+
+    with ParseIndex(out_dir / INDEX_NAME, settings="sqlite:pypdf") as index:
+        assert index.is_current("jan.pdf", input_dir / "jan.pdf", (input_dir / "jan.pdf").stat())
+        assert not index.is_current("jul.pdf", input_dir / "jul.pdf", (input_dir / "jul.pdf").stat())
+
+    monkeypatch.setattr(ResultStore, "_commit_entries", real_commit)
+    assert _run(monkeypatch, input_dir, out_dir, "--format", "sqlite") == 0
+    store = ResultStore(out_dir / "cartellini.db")
+    assert set(store.days("5352", first_year=2022, last_year=2022)["month"]) == {1, 7}
+    store.close()
+    with ParseIndex(out_dir / INDEX_NAME, settings="sqlite:pypdf") as index:
+        assert index.is_current("jul.pdf", input_dir / "jul.pdf", (input_dir / "jul.pdf").stat())
+
+
+def test_cli_incremental_rejects_parquet(tmp_path, monkeypatch):
+    with pytest.raises(SystemExit):
+        _run(monkeypatch, tmp_path, tmp_path / "out", "--format", "parquet")
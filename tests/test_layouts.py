@@ -0,0 +1,69 @@
+import io
+import pickle
+from pathlib import Path
+
+import pytest
+
+from cartellino_parser import CartellinoParseError, UnknownLayoutError, parse_pdf
+from cartellino_parser.extract import iter_lines, iter_page_texts
+from cartellino_parser.layouts import (
+    RIEPILOGO_PRESENZE_V1,
+    fingerprint,
+    reset_unknown_layouts,
+    unknown_layouts,
+)
+from cartellino_parser.scanner import scan_lines
+
+DOCUMENTS = Path(__file__).resolve().parents[1] / "documents"
+
+
+def test_samples_share_the_registered_layout() -> None:
+    for pdf_path in sorted(DOCUMENTS.glob("*.pdf")):
+        first_page = next(iter_page_texts(pdf_path)).splitlines()
+        assert fingerprint(first_page) == RIEPILOGO_PRESENZE_V1.fingerprint
+
+
+def test_layout_scanner_matches_generic_scanner() -> None:
+    for pdf_path in sorted(DOCUMENTS.glob("*.pdf")):
+        lines = list(iter_lines(pdf_path))
+        generic = scan_lines(lines)
+        specialised = RIEPILOGO_PRESENZE_V1.scan(lines)
+        assert specialised.meta == generic.meta
+        assert specialised.days_df.equals(generic.days_df)
+        assert specialised.totals == generic.totals
+        assert specialised.pairs_df.equals(generic.pairs_df)
+
+
+def test_fingerprint_ignores_names_and_months() -> None:
+    page = [
+        "Cartellino mensile configurabile",
+        "Azienda RIEPILOGO PRESENZE/ASSENZE - MARZO 2015 Pag. 3",
+        "ROSSI MARIO - 1234 Un. Org. UNI",
+        "GIORNO ---- TIMBRATURE (VERSO/ORA/CAUSALE) ---- GIUSTIFICATIVI ---- GG ORARIO MO.F MO.T MO.LAV",
+    ]
+    assert fingerprint(page) == RIEPILOGO_PRESENZE_V1.fingerprint
+    assert fingerprint(page[:3] + ["GIORNO TIMBRATURE ORE"]) != RIEPILOGO_PRESENZE_V1.fingerprint
+    assert fingerprint(["Cedolino paga", "Totale competenze"]) is None
+
+
+def test_known_layout_is_reported_in_meta() -> None:
+    parsed = parse_pdf(DOCUMENTS / "Cartellino mensile-2022-07.pdf")
+    assert parsed.meta["layout"] == "riepilogo_presenze_v1"
+
+
+def test_unrecognised_first_page_fails_fast_and_is_counted() -> None:
+    pypdf = pytest.importorskip("pypdf")
+
+    writer = pypdf.PdfWriter()
+    writer.add_blank_page(width=200, height=200)
+    blank = io.BytesIO()
+    writer.write(blank)
+
+    reset_unknown_layouts()
+    with pytest.raises(UnknownLayoutError, match="Unrecognised layout") as error:
+        parse_pdf(blank)
+    assert unknown_layouts()["None"]["count"] == 1
+    assert isinstance(error.value, CartellinoParseError)
+    # Survives the trip back from a worker process.
+    copy = pickle.loads(pickle.dumps(UnknownLayoutError("Unrecognised layout", "abc123")))
+    assert (str(copy), copy.fingerprint) == ("Unrecognised layout", "abc123")
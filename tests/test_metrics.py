@@ -0,0 +1,79 @@
+import urllib.request
+
+import pytest
+
+from drive_scanner import metrics
+from drive_scanner.drive_client import call_with_retry
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    metrics.REGISTRY.reset()
+    yield
+    metrics.REGISTRY.reset()
+
+
+def test_render_prometheus_text_format():
+    registry = metrics.Registry()
+    calls = registry.register(metrics.Counter("calls_total", "Calls", ("outcome",)))
+    latency = registry.register(metrics.Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)))
+    calls.inc(outcome="ok")
+    calls.inc(2, outcome="ok")
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    text = registry.render()
+
+    assert "# TYPE drive_scanner_calls_total counter" in text
+    assert 'drive_scanner_calls_total{outcome="ok"} 3' in text
+    assert 'drive_scanner_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'drive_scanner_latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'drive_scanner_latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "drive_scanner_latency_seconds_count 2" in text
+
+
+def test_exporters_publish_registry(tmp_path):
+    metrics.DOWNLOADS.inc(outcome="ok")
+    writer = metrics.MetricsFileWriter(str(tmp_path / "filter.prom"), interval=60)
+    server = metrics.MetricsServer(0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            served = response.read().decode()
+    finally:
+        server.stop()
+        writer.stop()
+
+    assert 'drive_scanner_downloads_total{outcome="ok"} 1' in served
+    assert 'drive_scanner_downloads_total{outcome="ok"} 1' in (tmp_path / "filter.prom").read_text()
+
+
+def test_call_with_retry_backs_off_on_rate_limits():
+    httplib2 = pytest.importorskip("httplib2")
+    from googleapiclient.errors import HttpError
+
+    responses = [HttpError(httplib2.Response({"status": status}), b"") for status in (429, 503)]
+    slept = []
+
+    def call():
+        if responses:
+            raise responses.pop(0)
+        return "ok"
+
+    assert call_with_retry(call, "list", sleep=slept.append) == "ok"
+    assert len(slept) == 2
+    assert metrics.DRIVE_RETRIES.value(operation="list", reason="429") == 1
+    assert metrics.DRIVE_RETRIES.value(operation="list", reason="503") == 1
+    assert metrics.DRIVE_CALLS.value(operation="list", outcome="ok") == 1
+
+
+def test_call_with_retry_gives_up_on_client_errors():
+    httplib2 = pytest.importorskip("httplib2")
+    from googleapiclient.errors import HttpError
+
+    def call():
+        raise HttpError(httplib2.Response({"status": 404}), b"")
+
+    with pytest.raises(HttpError):
+        call_with_retry(call, "list", sleep=lambda delay: None)
+    assert metrics.DRIVE_CALLS.value(operation="list", outcome="error") == 1
+    assert metrics.DRIVE_RETRIES.value(operation="list", reason="404") == 0
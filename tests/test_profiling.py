@@ -0,0 +1,52 @@
+import time
+import tracemalloc
+from pathlib import Path
+
+from cartellino_parser import parser, profiling
+from cartellino_parser.profiling import SlowDocumentCapture
+
+DOCUMENT = Path(__file__).resolve().parents[1] / "documents" / "Cartellino mensile-2022-07.pdf"
+
+
+def test_trace_is_stopped_by_the_last_user_only():
+    profiling._start_trace()
+    profiling._start_trace()
+    profiling._stop_trace()
+    assert tracemalloc.is_tracing()
+
+    profiling._stop_trace()
+    assert not tracemalloc.is_tracing()
+
+
+def test_tracing_overhead_does_not_count_as_latency(tmp_path, monkeypatch):
+    real_parse = parser._parse
+
+    def slow_when_traced(*args, **kwargs):
+        if tracemalloc.is_tracing():
+            time.sleep(0.3)
+        return real_parse(*args, **kwargs)
+
+    monkeypatch.setattr(parser, "_parse", slow_when_traced)
+    capture = SlowDocumentCapture(tmp_path, max_seconds=0.25, max_peak_mb=10_000)
+
+    capture.parse(DOCUMENT, backend="pypdf")
+
+    assert capture.captured == []
+    assert not tracemalloc.is_tracing()
+
+
+def test_peak_counts_only_what_the_parse_allocates(tmp_path):
+    tracemalloc.start()
+    try:
+        spike = bytearray(64 * 1024 * 1024)
+        del spike
+        held = bytearray(32 * 1024 * 1024)
+        capture = SlowDocumentCapture(tmp_path, max_peak_mb=20)
+
+        capture.parse(DOCUMENT, backend="pypdf")
+
+        assert capture.captured == []
+        assert tracemalloc.is_tracing()
+        del held
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,141 @@
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from drive_scanner import drive_client, scan_service
+from drive_scanner.scan_service import FOLDER_MIME, PDF_MIME, FolderCrawler, build_employee_report
+
+
+def _tree():
+    """Folder id -> children; employee "deep" has far more folders than the others."""
+    children = {}
+
+    def folder(fid, name):
+        return {"id": fid, "name": name, "mimeType": FOLDER_MIME}
+
+    def pdf(fid, name):
+        return {"id": fid, "name": name, "mimeType": PDF_MIME}
+
+    children["deep"] = [pdf("deep-a", "a.pdf")] + [folder(f"deep-{i}", f"{2015 + i}") for i in range(12)]
+    for i in range(12):
+        children[f"deep-{i}"] = [
+            pdf(f"deep-{i}-c", "Cartellino.pdf"),
+            pdf(f"deep-{i}-p", "cedolino.pdf"),
+            folder(f"deep-{i}-x", "Cedolini" if i % 3 == 0 else "Altro"),
+        ]
+        children[f"deep-{i}-x"] = [{"id": f"deep-{i}-z", "name": "old.zip", "mimeType": "application/zip"}]
+    for name in ("small-1", "small-2"):
+        children[name] = [pdf(f"{name}-a", "a.pdf"), folder(f"{name}-sub", "sub")]
+        children[f"{name}-sub"] = [pdf(f"{name}-b", "b.pdf")]
+    return children
+
+
+class FakeDrive:
+    """Answers ``files().list`` for OR'ed ``'<id>' in parents`` queries, 20 ms per request.
+
+    ``peak`` is the largest number of requests seen in flight at once.
+    """
+
+    def __init__(self, children, page_size=5):
+        self.children = children
+        self.page_size = page_size
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def files(self):
+        return self
+
+    def list(self, q, pageToken=None, **kwargs):
+        parents = re.findall(r"'([^']+)' in parents", q)
+        offset = int(pageToken or 0)
+
+        def execute():
+            with self._lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            try:
+                return respond()
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+        def respond():
+            self.requests.append(parents)
+            time.sleep(0.02)
+            if "boom" in parents:
+                raise ValueError("listing failed")
+            items = [
+                {**item, "parents": [parent]} for parent in parents for item in self.children.get(parent, [])
+            ]
+            page = items[offset : offset + self.page_size]
+            res = {"files": page}
+            if offset + self.page_size < len(items):
+                res["nextPageToken"] = str(offset + self.page_size)
+            return res
+
+        return SimpleNamespace(execute=execute)
+
+
+@pytest.fixture
+def drive(monkeypatch):
+    fake = FakeDrive(_tree())
+    monkeypatch.setattr(scan_service, "get_drive_service", lambda creds: fake)
+    return fake
+
+
+EMPLOYEES = [{"id": "deep", "name": "Deep"}, {"id": "small-1", "name": "One"}, {"id": "small-2", "name": "Two"}]
+EXCLUDE = ["cedolini", "cedolino"]
+
+
+def _listed(drive):
+    return [folder for parents in drive.requests for folder in parents]
+
+
+def test_crawler_reports_match_serial_scan(drive):
+    serial = {emp["id"]: build_employee_report(None, emp, EXCLUDE) for emp in EMPLOYEES}
+    serial_requests = len(drive.requests)
+    drive.requests.clear()
+
+    reports = list(FolderCrawler(None, EXCLUDE, workers=4).crawl(EMPLOYEES))
+
+    assert {report["employee_id"]: report for report in reports} == serial
+    deep = serial["deep"]
+    assert deep["counts"] == {"included": 21, "skipped_files": 12, "excluded_folders": 4}
+    assert [entry["file_id"] for entry in deep["included"][:3]] == ["deep-a", "deep-11-c", "deep-11-z"]
+    # Excluded folders are never listed.
+    assert "deep-0-x" not in _listed(drive)
+    # Three levels, with pages of 5: far fewer requests than the 25 folders listed.
+    assert len(set(_listed(drive))) == 25
+    assert serial_requests < 20
+
+
+def test_list_children_many_splits_long_queries(drive, monkeypatch):
+    monkeypatch.setattr(drive_client, "MAX_QUERY_LENGTH", 100)
+    folders = [f"deep-{i}" for i in range(12)]
+
+    children = drive_client.list_children_many(drive, folders)
+
+    assert all(len(" or ".join(f"'{f}' in parents" for f in parents)) <= 100 for parents in drive.requests)
+    assert {folder: [item["id"] for item in items] for folder, items in children.items()} == {
+        folder: [item["id"] for item in _tree()[folder]] for folder in folders
+    }
+
+
+def test_crawler_spreads_one_deep_tree_over_all_workers(drive):
+    list(FolderCrawler(None, EXCLUDE, workers=8, batch_size=1).crawl(EMPLOYEES[:1]))
+
+    assert len(set(_listed(drive))) == 21
+    # The folders of a single employee were listed by several workers at once.
+    assert drive.peak > 1
+
+
+def test_crawler_reraises_listing_errors(drive):
+    crawler = FolderCrawler(None, EXCLUDE, workers=2)
+
+    with pytest.raises(ValueError):
+        list(crawler.crawl(EMPLOYEES + [{"id": "boom", "name": "Boom"}]))
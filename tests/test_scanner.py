@@ -0,0 +1,98 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from cartellino_parser.extract import iter_lines
+from cartellino_parser.parse_days import parse_days
+from cartellino_parser.parse_pairs import parse_pairs
+from cartellino_parser.parse_totals import parse_totals
+from cartellino_parser.parser import _build_meta
+from cartellino_parser.scanner import scan_lines
+
+DOCUMENTS = Path(__file__).resolve().parents[1] / "documents"
+
+
+def test_single_pass_matches_separate_scans() -> None:
+    for pdf_path in sorted(DOCUMENTS.glob("*.pdf")):
+        lines = list(iter_lines(pdf_path))
+        meta = _build_meta(lines)
+
+        scan = scan_lines(iter(lines))
+
+        assert scan.meta == meta
+        pd.testing.assert_frame_equal(scan.days_df, parse_days(lines, meta["year"], meta["month"]))
+        pd.testing.assert_frame_equal(
+            scan.pairs_df, parse_pairs(lines, meta["year"], meta["month"])
+        )
+        assert scan.totals == parse_totals(lines)
+        assert list(scan.totals) == list(parse_totals(lines))
+
+
+def test_scan_lines_handles_overnight_and_open_entries() -> None:
+    lines = [
+        "Data 20/09/2022 10:21:12 Pag. 1 / 1",
+        "Azienda RIEPILOGO PRESENZE/ASSENZE - LUGLIO 2022 Pag. 282",
+        "BELIA LUCIA - 5352 Un. Org. UNI",
+        "11 LU E 20:45 U(24:00) | |11 INF01C 3.15 3.00 3.15",
+        "12 MA E(00:00) U 07:33 | |12 INF01D 7.33 7.00 7.30",
+        "13 ME E 13:50 | |13 INF01B 7.41 7.00 7.40",
+        "| ORE LAVORATE 176.15",
+    ]
+
+    scan = scan_lines(lines)
+
+    assert scan.meta["employee_id"] == "5352"
+    assert scan.days_df["day"].tolist() == [11, 12, 13]
+    assert scan.pairs_df["duration_hhmm"].tolist()[:2] == ["03:15", "07:33"]
+    assert pd.isna(scan.pairs_df["duration_hhmm"].iloc[2])
+    assert scan.totals == {"ore_lavorate": 176.25}
+
+
+def test_total_value_on_the_line_after_its_label() -> None:
+    lines = [
+        "Azienda RIEPILOGO PRESENZE/ASSENZE - LUGLIO 2022 Pag. 282",
+        "BELIA LUCIA - 5352 Un. Org. UNI",
+        "11 LU E 20:45 U(24:00) | |11 INF01C 3.15 3.00 3.15",
+        "FER020 Ferie anno corrente 0 G | ORE LAVORATE",
+        "176.15",
+        "| ORE DOVUTE PROGRAMMATE 176.00 | DB/CR NETTO",
+        "",
+        "+14.00 | SALDO AL MESE CORRENTE",
+        "| LIQUIDAZIONI/COMPENSAZIONI -6.15",
+        "| SALDO AL MESE PRECEDENTE +55.50",
+    ]
+
+    scan = scan_lines(lines)
+
+    assert scan.totals == parse_totals(lines)
+    assert scan.totals == {
+        "ore_lavorate": 176.25,
+        "ore_dovute_programmate": 176.0,
+        "dbcr_netto": 14.0,
+        "saldo_al_mese_precedente": 55.833333333333336,
+    }
+
+
+def test_build_pairs_df_edge_cases() -> None:
+    from cartellino_parser.parse_pairs import build_pairs_df
+
+    raw = [
+        (2, "VE", 0, ("24:00", "e"), "06:00", "u"),
+        (3, "SA", 0, None, "06:00", "u"),
+        (3, "SA", 1, ("11:00", "e"), None, None),
+    ]
+
+    pairs = build_pairs_df(raw, 2024, 2)
+
+    assert pairs["entry_ts"].iloc[0] == pd.Timestamp("2024-02-03 00:00")
+    assert pairs["exit_ts"].iloc[0] == pd.Timestamp("2024-02-03 06:00")
+    assert pairs["duration_hhmm"].iloc[0] == "06:00"
+    assert pd.isna(pairs["entry_ts"].iloc[1]) and pd.isna(pairs["turno"].iloc[1])
+    assert pairs["turno"].tolist()[::2] == ["Mattina", "Mattina"]
+
+    undated = build_pairs_df(raw, None, None)
+    assert undated["entry_ts"].isna().all() and undated["year"].isna().all()
+
+    with pytest.raises(ValueError):
+        build_pairs_df([(30, "VE", 0, ("08:00", "e"), "14:00", "u")], 2024, 2)
@@ -0,0 +1,76 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from cartellino_parser import parse_pdf, parse_pdf_segments
+from cartellino_parser.segments import may_be_bundle, segment_pages, split_contiguous
+
+DOCUMENTS = Path(__file__).resolve().parents[1] / "documents"
+MONTHLY = [
+    DOCUMENTS / "Cartellino mensile-2022-01.pdf",
+    DOCUMENTS / "Cartellino mensile-2022-07.pdf",
+    DOCUMENTS / "Cartellino mensile-2023-03-12.pdf",
+]
+
+
+def build_bundle(paths) -> bytes:
+    pypdf = pytest.importorskip("pypdf")
+    writer = pypdf.PdfWriter()
+    for path in paths:
+        for page in pypdf.PdfReader(path).pages:
+            writer.add_page(page)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def test_segment_pages_splits_on_month_headers():
+    segments = segment_pages(io.BytesIO(build_bundle(MONTHLY)))
+
+    assert [(s.start, s.stop) for s in segments] == [(0, 1), (1, 2), (2, 3)]
+    assert [s.tag for s in segments] == ["2022-01", "2022-07", "2023-03"]
+
+
+def test_a_month_repeated_later_gets_its_own_tag():
+    segments = segment_pages(io.BytesIO(build_bundle([MONTHLY[0], MONTHLY[1], MONTHLY[0]])))
+
+    assert [s.tag for s in segments] == ["2022-01", "2022-07", "2022-01-2"]
+
+
+def test_may_be_bundle_reads_headers_of_multi_page_pdfs_only(monkeypatch):
+    from cartellino_parser import segments as segments_module
+
+    assert may_be_bundle(io.BytesIO(build_bundle(MONTHLY)))
+    assert not may_be_bundle(io.BytesIO(build_bundle([MONTHLY[1], MONTHLY[1]])))
+
+    def no_text(*args, **kwargs):
+        raise AssertionError("a single-page PDF needs no text")
+
+    monkeypatch.setattr(segments_module, "iter_page_texts", no_text)
+    assert not may_be_bundle(MONTHLY[1])
+
+
+def test_single_month_is_one_segment():
+    segments = segment_pages(MONTHLY[1])
+
+    assert len(segments) == 1
+    assert (segments[0].month, segments[0].year) == (7, 2022)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_parse_pdf_segments_matches_individual_parses(jobs):
+    parsed = parse_pdf_segments(io.BytesIO(build_bundle(MONTHLY)), jobs=jobs)
+
+    assert len(parsed) == len(MONTHLY)
+    for segment, path in zip(parsed, MONTHLY):
+        reference = parse_pdf(path)
+        assert segment.meta["month"] == reference.meta["month"]
+        assert segment.days_df.equals(reference.days_df)
+        assert segment.pairs_df.equals(reference.pairs_df)
+        assert segment.totals == reference.totals
+
+
+def test_split_contiguous_keeps_order_and_balance():
+    assert split_contiguous(list(range(5)), 2) == [[0, 1, 2], [3, 4]]
+    assert split_contiguous([1], 4) == [[1]]
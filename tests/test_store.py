@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import pandas as pd
+
+from cartellino_parser import parse_pdf
+from cartellino_parser.models import DAY_COLUMNS, PAIR_COLUMNS
+from cartellino_parser.store import ResultStore, _connect
+
+DOCUMENTS = Path(__file__).resolve().parents[1] / "documents"
+BELIA = ["Cartellino mensile-2022-01.pdf", "Cartellino mensile-2022-07.pdf", "Cartellino mensile-2022-12.pdf"]
+
+
+def test_store_round_trips_and_queries_by_employee(tmp_path):
+    parsed = {name: parse_pdf(DOCUMENTS / name) for name in BELIA}
+    with ResultStore(tmp_path / "results.db", batch_size=2) as store:
+        for name, item in parsed.items():
+            store.add(item, document=name, content_hash=f"hash-{name}")
+        store.flush()
+
+        days = store.days("5352", first_year=2022, last_year=2022)
+        pairs = store.pairs("5352")
+        totals = store.totals("5352")
+        assert store.days("5352", first_year=2023).empty
+        assert store.documents_with_hash(f"hash-{BELIA[1]}") == [BELIA[1]]
+
+    assert store.documents_written == len(BELIA)
+    assert list(totals["month"]) == [1, 7, 12]
+    for name, item in parsed.items():
+        doc_days = days[days.document == name][DAY_COLUMNS].reset_index(drop=True)
+        doc_pairs = pairs[pairs.document == name][PAIR_COLUMNS].reset_index(drop=True)
+        pd.testing.assert_frame_equal(doc_days, item.days_df, check_dtype=False)
+        pd.testing.assert_frame_equal(doc_pairs, item.pairs_df, check_dtype=False)
+
+
+def test_store_upsert_replaces_document_rows(tmp_path):
+    first = parse_pdf(DOCUMENTS / BELIA[0])
+    second = parse_pdf(DOCUMENTS / BELIA[1])
+    with ResultStore(tmp_path / "results.db") as store:
+        store.add(first, document="f1")
+        store.flush()
+        store.add(second, document="f1")
+
+    reopened = ResultStore(tmp_path / "results.db")
+    try:
+        documents = reopened.query("SELECT document, month FROM documents")
+        assert documents.to_dict("records") == [{"document": "f1", "month": 7}]
+        assert len(reopened.days("5352")) == len(second.days_df)
+    finally:
+        reopened.close()
+
+
+def test_store_keeps_the_last_of_a_document_queued_twice_in_one_batch(tmp_path):
+    first = parse_pdf(DOCUMENTS / BELIA[0])
+    second = parse_pdf(DOCUMENTS / BELIA[1])
+    with ResultStore(tmp_path / "results.db") as store:
+        conn = _connect(store.path)
+        store._commit(conn, [store._entry(first, "f1", None), store._entry(second, "f1", None)])
+        conn.close()
+
+        assert store.failed == {}
+        assert store.query("SELECT month FROM documents")["month"].tolist() == [7]
+        assert len(store.days("5352")) == len(second.days_df)
+
+
+def test_store_fails_a_bad_document_on_its_own(tmp_path):
+    good = parse_pdf(DOCUMENTS / BELIA[0])
+    bad = parse_pdf(DOCUMENTS / BELIA[1])
+    bad.days_df["raw"] = [["not", "bindable"]] * len(bad.days_df)
+    with ResultStore(tmp_path / "results.db") as store:
+        conn = _connect(store.path)
+        store._commit(conn, [store._entry(bad, "bad", None), store._entry(good, "good", None)])
+        conn.close()
+        # The writer keeps going after the failure.
+        store.add(parse_pdf(DOCUMENTS / BELIA[2]), document="later")
+        store.flush()
+
+        assert set(store.failed) == {"bad"}
+        assert sorted(store.query("SELECT document FROM documents")["document"]) == ["good", "later"]
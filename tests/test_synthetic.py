@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from cartellino_parser import parse_pdf, parse_pdf_segments
+from cartellino_parser.synthetic import generate_corpus, load_expected
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    out_dir = tmp_path_factory.mktemp("synthetic")
+    generate_corpus(out_dir, employees=3, months=2, bundle_ratio=1.0, seed=7)
+    return out_dir
+
+
+def test_manifest_lists_every_generated_pdf(corpus):
+    manifest = json.loads((corpus / "manifest.json").read_text())
+
+    assert manifest["employee_count"] == 3
+    file_ids = {item["file_id"] for employee in manifest["employees"] for item in employee["included"]}
+    assert file_ids == {path.stem for path in (corpus / "pdf").glob("*.pdf")}
+    assert file_ids == set(load_expected(corpus))
+
+
+def test_synthetic_documents_parse_to_expected_values(corpus):
+    for file_id, expected in load_expected(corpus).items():
+        path = corpus / "pdf" / f"{file_id}.pdf"
+        segments = expected["segments"]
+        parsed = parse_pdf_segments(path) if len(segments) > 1 else [parse_pdf(path)]
+
+        assert len(parsed) == len(segments)
+        for result, segment in zip(parsed, segments):
+            assert result.meta["employee_id"] == expected["employee_id"]
+            assert (result.meta["year"], result.meta["month"]) == (segment["year"], segment["month"])
+            assert len(result.days_df) == segment["days"]
+            assert len(result.pairs_df) == segment["pairs"]
+            for key, value in segment["totals"].items():
+                assert result.totals[key] == pytest.approx(value)
+            assert result.validation["is_ok"]
@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from googleapiclient.http import HttpRequest
+
+from drive_scanner import drive_client
+from drive_scanner.transport import SharedTransport, discovery_document
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.tokens.append(self.headers.get("authorization"))
+        status = 401 if self.headers.get("authorization") == "Bearer expired" else 200
+        body = json.dumps({"path": self.path}).encode()
+        time.sleep(0.01)
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.lock = threading.Lock()
+    httpd.connections = set()
+    httpd.tokens = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class FakeCreds:
+    def __init__(self, token=None):
+        self.token = token
+        self.refreshes = 0
+
+    @property
+    def valid(self):
+        # Like google-auth, an expired token is only noticed when the server rejects it.
+        return self.token is not None
+
+    def refresh(self, request):
+        time.sleep(0.02)
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+
+
+def _url(server, path="/files"):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_workers_share_pooled_connections_and_one_refresh(server):
+    creds = FakeCreds()
+    transport = SharedTransport(creds, pool_size=4)
+
+    with ThreadPoolExecutor(16) as pool:
+        statuses = list(pool.map(lambda _: transport.request(_url(server))[0].status, range(64)))
+
+    assert statuses == [200] * 64
+    assert creds.refreshes == 1
+    assert set(server.tokens) == {"Bearer token-1"}
+    # 64 requests over at most 4 keep-alive connections.
+    assert len(server.connections) <= 4
+
+
+def test_unauthorized_request_is_retried_after_one_refresh(server):
+    creds = FakeCreds("expired")
+    transport = SharedTransport(creds)
+
+    response, _ = transport.request(_url(server))
+
+    assert response.status == 200
+    assert server.tokens == ["Bearer expired", "Bearer token-1"]
+    assert creds.refreshes == 1
+
+
+def test_googleapiclient_requests_run_over_the_transport(server):
+    transport = SharedTransport(None)
+    request = HttpRequest(transport, lambda resp, content: json.loads(content), _url(server, "/files?q=x"))
+
+    assert request.execute() == {"path": "/files?q=x"}
+
+
+def test_connection_errors_are_retryable():
+    transport = SharedTransport(None, timeout=1)
+
+    with pytest.raises(ConnectionError) as excinfo:
+        transport.request("http://127.0.0.1:9/")
+    assert drive_client._retry_reason(excinfo.value) == "ConnectionError"
+
+
+def test_services_share_the_transport_and_parsed_discovery(monkeypatch):
+    monkeypatch.setattr(drive_client, "_thread_local", threading.local())
+    monkeypatch.setattr(drive_client, "_transport", None)
+    creds = FakeCreds("valid")
+    services = []
+
+    def build():
+        services.append(drive_client.get_drive_service(creds))
+
+    threads = [threading.Thread(target=build) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(service) for service in services}) == 3
+    assert {id(service._http) for service in services} == {id(drive_client.shared_transport(creds))}
+    assert discovery_document() is discovery_document()
@@ -0,0 +1,94 @@
+import pandas as pd
+import pytest
+
+from cartellino_parser import parse_pdf
+from cartellino_parser.store import ResultStore
+from cartellino_parser.synthetic import generate_corpus
+from cartellino_parser.validate import ANOMALY_COLUMNS, load_corpus, validate_corpus
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    out_dir = tmp_path_factory.mktemp("corpus")
+    generate_corpus(out_dir, employees=2, months=3, bundle_ratio=0.0, seed=11)
+    with ResultStore(out_dir / "cartellini.db") as store:
+        for path in sorted((out_dir / "pdf").glob("*.pdf")):
+            store.add(parse_pdf(path, backend="pypdf"), document=path.name)
+    return load_corpus(out_dir)
+
+
+def _checks(anomalies):
+    return set(anomalies["check"])
+
+
+def test_consistent_corpus_only_reports_missing_exits(corpus):
+    days, pairs, totals = corpus
+
+    anomalies = validate_corpus(days, pairs, totals)
+
+    assert list(anomalies.columns) == ANOMALY_COLUMNS
+    assert _checks(anomalies) <= {"unpaired_stamp"}
+    assert len(anomalies) == (pairs["exit_ts"].isna() | pairs["entry_ts"].isna()).sum()
+
+
+def test_cross_month_anomalies(corpus):
+    days, pairs, totals = corpus
+    totals = totals.sort_values(["employee_id", "year", "month"], ignore_index=True)
+    first, second = totals["employee_id"].unique()
+
+    # first employee: month 2 missing; second employee: month 3 uploaded twice, broken saldo in month 2
+    dropped = totals[(totals["employee_id"] == first) & (totals["month"] == 2)].index
+    duplicate = totals[(totals["employee_id"] == second) & (totals["month"] == 3)].assign(document="copy.pdf")
+    tampered = pd.concat([totals.drop(dropped), duplicate], ignore_index=True)
+    broken = (tampered["employee_id"] == second) & (tampered["month"] == 2)
+    tampered.loc[broken, "saldo_al_mese_precedente"] += 1
+
+    anomalies = validate_corpus(days, pairs, tampered).set_index("check")
+
+    missing = anomalies.loc[["missing_month"]]
+    assert missing[["employee_id", "year", "month"]].values.tolist() == [[first, 2022, 2]]
+    duplicated = anomalies.loc[["duplicate_month"]]
+    assert duplicated[["employee_id", "month", "document"]].values.tolist() == [[second, 3, "copy.pdf"]]
+    saldo = anomalies.loc[["saldo_continuity"]]
+    assert saldo[["employee_id", "month"]].values.tolist() == [[second, 2]]
+    assert saldo["actual"].iloc[0] - saldo["expected"].iloc[0] == pytest.approx(1)
+    # Month 3 of the first employee now follows month 1: a gap, not a saldo break.
+    # The copy has no day rows of its own.
+    assert anomalies.loc[["ore_lavorate"], "document"].tolist() == ["copy.pdf"]
+
+
+def test_day_level_anomalies(corpus):
+    days, pairs, totals = corpus
+    closed = pairs.dropna(subset=["entry_ts", "exit_ts"])
+    target = closed.index[0]
+    pairs = pairs.copy()
+    pairs.loc[target, "exit_ts"] = pairs.loc[target, "entry_ts"] + pd.Timedelta(minutes=30)
+    document, day = pairs.loc[target, ["document", "day"]]
+
+    anomalies = validate_corpus(days, pairs, totals)
+
+    short = anomalies[anomalies["check"] == "pair_hours"]
+    assert short[["document", "day"]].values.tolist() == [[document, day]]
+    assert short["expected"].iloc[0] > short["actual"].iloc[0]
+    assert "ore_lavorate" not in set(anomalies["check"])
+
+
+def test_large_corpus_finds_the_anomalies_of_every_copy(corpus):
+    days, pairs, totals = corpus
+    copies = 600
+    frames = []
+    for table in (days, pairs, totals):
+        employee = table["employee_id"].astype(str)
+        frames.append(
+            pd.concat(
+                [table.assign(employee_id=employee + f"-{i}", document=table["document"] + f"-{i}") for i in range(copies)],
+                ignore_index=True,
+            )
+        )
+    big_days, big_pairs, big_totals = frames
+    expected = len(validate_corpus(days, pairs, totals)) * copies
+
+    anomalies = validate_corpus(big_days, big_pairs, big_totals)
+
+    assert len(big_days) > 100_000
+    assert len(anomalies) == expected